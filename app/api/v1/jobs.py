@@ -1,137 +1,123 @@
-from datetime import datetime, UTC
+from itertools import islice
+from typing import List
+
+from pydantic import TypeAdapter
 
 from app.utils.logging_config import StructuredLogger
+from app.utils.helpers import utc_now_iso
+from app.utils.response_cache import cached, response_cache
 
 from fastapi import APIRouter, HTTPException, status
-from app.schemas.models import ApiResponse
-from app.dependencies import job_manager, stratum_server
+from fastapi.responses import ORJSONResponse
+from app.schemas.models import ApiResponse, JobHistoryItem, api_response_content
+from app.dependencies import container
 
 logger = StructuredLogger(__name__)
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# Кэш ответов: данные меняются не чаще одного раза на новое задание
+JOBS_CACHE_NAMESPACE = "jobs"
+JOB_STATS_CACHE_TTL = 2  # секунды
+JOB_HISTORY_CACHE_TTL = 5  # секунды
+
+# Разбор и сериализация истории одним вызовом pydantic-core
+job_history_adapter = TypeAdapter(List[JobHistoryItem])
+
 
-@router.get("/stats")
+@router.get("/stats", response_model=ApiResponse)
+@cached(namespace=JOBS_CACHE_NAMESPACE, expire=JOB_STATS_CACHE_TTL)
 async def get_job_stats():
     """Статистика JobManager"""
-    try:
-        logger.debug("Запрос статистики заданий")
-        stats = job_manager.get_stats()
-
-        # Безопасно получаем значения
-        return ApiResponse(
-            status="success",
-            message="Статистика заданий получена",
-            data={
-                "job_manager": {
-                    "status": "running",
-                    "current_job": stats.get("current_job"),
-                    "total_jobs_created": stats.get("total_jobs_created", 0),
-                    "job_history_size": len(job_manager.job_history) if hasattr(job_manager, 'job_history') else 0
-                },
-                "node": stats.get("node_info", {}),
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка получения статистики заданий: {str(e)}"
-        )
+    logger.debug("Запрос статистики заданий")
+    stats = container.job_manager.get_stats()
+
+    # Безопасно получаем значения
+    return ORJSONResponse(api_response_content(
+        status="success",
+        message="Статистика заданий получена",
+        data={
+            "job_manager": {
+                "status": "running",
+                "current_job": stats.get("current_job"),
+                "total_jobs_created": stats.get("total_jobs_created", 0),
+                "job_history_size": len(container.job_manager.job_history)
+            },
+            "node": stats.get("node_info", {}),
+            "last_block_submits": stats.get("last_block_submits", []),
+            "timestamp": utc_now_iso()
+        }
+    ))
 
 
 @router.get("/current", response_model=ApiResponse)
 async def get_current_job():
     """Получение текущего задания"""
-    try:
-        logger.debug("Запрос текущего задания")
-
-        # Используем существующий атрибут current_job
-        if not job_manager.current_job:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Текущее задание не найдено"
-            )
-
-        return ApiResponse(
-            status="success",
-            message="Текущее задание получено",
-            data={
-                "job": job_manager.current_job,
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
+    logger.debug("Запрос текущего задания")
+
+    # Используем существующий атрибут current_job
+    if not container.job_manager.current_job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка получения текущего задания: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Текущее задание не найдено"
         )
 
+    return ApiResponse(
+        status="success",
+        message="Текущее задание получено",
+        data={
+            "job": container.job_manager.current_job,
+            "timestamp": utc_now_iso()
+        }
+    )
+
 
 @router.post("/broadcast", response_model=ApiResponse)
 async def broadcast_new_job():
     """Принудительная рассылка нового задания"""
-    try:
-        await job_manager.broadcast_new_job_to_all()
-
-        # Получаем актуальную статистику после рассылки
-        active_miners = len(set(stratum_server.miner_addresses.values())) if stratum_server else 0
-
-        return ApiResponse(
-            status="success",
-            message="Новое задание разослано всем майнерам",
-            data={
-                "status": "broadcasted",
-                "active_miners": active_miners,
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка рассылки задания: {str(e)}"
-        )
+    await container.job_manager.broadcast_new_job_to_all()
+
+    # Новое задание - статистика и история в кэше устарели
+    response_cache.clear(namespace=JOBS_CACHE_NAMESPACE)
+
+    # Получаем актуальную статистику после рассылки
+    active_miners = container.stratum_server.active_miner_count if container.stratum_server else 0
+
+    return ApiResponse(
+        status="success",
+        message="Новое задание разослано всем майнерам",
+        data={
+            "status": "broadcasted",
+            "active_miners": active_miners,
+            "timestamp": utc_now_iso()
+        }
+    )
 
 
 @router.get("/history", response_model=ApiResponse)
+@cached(namespace=JOBS_CACHE_NAMESPACE, expire=JOB_HISTORY_CACHE_TTL)
 async def get_job_history(limit: int = 10):
     """История заданий"""
-    try:
-        if limit < 1 or limit > 100:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Limit должен быть между 1 и 100"
-            )
-
-        history = job_manager.job_history[-limit:] if job_manager.job_history else []
-
-        jobs_list = []
-        for job in reversed(history):  # Новые сверху
-            jobs_list.append({
-                "id": job.get("id", "unknown"),
-                "created_at": job.get("created_at").isoformat() if job.get("created_at") else "unknown",
-                "miner": job.get("miner_address", "broadcast"),
-                "height": job.get("template", {}).get("height", "unknown"),
-                "type": "personal" if job.get("miner_address") else "broadcast"
-            })
-
-        return ApiResponse(
-            status="success",
-            message="История заданий получена",
-            data={
-                "total_jobs": len(job_manager.job_history) if job_manager.job_history else 0,
-                "requested_limit": limit,
-                "actual_returned": len(jobs_list),
-                "jobs": jobs_list,
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
+    if limit < 1 or limit > 100:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка получения истории заданий: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Limit должен быть между 1 и 100"
         )
+
+    history = container.job_manager.job_history or ()
+
+    # Обходим с конца без копирования истории: O(limit), новые сверху
+    jobs = job_history_adapter.validate_python(list(islice(reversed(history), limit)))
+    jobs_list = job_history_adapter.dump_python(jobs, mode="json")
+
+    return ORJSONResponse(api_response_content(
+        status="success",
+        message="История заданий получена",
+        data={
+            "total_jobs": len(history),
+            "requested_limit": limit,
+            "actual_returned": len(jobs_list),
+            "jobs": jobs_list,
+            "timestamp": utc_now_iso()
+        }
+    ))
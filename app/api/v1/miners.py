@@ -1,22 +1,30 @@
+import asyncio
+
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import true
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import true, func, update, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import IntegrityError
-from typing import Optional
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from pydantic import TypeAdapter
+from typing import AsyncContextManager, Callable, Dict, List, Optional
 from datetime import datetime, timedelta, UTC
 
 from app.utils.logging_config import StructuredLogger
-from app.utils.helpers import humanize_time_ago
 from app.utils.protocol_helpers import DEFAULT_PAGINATION_LIMIT, MAX_PAGINATION_LIMIT
 from app.schemas.models import (
     ApiResponse,
     MinerResponse,
     MinerCreate,
+    MinerShareItem,
+    MinerBlockItem,
 )
 
-from app.models.database import get_db
-from app.models.miner import Miner
+from app.models.database import get_db, get_db_connector, get_db_session_factory
+from app.dependencies import now_utc
+from app.models.miner import Miner, MINER_BY_ADDRESS
 from app.models.share import Share
 from app.models.block import Block
 
@@ -24,18 +32,132 @@ logger = StructuredLogger(__name__)
 
 router = APIRouter(prefix="/miners", tags=["miners"])
 
+# Колонки для ответа MinerResponse - выбираем только их, без загрузки ORM объектов
+MINER_RESPONSE_COLUMNS = (
+    Miner.id,
+    Miner.bch_address,
+    Miner.worker_name,
+    Miner.is_active,
+    Miner.total_shares,
+    Miner.total_blocks,
+    Miner.hashrate,
+    Miner.created_at.label("registered_at"),
+)
+
+# Временные диапазоны статистики майнера
+STATS_VALID_TIME_RANGES = frozenset({"1h", "24h", "7d", "30d", "all"})
+STATS_TIME_DELTAS = {
+    "1h": timedelta(hours=1),
+    "24h": timedelta(days=1),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "all": None
+}
+STATS_HUMAN_READABLE = {
+    "1h": "последний час",
+    "24h": "последние 24 часа",
+    "7d": "последние 7 дней",
+    "30d": "последние 30 дней",
+    "all": "вся история"
+}
+
+# Сериализация пачек ORM объектов одним вызовом pydantic-core (from_attributes)
+_SHARES_ADAPTER = TypeAdapter(List[MinerShareItem])
+_BLOCKS_ADAPTER = TypeAdapter(List[MinerBlockItem])
+
+# Размер пачки строк при потоковом чтении списков (майнеры, шары, блоки)
+MINERS_STREAM_BATCH_SIZE = 50
+
+
+def _cursor_for_column(value: datetime, column) -> datetime:
+    """
+    Привести курсор before к соглашению колонки: UTC с tzinfo для
+    TIMESTAMP WITH TIME ZONE, naive UTC для DateTime без зоны.
+    Naive курсор считается временем UTC.
+    """
+    value = value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+    return value if column.type.timezone else value.replace(tzinfo=None)
+
+
+async def _stream_partitions_json(
+        envelope: dict,
+        items_key: str,
+        count_key: str,
+        session_factory: Callable[[], AsyncSession],
+        query,
+        adapter: TypeAdapter,
+        cursor_key: str,
+        limit: int
+):
+    """
+    Потоковая отдача JSON объекта со списком из серверного курсора.
+
+    Сессия открывается и закрывается внутри генератора - курсор читается
+    уже после возврата из эндпоинта. Каждая пачка (result.partitions())
+    превращается в словари через adapter и сразу кодируется orjson - весь
+    список в памяти не собирается. "Сейчас" для time_ago фиксируется один
+    раз на запрос.
+
+    После списка отдаются next_cursor и next_cursor_id - значение cursor_key
+    и id последнего элемента, если страница заполнена целиком (иначе null):
+    вместе они образуют составной курсор (before, before_id). Статус 200 к этому
+    моменту уже отправлен, поэтому ошибка чтения закрывает JSON корректно
+    и добавляет поле error (без текста исключения - он только в логе).
+    """
+    context = {"now": datetime.now(UTC)}
+
+    yield orjson.dumps(envelope)[:-1] + b',"' + items_key.encode() + b'":['
+
+    count = 0
+    last_cursor = last_id = None
+    try:
+        async with session_factory() as db:
+            result = await db.stream_scalars(query)
+            async for partition in result.partitions():
+                items = adapter.dump_python(adapter.validate_python(partition), context=context)
+                if not items:
+                    continue
+                # Без внешних [] - элементы продолжают уже открытый список
+                yield (b"," if count else b"") + orjson.dumps(items)[1:-1]
+                count += len(items)
+                last_cursor = items[-1][cursor_key]
+                last_id = items[-1]["id"]
+    except Exception as e:
+        logger.error(
+            "Ошибка потоковой отдачи списка",
+            event="stream_list_failed",
+            items_key=items_key,
+            streamed=count,
+            error=str(e),
+            error_type=type(e).__name__
+        )
+        yield (
+            b'],"' + count_key.encode() + b'":' + orjson.dumps(count)
+            + b',"next_cursor":null,"next_cursor_id":null,"error":' + orjson.dumps("Ошибка чтения списка") + b'}'
+        )
+        return
+
+    full_page = count == limit
+    yield (
+        b'],"' + count_key.encode() + b'":' + orjson.dumps(count)
+        + b',"next_cursor":' + orjson.dumps(last_cursor if full_page else None)
+        + b',"next_cursor_id":' + orjson.dumps(last_id if full_page else None) + b'}'
+    )
+
 
 class ListMinersParams:
     """Параметры для списка майнеров"""
     def __init__(
         self,
-        skip: int = Query(0, ge=0, description="Сколько записей пропустить"),
+        skip: int = Query(0, ge=0, deprecated=True, description="Сколько записей пропустить (устарело, используйте after_id)"),
         limit: int = Query(DEFAULT_PAGINATION_LIMIT, ge=1, le=MAX_PAGINATION_LIMIT, description="Максимальное количество записей"),
-        active_only: bool = Query(False, description="Только активные майнеры")
+        active_only: bool = Query(False, description="Только активные майнеры"),
+        after_id: Optional[int] = Query(None, ge=0, description="Курсор: id последнего майнера предыдущей страницы")
     ):
         self.skip = skip
         self.limit = limit
         self.active_only = active_only
+        self.after_id = after_id
 
 @router.get(
     "/",
@@ -45,48 +167,104 @@ class ListMinersParams:
 )
 async def list_miners(
     params: ListMinersParams = Depends(),
-    db: AsyncSession = Depends(get_db)
+    connect: Callable[[], AsyncContextManager[AsyncConnection]] = Depends(get_db_connector)
 ):
     """
     Получение списка майнеров с пагинацией.
+
+    Общее количество приходит в той же выборке, что и страница: колонка total
+    считается скалярным подзапросом COUNT (один раз на запрос), поэтому
+    отдельный round-trip нужен только для пустой страницы.
+
+    Страница отдается потоком: строки читаются серверным курсором пачками
+    по MINERS_STREAM_BATCH_SIZE и сразу сериализуются, без сборки списка.
+    Соединение открывает и закрывает сам генератор. Статус и сообщение
+    ApiResponse идут после списка: статус 200 уже отправлен к моменту
+    чтения, и при ошибке поток закрывается корректным JSON со status="error".
     """
-    query = select(Miner)
+    count_query = select(func.count()).select_from(Miner)
+    if params.active_only:
+        count_query = count_query.where(Miner.is_active.is_(true()))
+
+    query = select(*MINER_RESPONSE_COLUMNS, count_query.scalar_subquery().label("total"))
 
     if params.active_only:
         query = query.where(Miner.is_active.is_(true()))
 
-    query = query.offset(params.skip).limit(params.limit)
-
-    result = await db.execute(query)
-    miners = result.scalars().all()
-
-    # Преобразуем SQLAlchemy модели в Pydantic схемы
-    miner_responses = [
-        MinerResponse(
-            id=m.id,
-            bch_address=m.bch_address,
-            worker_name=m.worker_name,
-            is_active=m.is_active,
-            total_shares=m.total_shares,
-            total_blocks=m.total_blocks,
-            hashrate=m.hashrate,
-            registered_at=m.created_at
+    # Keyset пагинация: WHERE id > after_id по индексу, без сканирования пропущенных строк
+    if params.after_id is not None:
+        query = query.where(Miner.id > params.after_id)
+    elif params.skip:
+        logger.warning(
+            "Используется устаревшая пагинация через skip",
+            event="miners_list_offset_pagination",
+            skip=params.skip
         )
-        for m in miners
-    ]
-
-    return ApiResponse(
-        status="success",
-        message=f"Найдено {len(miner_responses)} майнеров",
-        data={
-            "miners": [miner.model_dump() for miner in miner_responses],
-            "pagination": {
-                "skip": params.skip,
-                "limit": params.limit,
-                "total": len(miner_responses)
-            }
+        query = query.offset(params.skip)
+
+    query = query.order_by(Miner.id).limit(params.limit)
+    query = query.execution_options(yield_per=MINERS_STREAM_BATCH_SIZE)
+
+    async def stream_page():
+        # Конверт ApiResponse вокруг потока строк
+        yield b'{"data":{"miners":['
+
+        count = 0
+        last_id = None
+        try:
+            async with connect() as db:
+                result = await db.stream(query)
+                rows = aiter(result.mappings())
+
+                # total берём из первой строки; на пустой странице - отдельным COUNT
+                first_row = await anext(rows, None)
+                if first_row is not None:
+                    total = first_row["total"]
+                else:
+                    total = (await db.execute(count_query)).scalar() or 0
+
+                row = first_row
+                while row is not None:
+                    # Строки содержат поля MinerResponse и служебную колонку total
+                    miner = dict(row)
+                    del miner["total"]
+                    yield (b"," if count else b"") + orjson.dumps(miner)
+                    count += 1
+                    last_id = miner["id"]
+                    row = await anext(rows, None)
+        except Exception as e:
+            logger.error(
+                "Ошибка потоковой отдачи списка майнеров",
+                event="miners_list_stream_failed",
+                streamed=count,
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            yield (
+                b'],"pagination":null},"status":"error","message":'
+                + orjson.dumps("Ошибка получения списка майнеров")
+                + b',"timestamp":' + orjson.dumps(datetime.now(UTC))
+                + b',"request_id":null}'
+            )
+            return
+
+        pagination = {
+            "skip": params.skip,
+            "after_id": params.after_id,
+            "limit": params.limit,
+            "count": count,
+            "total": total,
+            # Неполная страница - последняя, следующего курсора нет
+            "next_cursor": last_id if count == params.limit else None
         }
-    )
+        yield (
+            b'],"pagination":' + orjson.dumps(pagination)
+            + b'},"status":"success","message":' + orjson.dumps(f"Найдено {total} майнеров")
+            + b',"timestamp":' + orjson.dumps(datetime.now(UTC))
+            + b',"request_id":null}'
+        )
+
+    return StreamingResponse(stream_page(), media_type="application/json")
 
 
 @router.post(
@@ -94,7 +272,7 @@ async def list_miners(
     status_code=status.HTTP_201_CREATED,
     summary="Регистрация нового майнера",
     response_description="Данные зарегистрированного майнера",
-    response_model=ApiResponse
+    response_model=ApiResponse[Dict[str, MinerResponse]]
 )
 async def register_miner(
     miner_data: MinerCreate,  # ИСПОЛЬЗУЕМ PYDANTIC СХЕМУ
@@ -110,46 +288,18 @@ async def register_miner(
     bch_address = miner_data.bch_address
     worker_name = miner_data.worker_name
 
-    # Проверяем, существует ли уже майнер
-    result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
-    )
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Майнер с адресом {bch_address} уже зарегистрирован"
-        )
-
-    # Создаём нового майнера
-    new_miner = Miner(
-        bch_address=bch_address,
-        worker_name=worker_name
+    # Одна атомарная вставка: при конфликте по адресу строка не возвращается
+    stmt = (
+        pg_insert(Miner)
+        .values(bch_address=bch_address, worker_name=worker_name)
+        .on_conflict_do_nothing(index_elements=[Miner.bch_address])
+        .returning(*MINER_RESPONSE_COLUMNS)
     )
 
     try:
-        db.add(new_miner)
+        result = await db.execute(stmt)
+        row = result.mappings().first()
         await db.commit()
-        await db.refresh(new_miner)
-
-        # Создаем ответ через Pydantic
-        miner_response = MinerResponse(
-            id=new_miner.id,
-            bch_address=new_miner.bch_address,
-            worker_name=new_miner.worker_name,
-            is_active=new_miner.is_active,
-            total_shares=new_miner.total_shares,
-            total_blocks=new_miner.total_blocks,
-            hashrate=new_miner.hashrate,
-            registered_at=new_miner.created_at
-        )
-
-        return ApiResponse(
-            status="registered",
-            message="Майнер успешно зарегистрирован",
-            data={"miner": miner_response.model_dump()}
-        )
 
     except IntegrityError:
         await db.rollback()
@@ -158,10 +308,26 @@ async def register_miner(
             detail="Ошибка при сохранении майнера"
         )
 
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Майнер с адресом {bch_address} уже зарегистрирован"
+        )
+
+    # Создаем ответ через Pydantic
+    miner_response = MinerResponse(**row)
+
+    return ApiResponse[Dict[str, MinerResponse]](
+        status="registered",
+        message="Майнер успешно зарегистрирован",
+        data={"miner": miner_response}
+    )
+
 @router.get(
     "/{bch_address}",
     summary="Информация о майнере",
-    response_description="Детальная информация о майнере"
+    response_description="Детальная информация о майнере",
+    response_model=None
 )  # Будет /api/v1/miners/{bch_address}
 async def get_miner(
         bch_address: str,
@@ -171,9 +337,9 @@ async def get_miner(
     Получение информации о конкретном майнере по BCH адресу.
     """
     result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
+        select(*MINER_RESPONSE_COLUMNS).where(Miner.bch_address == bch_address)
     )
-    miner = result.scalar_one_or_none()
+    miner = result.mappings().one_or_none()
 
     if not miner:
         raise HTTPException(
@@ -181,25 +347,17 @@ async def get_miner(
             detail=f"Майнер с адресом {bch_address} не найден"
         )
 
-    return {
-        "miner": {
-            "id": miner.id,
-            "bch_address": miner.bch_address,
-            "worker_name": miner.worker_name,
-            "is_active": miner.is_active,
-            "total_shares": miner.total_shares,
-            "total_blocks": miner.total_blocks,
-            "hashrate": miner.hashrate,
-            "registered_at": miner.created_at.isoformat() if hasattr(miner, 'created_at') else None
-        }
-    }
+    # Ответ отдается напрямую в orjson (registered_at сериализуется им же),
+    # минуя проход jsonable_encoder по словарю
+    return ORJSONResponse({"miner": dict(miner)})
 
 
 @router.delete(
     "/{bch_address}",
     status_code=status.HTTP_200_OK,
     summary="Удаление майнера",
-    response_description="Результат удаления майнера"
+    response_description="Результат удаления майнера",
+    response_model=None
 )
 async def delete_miner(
         bch_address: str,
@@ -211,29 +369,32 @@ async def delete_miner(
     - **bch_address**: Адрес Bitcoin Cash майнера
     - **hard_delete**: Полное удаление (false - деактивация, true - удаление из БД)
     """
+    # Мягкое удаление (деактивация) вместо физического удаления:
+    # один UPDATE ... RETURNING id вместо загрузки майнера и отдельного сохранения
     result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
+        update(Miner)
+        .where(Miner.bch_address == bch_address)
+        .values(is_active=False)
+        .returning(Miner.id)
     )
-    miner = result.scalar_one_or_none()
+    miner_id = result.scalar_one_or_none()
 
-    if not miner:
+    if miner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Майнер с адресом {bch_address} не найден"
         )
 
     try:
-        # Мягкое удаление (деактивация) вместо физического удаления
-        miner.is_active = False
         await db.commit()
 
-        return {
+        return ORJSONResponse({
             "status": "deactivated",
             "message": f"Майнер {bch_address} успешно деактивирован",
             "bch_address": bch_address,
             "action": "soft_delete",
             "note": "Майнер деактивирован, но данные сохранены в БД"
-        }
+        })
 
     except Exception as e:
         await db.rollback()
@@ -246,7 +407,8 @@ async def delete_miner(
 @router.put(
     "/{bch_address}/update",
     summary="Обновление данных майнера",
-    response_description="Обновлённые данные майнера"
+    response_description="Обновлённые данные майнера",
+    response_model=None
 )
 async def update_miner(
         bch_address: str,
@@ -261,17 +423,6 @@ async def update_miner(
     - **worker_name**: Новое имя воркера (опционально)
     - **is_active**: Новый статус активности (опционально)
     """
-    result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
-    )
-    miner = result.scalar_one_or_none()
-
-    if not miner:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Майнер с адресом {bch_address} не найден"
-        )
-
     # Обновляем только переданные поля
     update_data = {}
 
@@ -281,11 +432,9 @@ async def update_miner(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Имя воркера должно быть от 1 до 64 символов"
             )
-        miner.worker_name = worker_name
         update_data["worker_name"] = worker_name
 
     if is_active is not None:
-        miner.is_active = is_active
         update_data["is_active"] = is_active
 
     if not update_data:
@@ -295,25 +444,41 @@ async def update_miner(
         )
 
     try:
+        # Один UPDATE ... RETURNING: проверка существования, изменение и чтение нового состояния
+        result = await db.execute(
+            update(Miner)
+            .where(Miner.bch_address == bch_address)
+            .values(**update_data)
+            .returning(
+                Miner.id,
+                Miner.bch_address,
+                Miner.worker_name,
+                Miner.is_active,
+                Miner.total_shares,
+                Miner.total_blocks,
+                Miner.hashrate
+            )
+        )
+        miner = result.mappings().one_or_none()
+
+        if miner is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Майнер с адресом {bch_address} не найден"
+            )
+
         await db.commit()
-        await db.refresh(miner)
 
-        return {
+        return ORJSONResponse({
             "status": "updated",
             "message": f"Данные майнера {bch_address} обновлены",
             "bch_address": bch_address,
             "updated_fields": update_data,
-            "miner": {
-                "id": miner.id,
-                "bch_address": miner.bch_address,
-                "worker_name": miner.worker_name,
-                "is_active": miner.is_active,
-                "total_shares": miner.total_shares,
-                "total_blocks": miner.total_blocks,
-                "hashrate": miner.hashrate
-            }
-        }
+            "miner": dict(miner)
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -331,7 +496,9 @@ async def update_miner(
 async def get_miner_stats(
         bch_address: str,
         time_range: Optional[str] = Query("24h", description="Временной диапазон: 1h, 24h, 7d, 30d, all"),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_db),
+        blocks_db: AsyncSession = Depends(get_db, use_cache=False),
+        now: datetime = Depends(now_utc)
 ):
     """
     Получение детальной статистики по майнеру.
@@ -343,13 +510,14 @@ async def get_miner_stats(
         - 7d: Последние 7 дней
         - 30d: Последние 30 дней
         - all: Вся история
+
+    Запросы шаров и блоков независимы и выполняются параллельно
+    (asyncio.gather); для блоков берётся отдельная сессия.
     """
 
     try:
         # Сначала находим майнера
-        result = await db.execute(
-            select(Miner).where(Miner.bch_address == bch_address)
-        )
+        result = await db.execute(MINER_BY_ADDRESS, {"bch_address": bch_address})
 
         miner = result.scalar_one_or_none()
 
@@ -359,100 +527,73 @@ async def get_miner_stats(
                 detail=f"Майнер с адресом {bch_address} не найден"
             )
 
-        # Допустимые значения
-        valid_time_ranges = {"1h", "24h", "7d", "30d", "all"}
-
         # Если time_range не задан или некорректен, используем по умолчанию
-        if not time_range or time_range not in  valid_time_ranges:
+        if not time_range or time_range not in STATS_VALID_TIME_RANGES:
             time_range = "24h"
 
-        # Определяем временной диапазон
-        now = datetime.now(UTC)
-        time_filters = {
-            "1h": now - timedelta(hours=1),
-            "24h": now - timedelta(days=1),
-            "7d": now - timedelta(days=7),
-            "30d": now - timedelta(days=30),
-            "all": None
-        }
-
-        time_filter = time_filters.get(time_range, time_filters["24h"])
-
-        # Словарь для человекочитаемого формата
-        human_readable_map = {
-            "1h": "последний час",
-            "24h": "последние 24 часа",
-            "7d": "последние 7 дней",
-            "30d": "последние 30 дней",
-            "all": "вся история"
-        }
-
-        human_readable = human_readable_map.get(time_range, "последние 24 часа")
-
-        # ========================== Статистика по шарам
-        shares_query = select(Share).where(Share.miner_address == bch_address)
+        # Определяем временной диапазон (для "all" фильтра нет)
+        delta = STATS_TIME_DELTAS[time_range]
+        # now общий для фильтра и timestamp ответа - границы периода совпадают с меткой
+        time_filter = now - delta if delta else None
+
+        human_readable = STATS_HUMAN_READABLE[time_range]
+
+        # ========================== Статистика по шарам и блокам
+        # Агрегаты считает БД: вместо загрузки всех строк - по одной строке на таблицу
+        valid_share = Share.is_valid.is_(true())
+        shares_query = select(
+            func.count(Share.id).label("total"),
+            func.count(Share.id).filter(valid_share).label("valid"),
+            func.avg(Share.difficulty).filter(valid_share).label("avg_difficulty"),
+            func.sum(Share.difficulty).filter(valid_share).label("total_difficulty"),
+            func.max(Share.submitted_at).label("last_submitted_at")
+        ).where(Share.miner_address == bch_address)
         if time_filter:
             shares_query = shares_query.where(Share.submitted_at >= time_filter)
 
-        result = await db.execute(shares_query)
-        shares = result.scalars().all()
-
-        # Валидные и невалидные шары
-        valid_shares = [s for s in shares if s.is_valid]
-        invalid_shares = [s for s in shares if not s.is_valid]
-
-        # Средняя сложность
-        avg_difficulty = 0
-        if valid_shares:
-            avg_difficulty = sum(s.difficulty for s in valid_shares) / len(valid_shares)
-
-        #==========================================Статистика по блокам
-        blocks_query = select(Block).where(Block.miner_address == bch_address)
+        blocks_query = select(
+            func.count(Block.id).label("total"),
+            func.count(Block.id).filter(Block.confirmed.is_(true())).label("confirmed"),
+            func.max(Block.found_at).label("last_found_at")
+        ).where(Block.miner_address == bch_address)
         if time_filter:
             blocks_query = blocks_query.where(Block.found_at >= time_filter)
 
-        result = await db.execute(blocks_query)
-        blocks = result.scalars().all()
+        shares_result, blocks_result = await asyncio.gather(
+            db.execute(shares_query),
+            blocks_db.execute(blocks_query)
+        )
+        shares_stats = shares_result.one()
+        blocks_stats = blocks_result.one()
+
+        total_shares = shares_stats.total or 0
+        valid_shares = shares_stats.valid or 0
+        avg_difficulty = float(shares_stats.avg_difficulty or 0)
 
-        # Подтверждённые блоки
-        confirmed_blocks = [b for b in blocks if b.confirmed]
+        total_blocks = blocks_stats.total or 0
+        confirmed_blocks = blocks_stats.confirmed or 0
 
         #================================ Рассчитываем хэшрейт (упрощённо)
         hashrate_calc = 0.0
         if valid_shares and time_range != "all":
-            # Примерная формула: сумма сложности / время в секундах
-            total_difficulty = sum(s.difficulty for s in valid_shares)
-
-            time_seconds_map = {
-                "1h": 3600,
-                "24h": 86400,
-                "7d": 604800,
-                "30d": 2592000
-            }
+            time_seconds = STATS_TIME_DELTAS[time_range].total_seconds()
 
+            # Примерная формула: сумма сложности / время в секундах
+            # Каждый шар с difficulty 1.0 соответствует 2^32 хэшей
+            hashes_per_share = 2 ** 32  # 4,294,967,296
+            total_hashes = float(shares_stats.total_difficulty or 0) * hashes_per_share
+            hashrate_calc = total_hashes / time_seconds
 
-            time_seconds = time_seconds_map.get(time_range, 86400)
-
-            if time_seconds is None:
-                time_seconds = 86400  # default fallback
-
-            if valid_shares and time_seconds is not None and time_seconds > 0:
-                # Примерная формула: сумма сложности / время в секундах
-                # Каждый шар с difficulty 1.0 соответствует 2^32 хэшей
-                hashes_per_share = 2 ** 32  # 4,294,967,296
-                total_hashes = sum(s.difficulty * hashes_per_share for s in valid_shares)
-                hashrate_calc = total_hashes / time_seconds
-
-                # Форматируем ответ через ApiResponse
         return ApiResponse(
             status="success",
             message=f"Статистика майнера {bch_address} получена",
+            timestamp=now,
             data={
                 "miner": {
                     "bch_address": miner.bch_address,
                     "worker_name": miner.worker_name,
                     "is_active": miner.is_active,
-                    "registered_at": miner.created_at.isoformat() if hasattr(miner, 'created_at') else None
+                    "registered_at": miner.created_at.isoformat() if miner.created_at is not None else None
                 },
                 "time_range": {
                     "selected": time_range,
@@ -460,17 +601,17 @@ async def get_miner_stats(
                 },
                 "statistics": {
                     "shares": {
-                        "total": len(shares),
-                        "valid": len(valid_shares),
-                        "invalid": len(invalid_shares),
-                        "validity_rate": len(valid_shares) / len(shares) if shares else 0,
+                        "total": total_shares,
+                        "valid": valid_shares,
+                        "invalid": total_shares - valid_shares,
+                        "validity_rate": valid_shares / total_shares if total_shares else 0,
                         "avg_difficulty": avg_difficulty
                     },
                     "blocks": {
-                        "total": len(blocks),
-                        "confirmed": len(confirmed_blocks),
-                        "unconfirmed": len(blocks) - len(confirmed_blocks),
-                        "confirmation_rate": len(confirmed_blocks) / len(blocks) if blocks else 0
+                        "total": total_blocks,
+                        "confirmed": confirmed_blocks,
+                        "unconfirmed": total_blocks - confirmed_blocks,
+                        "confirmation_rate": confirmed_blocks / total_blocks if total_blocks else 0
                     },
                     "performance": {
                         "total_shares": miner.total_shares,
@@ -481,8 +622,8 @@ async def get_miner_stats(
                     }
                 },
                 "recent_activity": {
-                    "last_share": shares[-1].submitted_at.isoformat() if shares else None,
-                    "last_block": blocks[-1].found_at.isoformat() if blocks else None
+                    "last_share": shares_stats.last_submitted_at.isoformat() if shares_stats.last_submitted_at else None,
+                    "last_block": blocks_stats.last_found_at.isoformat() if blocks_stats.last_found_at else None
                 }
             }
         )
@@ -490,7 +631,13 @@ async def get_miner_stats(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Ошибка получения статистики майнера {bch_address}: {e}")
+        logger.error(
+            "Ошибка получения статистики майнера",
+            event="miner_stats_error",
+            bch_address=bch_address,
+            error=str(e),
+            error_type=type(e).__name__
+        )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Внутренняя ошибка при получении статистики: {str(e)}"
@@ -500,28 +647,35 @@ async def get_miner_stats(
 @router.get(
     "/{bch_address}/shares",
     summary="Шары майнера",
-    response_description="Список шаров (shares) майнера"
+    response_description="Список шаров (shares) майнера",
+    response_model=None
 )
 async def get_miner_shares(
         bch_address: str,
-        skip: int = 0,
-        limit: int = 50,
+        skip: int = Query(0, ge=0, deprecated=True, description="Сколько записей пропустить (устарело, используйте before)"),
+        limit: int = Query(50, ge=1, le=MAX_PAGINATION_LIMIT),
+        before: Optional[datetime] = Query(None, description="Курсор: submitted_at последнего шара предыдущей страницы"),
+        before_id: Optional[int] = Query(None, ge=0, description="Курсор: id последнего шара предыдущей страницы"),
         valid_only: bool = False,
-        db: AsyncSession = Depends(get_db)
+        session_factory: Callable[[], AsyncSession] = Depends(get_db_session_factory)
 ):
     """
     Получение списка шаров майнера.
 
     - **bch_address**: Адрес Bitcoin Cash майнера
-    - **skip**: Пропустить первых N записей
+    - **skip**: Пропустить первых N записей (устарело)
     - **limit**: Максимальное количество записей
+    - **before**: Курсор - next_cursor предыдущей страницы
+    - **before_id**: Курсор - next_cursor_id предыдущей страницы
     - **valid_only**: Только валидные шары
     """
-    # Проверяем существование майнера
-    result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
-    )
-    miner = result.scalar_one_or_none()
+    # Проверяем существование майнера - нужно только имя воркера.
+    # Короткая сессия закрывается до начала потока
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Miner.worker_name).where(Miner.bch_address == bch_address)
+        )
+        miner = result.first()
 
     if not miner:
         raise HTTPException(
@@ -535,57 +689,75 @@ async def get_miner_shares(
     if valid_only:
         query = query.where(Share.is_valid == True)
 
-    query = query.order_by(Share.submitted_at.desc()).offset(skip).limit(limit)
+    # Keyset пагинация: WHERE (submitted_at, id) < (before, before_id) по индексу
+    # (miner_address, submitted_at), стоимость страницы не зависит от глубины.
+    # id разделяет шары с одинаковым submitted_at на границе страниц
+    if before is not None:
+        before = _cursor_for_column(before, Share.submitted_at)
+        if before_id is not None:
+            query = query.where(tuple_(Share.submitted_at, Share.id) < tuple_(before, before_id))
+        else:
+            query = query.where(Share.submitted_at < before)
+    elif skip:
+        logger.warning(
+            "Используется устаревшая пагинация через skip",
+            event="miner_shares_offset_pagination",
+            skip=skip
+        )
+        query = query.offset(skip)
 
-    result = await db.execute(query)
-    shares = result.scalars().all()
+    query = query.order_by(Share.submitted_at.desc(), Share.id.desc()).limit(limit)
+    query = query.execution_options(yield_per=MINERS_STREAM_BATCH_SIZE)
 
-    return {
+    envelope = {
         "miner": bch_address,
         "worker_name": miner.worker_name,
-        "shares_count": len(shares),
         "skip": skip,
+        "before": before,
+        "before_id": before_id,
         "limit": limit,
-        "valid_only": valid_only,
-        "shares": [
-            {
-                "id": s.id,
-                "job_id": s.job_id,
-                "difficulty": s.difficulty,
-                "is_valid": s.is_valid,
-                "submitted_at": s.submitted_at.isoformat(),
-                "time_ago": humanize_time_ago(s.submitted_at) if hasattr(s, 'submitted_at') else None
-            }
-            for s in shares
-        ]
+        "valid_only": valid_only
     }
+    return StreamingResponse(
+        _stream_partitions_json(
+            envelope, "shares", "shares_count", session_factory, query, _SHARES_ADAPTER, "submitted_at", limit
+        ),
+        media_type="application/json"
+    )
 
 
 @router.get(
     "/{bch_address}/blocks",
     summary="Блоки майнера",
-    response_description="Список найденных блоков майнера"
+    response_description="Список найденных блоков майнера",
+    response_model=None
 )
 async def get_miner_blocks(
         bch_address: str,
-        skip: int = 0,
-        limit: int = 20,
+        skip: int = Query(0, ge=0, deprecated=True, description="Сколько записей пропустить (устарело, используйте before)"),
+        limit: int = Query(20, ge=1, le=MAX_PAGINATION_LIMIT),
+        before: Optional[datetime] = Query(None, description="Курсор: found_at последнего блока предыдущей страницы"),
+        before_id: Optional[int] = Query(None, ge=0, description="Курсор: id последнего блока предыдущей страницы"),
         confirmed_only: bool = False,
-        db: AsyncSession = Depends(get_db)
+        session_factory: Callable[[], AsyncSession] = Depends(get_db_session_factory)
 ):
     """
     Получение списка блоков, найденных майнером.
 
     - **bch_address**: Адрес Bitcoin Cash майнера
-    - **skip**: Пропустить первых N записей
+    - **skip**: Пропустить первых N записей (устарело)
     - **limit**: Максимальное количество записей
+    - **before**: Курсор - next_cursor предыдущей страницы
+    - **before_id**: Курсор - next_cursor_id предыдущей страницы
     - **confirmed_only**: Только подтверждённые блоки
     """
-    # Проверяем существование майнера
-    result = await db.execute(
-        select(Miner).where(Miner.bch_address == bch_address)
-    )
-    miner = result.scalar_one_or_none()
+    # Проверяем существование майнера - нужно только имя воркера.
+    # Короткая сессия закрывается до начала потока
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Miner.worker_name).where(Miner.bch_address == bch_address)
+        )
+        miner = result.first()
 
     if not miner:
         raise HTTPException(
@@ -599,27 +771,38 @@ async def get_miner_blocks(
     if confirmed_only:
         query = query.where(Block.confirmed == True)
 
-    query = query.order_by(Block.found_at.desc()).offset(skip).limit(limit)
+    # Keyset пагинация: WHERE (found_at, id) < (before, before_id) по индексу
+    # (miner_address, found_at), стоимость страницы не зависит от глубины.
+    # found_at хранится без зоны (naive UTC) - курсор приводится к тому же виду
+    if before is not None:
+        before = _cursor_for_column(before, Block.found_at)
+        if before_id is not None:
+            query = query.where(tuple_(Block.found_at, Block.id) < tuple_(before, before_id))
+        else:
+            query = query.where(Block.found_at < before)
+    elif skip:
+        logger.warning(
+            "Используется устаревшая пагинация через skip",
+            event="miner_blocks_offset_pagination",
+            skip=skip
+        )
+        query = query.offset(skip)
 
-    result = await db.execute(query)
-    blocks = result.scalars().all()
+    query = query.order_by(Block.found_at.desc(), Block.id.desc()).limit(limit)
+    query = query.execution_options(yield_per=MINERS_STREAM_BATCH_SIZE)
 
-    return {
+    envelope = {
         "miner": bch_address,
         "worker_name": miner.worker_name,
-        "blocks_count": len(blocks),
         "skip": skip,
+        "before": before,
+        "before_id": before_id,
         "limit": limit,
-        "confirmed_only": confirmed_only,
-        "blocks": [
-            {
-                "id": b.id,
-                "height": b.height,
-                "hash": b.hash,
-                "confirmed": b.confirmed,
-                "found_at": b.found_at.isoformat(),
-                "time_ago": humanize_time_ago(b.found_at) if hasattr(b, 'found_at') else None
-            }
-            for b in blocks
-        ]
+        "confirmed_only": confirmed_only
     }
+    return StreamingResponse(
+        _stream_partitions_json(
+            envelope, "blocks", "blocks_count", session_factory, query, _BLOCKS_ADAPTER, "found_at", limit
+        ),
+        media_type="application/json"
+    )
@@ -1,13 +1,17 @@
-from datetime import datetime, UTC
+from datetime import datetime
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncContextManager, Callable
+
+from sqlalchemy.ext.asyncio import AsyncConnection
 from sqlalchemy import func, select, true
 
 from app.utils.logging_config import StructuredLogger
+from app.utils.response_cache import cached
 
 from app.schemas.models import ApiResponse
-from app.models.database import get_db
+from app.models.database import get_db_connector
+from app.dependencies import now_utc
 from app.models.miner import Miner
 from app.models.share import Share
 from app.models.block import Block
@@ -16,22 +20,36 @@ logger = StructuredLogger(__name__)
 
 router = APIRouter(prefix="/pool", tags=["pool"])
 
+# Агрегаты пула одинаковы для всех клиентов и меняются медленно
+POOL_CACHE_NAMESPACE = "pool"
+POOL_STATS_CACHE_TTL = 10  # секунды
+
+
+def _is_success(response: ApiResponse) -> bool:
+    """Ответы об ошибке не кэшируем"""
+    return response.status == "success"
+
 
 @router.get("/", response_model=ApiResponse)
-async def pool_root():
+async def pool_root(now: datetime = Depends(now_utc)):
     return ApiResponse(
         status="success",
         message="Pool API доступен",
+        timestamp=now,
         data={
             "endpoints": ["/stats", "/hashrate"],
             "service": "BCH Solo Pool",
-            "timestamp": datetime.now(UTC).isoformat()
+            "timestamp": now.isoformat()
         }
     )
 
 
 @router.get("/stats", response_model=ApiResponse)
-async def pool_stats(db: AsyncSession = Depends(get_db)):
+@cached(namespace=POOL_CACHE_NAMESPACE, expire=POOL_STATS_CACHE_TTL, cache_if=_is_success)
+async def pool_stats(
+        connect: Callable[[], AsyncContextManager[AsyncConnection]] = Depends(get_db_connector),
+        now: datetime = Depends(now_utc)
+):
     """
     Получение общей статистики пула:
     - Количество майнеров
@@ -41,37 +59,40 @@ async def pool_stats(db: AsyncSession = Depends(get_db)):
     """
     try:
         logger.debug("Запрос статистики пула")
-        # Количество майнеров
-        result = await db.execute(select(func.count(Miner.id)))
-        total_miners = result.scalar() or 0
-
-        # Активные майнеры
-        result = await db.execute(select(func.count(Miner.id)).where(Miner.is_active.is_(true())))
-        active_miners = result.scalar() or 0
-
-        # Общее количество шаров
-        result = await db.execute(select(func.count(Share.id)))
-        total_shares = result.scalar() or 0
-
-        # Валидные шары
-        result = await db.execute(select(func.count(Share.id)).where(Share.is_valid.is_(true())))
-        valid_shares = result.scalar() or 0
-
-        # Количество блоков
-        result = await db.execute(select(func.count(Block.id)))
-        total_blocks = result.scalar() or 0
-
-        # Подтверждённые блоки
-        result = await db.execute(select(func.count(Block.id)).where(Block.confirmed.is_(true())))
-        confirmed_blocks = result.scalar() or 0
 
-        # Общий хэшрейт
-        result = await db.execute(select(func.sum(Miner.hashrate)))
-        total_hashrate = float(result.scalar() or 0.0)
+        # Все счетчики одним запросом: по одной агрегатной строке на таблицу
+        # (COUNT ... FILTER), три однострочных подзапроса соединяются в одну строку
+        miners_stats = select(
+            func.count(Miner.id).label("total_miners"),
+            func.count(Miner.id).filter(Miner.is_active.is_(true())).label("active_miners"),
+            func.coalesce(func.sum(Miner.hashrate), 0.0).label("total_hashrate")
+        ).subquery()
+        shares_stats = select(
+            func.count(Share.id).label("total_shares"),
+            func.count(Share.id).filter(Share.is_valid.is_(true())).label("valid_shares")
+        ).subquery()
+        blocks_stats = select(
+            func.count(Block.id).label("total_blocks"),
+            func.count(Block.id).filter(Block.confirmed.is_(true())).label("confirmed_blocks")
+        ).subquery()
+
+        # Соединение берем только здесь - на попадании в кэш сюда не доходим
+        async with connect() as db:
+            result = await db.execute(select(miners_stats, shares_stats, blocks_stats))
+            stats = result.one()
+
+        total_miners = stats.total_miners or 0
+        active_miners = stats.active_miners or 0
+        total_shares = stats.total_shares or 0
+        valid_shares = stats.valid_shares or 0
+        total_blocks = stats.total_blocks or 0
+        confirmed_blocks = stats.confirmed_blocks or 0
+        total_hashrate = float(stats.total_hashrate or 0.0)
 
         return ApiResponse(
             status="success",
             message="Статистика пула получена",
+            timestamp=now,
             data={
                 "pool": {
                     "miners": {
@@ -96,7 +117,7 @@ async def pool_stats(db: AsyncSession = Depends(get_db)):
                         "unit": "H/s"
                     }
                 },
-                "timestamp": datetime.now(UTC).isoformat()
+                "timestamp": now.isoformat()
             }
         )
 
@@ -109,24 +130,30 @@ async def pool_stats(db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/hashrate", response_model=ApiResponse)
-async def pool_hashrate(db: AsyncSession = Depends(get_db)):
+@cached(namespace=POOL_CACHE_NAMESPACE, expire=POOL_STATS_CACHE_TTL, cache_if=_is_success)
+async def pool_hashrate(
+        connect: Callable[[], AsyncContextManager[AsyncConnection]] = Depends(get_db_connector),
+        now: datetime = Depends(now_utc)
+):
     """
     Получение суммарного хэшрейта всех майнеров пула.
     """
     try:
-        result = await db.execute(select(func.sum(Miner.hashrate)))
-        total_hashrate = result.scalar() or 0.0
+        async with connect() as db:
+            result = await db.execute(select(func.sum(Miner.hashrate)))
+            total_hashrate = result.scalar() or 0.0
 
         return ApiResponse(
             status="success",
             message="Хэшрейт пула получен",
+            timestamp=now,
             data={
                 "hashrate": {
                     "total": float(total_hashrate),
                     "unit": "H/s",
                     "formatted": f"{total_hashrate:,.2f} H/s"
                 },
-                "timestamp": datetime.now(UTC).isoformat()
+                "timestamp": now.isoformat()
             }
         )
     except Exception as e:
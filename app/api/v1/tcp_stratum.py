@@ -1,105 +1,104 @@
 """TCP Stratum API endpoints"""
-from datetime import datetime, UTC
+from datetime import datetime
 
 from app.utils.logging_config import StructuredLogger
 
-from fastapi import APIRouter, HTTPException, status
-from app.schemas.models import ApiResponse
-from app.dependencies import tcp_stratum_server
+import orjson
+from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse, Response
+from app.schemas.models import ApiResponse, api_response_content
+from app.dependencies import get_tcp_stratum_server, now_utc
+from app.stratum.tcp_server import StratumTCPServer
 
 logger = StructuredLogger(__name__)
 
 router = APIRouter(prefix="/tcp-stratum", tags=["tcp-stratum"])
 
-
-@router.get("/stats", response_model=ApiResponse)
-async def get_tcp_stratum_stats():
-    """Статистика TCP Stratum сервера"""
-    try:
-        logger.debug("Запрос статистики TCP Stratum")
-        return ApiResponse(
-            status="success",
-            message="Статистика TCP Stratum сервера получена",
-            data={
-                "status": "running",
-                "host": tcp_stratum_server.host,
-                "port": tcp_stratum_server.port,
-                "active_connections": len(tcp_stratum_server.connections),
-                "active_miners": len(tcp_stratum_server.miners),
-                "protocol": "stratum+tcp",
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка получения статистики TCP сервера: {str(e)}"
-        )
+# Неизменная часть ответа /stats (до объекта data), кодируется один раз
+_STATS_RESPONSE_PREFIX = (
+    b'{"status":"success","message":'
+    + orjson.dumps("Статистика TCP Stratum сервера получена")
+    + b',"data":'
+)
 
 
-@router.get("/connections", response_model=ApiResponse)
-async def get_tcp_connections():
-    """Список активных TCP подключений"""
-    try:
-        connections = []
-        for client_id, writer in tcp_stratum_server.connections.items():
-            miner_address = tcp_stratum_server.miners.get(client_id, "unknown")
+@router.get("/stats", response_model=ApiResponse)
+async def get_tcp_stratum_stats(
+        tcp_stratum_server: StratumTCPServer = Depends(get_tcp_stratum_server),
+        now: datetime = Depends(now_utc)
+):
+    """
+    Статистика TCP Stratum сервера.
 
-            # Получаем информацию о подключении
-            try:
-                peername = writer.get_extra_info('peername')
-                remote_address = f"{peername[0]}:{peername[1]}" if peername else "unknown"
-            except Exception as e:
+    Эндпоинт опрашивается дашбордами и делит event loop со stratum
+    клиентами, поэтому работы на запрос минимум: счетчики приходят из кэша
+    сервера уже закодированными в JSON (кэш сбрасывается при подключениях),
+    и на запрос кодируется только timestamp - ответ склеивается из байтов.
+    Ошибки отдает глобальный обработчик исключений (app.main).
+    """
+    logger.debug("Запрос статистики TCP Stratum")
+    timestamp = orjson.dumps(now)
+    # {"status":...,"data":{<счетчики>,"timestamp":...},"timestamp":...,"request_id":null}
+    content = (
+        _STATS_RESPONSE_PREFIX
+        + tcp_stratum_server.stats_payload_json()[:-1]
+        + b',"timestamp":' + timestamp
+        + b'},"timestamp":' + timestamp
+        + b',"request_id":null}'
+    )
+    return Response(content, media_type="application/json")
 
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Ошибка получения remote_address: {str(e)}"
-                )
 
-            connections.append({
-                "client_id": client_id,
-                "miner_address": miner_address,
-                "remote_address": remote_address,
-                "connection_time": datetime.now(UTC).isoformat()
-            })
+@router.get("/connections", response_model=ApiResponse)
+async def get_tcp_connections(
+        tcp_stratum_server: StratumTCPServer = Depends(get_tcp_stratum_server),
+        now: datetime = Depends(now_utc)
+):
+    """Список активных TCP подключений (ответ кодируется orjson без валидации ApiResponse)"""
+    # Один синхронный снимок вместо обхода живых словарей сервера;
+    # адреса и время подключения в нем уже отформатированы
+    connections = [
+        {
+            "client_id": client_id,
+            "miner_address": miner_address,
+            "remote_address": remote_address,
+            "connection_time": connection_time
+        }
+        for client_id, remote_address, miner_address, connection_time
+        in tcp_stratum_server.snapshot_connections()
+    ]
 
-        return ApiResponse(
-            status="success",
-            message="Список TCP подключений получен",
-            data={
-                "total": len(connections),
-                "connections": connections,
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка получения списка подключений: {str(e)}"
-        )
+    return ORJSONResponse(api_response_content(
+        "success",
+        "Список TCP подключений получен",
+        {
+            "total": len(connections),
+            "connections": connections,
+            "timestamp": now.isoformat()
+        },
+        timestamp=now
+    ))
 
 
 @router.get("/health", response_model=ApiResponse)
-async def check_tcp_stratum_health():
-    """Проверка здоровья TCP Stratum сервера"""
-    try:
-        is_running = tcp_stratum_server.server is not None and tcp_stratum_server.server.is_serving()
+async def check_tcp_stratum_health(
+        tcp_stratum_server: StratumTCPServer = Depends(get_tcp_stratum_server),
+        now: datetime = Depends(now_utc)
+):
+    """Проверка здоровья TCP Stratum сервера (ответ кодируется orjson без валидации ApiResponse)"""
+    is_running = tcp_stratum_server.server is not None and tcp_stratum_server.server.is_serving()
 
-        return ApiResponse(
-            status="success",
-            message="Статус TCP Stratum сервера проверен",
-            data={
-                "status": "running" if is_running else "stopped",
-                "host": tcp_stratum_server.host,
-                "port": tcp_stratum_server.port,
-                "active_connections": len(tcp_stratum_server.connections),
-                "uptime_seconds": (datetime.now(UTC) - tcp_stratum_server.start_time).total_seconds() if hasattr(
-                    tcp_stratum_server, 'start_time') else 0,
-                "timestamp": datetime.now(UTC).isoformat()
-            }
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ошибка проверки здоровья TCP сервера: {str(e)}"
-        )
\ No newline at end of file
+    return ORJSONResponse(api_response_content(
+        "success",
+        "Статус TCP Stratum сервера проверен",
+        {
+            "status": "running" if is_running else "stopped",
+            "host": tcp_stratum_server.host,
+            "port": tcp_stratum_server.port,
+            "active_connections": len(tcp_stratum_server.connections),
+            "uptime_seconds": (now - tcp_stratum_server.start_time).total_seconds() if hasattr(
+                tcp_stratum_server, 'start_time') else 0,
+            "timestamp": now.isoformat()
+        },
+        timestamp=now
+    ))
\ No newline at end of file
@@ -1,208 +1,233 @@
 """Единый контейнер зависимостей для всего приложения"""
+from datetime import datetime, UTC
+from functools import cached_property
+
 from app.utils.logging_config import StructuredLogger
-from app.utils.network_config import NetworkManager
-from app.stratum.block_builder import BlockBuilder
-from app.services.difficulty_service import DifficultyService
-from app.services.auth_service import AuthService
-from app.services.database_service import DatabaseService
-from app.stratum.validator import ShareValidator
-from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE
-from app.services.job_service import JobService
-from app.jobs.manager import JobManager
-from app.stratum.websocket_server import StratumServer
-from app.stratum.tcp_server import StratumTCPServer
 
 logger = StructuredLogger(__name__)
 
 
 class DependencyContainer:
-    """Контейнер для управления зависимостями"""
+    """
+    Контейнер для управления зависимостями.
+
+    Модули сервисов импортируются внутри cached_property: импорт
+    app.dependencies не тянет весь стек stratum/валидатора/BlockBuilder,
+    он загружается при первом обращении (или в warmup при старте).
+    """
+
+    # Все сервисы контейнера в порядке зависимостей (для warmup и статистики)
+    SERVICES = (
+        "network_manager",
+        "block_builder",
+        "database_service",
+        "auth_service",
+        "share_validator",
+        "job_service",
+        "job_manager",
+        "stratum_server",
+        "tcp_stratum_server",
+        "difficulty_service",
+    )
 
     def __init__(self):
-        self._auth_service = None
-        self._database_service = None
-        self._job_service = None
-        self._share_validator = None
-        self._job_manager = None
-        self._stratum_server = None
-        self._tcp_stratum_server = None
-        self._difficulty_service = None
-        self._network_manager = None
-        self._block_builder = None
-
+        # Сервисы создаются лениво через cached_property: после первого
+        # обращения значение лежит в __dict__ экземпляра и читается как обычный атрибут
         logger.info(
             "DependencyContainer инициализирован",
             event="dependencies_container_created"
         )
 
     # === NETWORK MANAGER ===
-    @property
+    @cached_property
     def network_manager(self):
-        if self._network_manager is None:
-            self._network_manager = NetworkManager()
-            logger.info(
-                "NetworkManager создан",
-                event="network_manager_created",
-                network=self._network_manager.network
-            )
-        return self._network_manager
+        from app.utils.network_config import NetworkManager
+
+        network_manager = NetworkManager()
+        logger.info(
+            "NetworkManager создан",
+            event="network_manager_created",
+            network=network_manager.network
+        )
+        return network_manager
 
     # === BLOCK BUILDER ===
-    @property
+    @cached_property
     def block_builder(self):
-        if self._block_builder is None:
-            self._block_builder = BlockBuilder(network_manager=self.network_manager)
-            logger.info(
-                "BlockBuilder создан",
-                event="block_builder_created",
-                has_network_manager=self.network_manager is not None
-            )
-        return self._block_builder
+        from app.stratum.block_builder import BlockBuilder
+
+        block_builder = BlockBuilder(network_manager=self.network_manager)
+        logger.info(
+            "BlockBuilder создан",
+            event="block_builder_created",
+            has_network_manager=self.network_manager is not None
+        )
+        return block_builder
 
     # === DATABASE SERVICE (не зависит от других) ===
-    @property
+    @cached_property
     def database_service(self):
-        if self._database_service is None:
-            self._database_service = DatabaseService()
-            logger.info(
-                "DatabaseService создан",
-                event="database_service_created"
-            )
-        return self._database_service
+        from app.services.database_service import DatabaseService
+
+        database_service = DatabaseService()
+        logger.info(
+            "DatabaseService создан",
+            event="database_service_created"
+        )
+        return database_service
 
     # === AUTH SERVICE (зависит только от database) ===
-    @property
+    @cached_property
     def auth_service(self):
-        if self._auth_service is None:
-            self._auth_service = AuthService(database_service=self.database_service)
-            logger.info(
-                "AuthService создан",
-                event="auth_service_created"
-            )
-        return self._auth_service
+        from app.services.auth_service import AuthService
+
+        auth_service = AuthService(database_service=self.database_service)
+        logger.info(
+            "AuthService создан",
+            event="auth_service_created"
+        )
+        return auth_service
 
     # === SHARE VALIDATOR (временно без difficulty) ===
-    @property
+    @cached_property
     def share_validator(self):
-        if self._share_validator is None:
-            # Используем временную сложность 1.0, потом обновим
-            self._share_validator = ShareValidator(
-                target_difficulty=1.0,  # Временное значение
-                extra_nonce2_size=EXTRA_NONCE2_SIZE,
-                extra_nonce1=STRATUM_EXTRA_NONCE1
-            )
-            logger.info(
-                "ShareValidator создан",
-                event="share_validator_created",
-                target_difficulty=1.0,
-                extra_nonce2_size=EXTRA_NONCE2_SIZE
-            )
-        return self._share_validator
+        from app.stratum.validator import ShareValidator
+        from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE
+
+        # Используем временную сложность 1.0, потом обновим
+        share_validator = ShareValidator(
+            target_difficulty=1.0,  # Временное значение
+            extra_nonce2_size=EXTRA_NONCE2_SIZE,
+            extra_nonce1=STRATUM_EXTRA_NONCE1
+        )
+        logger.info(
+            "ShareValidator создан",
+            event="share_validator_created",
+            target_difficulty=1.0,
+            extra_nonce2_size=EXTRA_NONCE2_SIZE
+        )
+        return share_validator
 
     # === JOB SERVICE ===
-    @property
+    @cached_property
     def job_service(self):
-        if self._job_service is None:
-            self._job_service = JobService(
-                validator=self.share_validator,
-                network_manager=self.network_manager
-            )
-            logger.info(
-                "JobService создан",
-                event="job_service_created",
-                has_validator=self.share_validator is not None
-            )
-        return self._job_service
+        from app.services.job_service import JobService
+
+        job_service = JobService(
+            validator=self.share_validator,
+            network_manager=self.network_manager
+        )
+        logger.info(
+            "JobService создан",
+            event="job_service_created",
+            has_validator=self.share_validator is not None
+        )
+        return job_service
 
     # === JOB MANAGER ===
-    @property
+    @cached_property
     def job_manager(self):
-        if self._job_manager is None:
-            self._job_manager = JobManager(
-                job_service=self.job_service,
-                block_builder=self.block_builder
-            )
-            logger.info(
-                "JobManager создан",
-                event="job_manager_created",
-                has_node_client=self._job_manager.node_client is not None
-            )
-        return self._job_manager
+        from app.jobs.manager import JobManager
+
+        job_manager = JobManager(
+            job_service=self.job_service,
+            block_builder=self.block_builder
+        )
+        logger.info(
+            "JobManager создан",
+            event="job_manager_created",
+            has_node_client=job_manager.node_client is not None
+        )
+        return job_manager
 
     # === STRATUM SERVER ===
-    @property
+    @cached_property
     def stratum_server(self):
-        if self._stratum_server is None:
-            self._stratum_server = StratumServer(
-                job_manager=self.job_manager,
-                auth_service=self.auth_service,
-                database_service=self.database_service,
-                job_service=self.job_service
-            )
-            logger.info(
-                "StratumServer создан",
-                event="stratum_server_created",
-                has_job_manager=self.job_manager is not None
-            )
-        return self._stratum_server
+        from app.stratum.websocket_server import StratumServer
+
+        stratum_server = StratumServer(
+            job_manager=self.job_manager,
+            auth_service=self.auth_service,
+            database_service=self.database_service,
+            job_service=self.job_service
+        )
+        logger.info(
+            "StratumServer создан",
+            event="stratum_server_created",
+            has_job_manager=self.job_manager is not None
+        )
+        return stratum_server
 
     # === TCP STRATUM SERVER ===
-    @property
+    @cached_property
     def tcp_stratum_server(self):
-        if self._tcp_stratum_server is None:
-            self._tcp_stratum_server = StratumTCPServer(
-                auth_service=self.auth_service,
-                database_service=self.database_service,
-                job_service=self.job_service
-            )
-            logger.info(
-                "TcpStratumServer создан",
-                event="tcp_stratum_server_created",
-                host=self._tcp_stratum_server.host,
-                port=self._tcp_stratum_server.port
-            )
-        return self._tcp_stratum_server
+        from app.stratum.tcp_server import StratumTCPServer
+        from app.utils.config import settings
+
+        tcp_stratum_server = StratumTCPServer(
+            host=settings.stratum_host,
+            port=settings.stratum_port,
+            auth_service=self.auth_service,
+            database_service=self.database_service,
+            job_service=self.job_service
+        )
+        logger.info(
+            "TcpStratumServer создан",
+            event="tcp_stratum_server_created",
+            host=tcp_stratum_server.host,
+            port=tcp_stratum_server.port
+        )
+        return tcp_stratum_server
 
     # === DIFFICULTY SERVICE  ===
-    @property
+    @cached_property
     def difficulty_service(self):
-        if self._difficulty_service is None:
-            self._difficulty_service = DifficultyService(
-                network_manager=self.network_manager,
-                stratum_server=self.stratum_server,
-                tcp_stratum_server=self.tcp_stratum_server
-            )
+        from app.services.difficulty_service import DifficultyService
 
-            # После создания difficulty_service, обновляем share_validator
-            if self._share_validator:
-                self._share_validator.target_difficulty = self._difficulty_service.current_difficulty
-                logger.info(
-                    "ShareValidator обновлен актуальной сложностью",
-                    event="share_validator_updated",
-                    new_difficulty=self._difficulty_service.current_difficulty
-                )
+        difficulty_service = DifficultyService(
+            network_manager=self.network_manager,
+            stratum_server=self.stratum_server,
+            tcp_stratum_server=self.tcp_stratum_server
+        )
+        # Серверы сами сообщают о подключениях - без опроса их словарей
+        difficulty_service.track_connections(self.stratum_server, self.tcp_stratum_server)
 
+        # После создания difficulty_service, обновляем share_validator (если он уже создан)
+        share_validator = self.__dict__.get("share_validator")
+        if share_validator:
+            share_validator.target_difficulty = difficulty_service.current_difficulty
             logger.info(
-                "DifficultyService создан",
-                event="difficulty_service_created",
-                current_difficulty=self._difficulty_service.current_difficulty,
-                network=self._difficulty_service.network_manager.network
+                "ShareValidator обновлен актуальной сложностью",
+                event="share_validator_updated",
+                new_difficulty=difficulty_service.current_difficulty
             )
-        return self._difficulty_service
+
+        logger.info(
+            "DifficultyService создан",
+            event="difficulty_service_created",
+            current_difficulty=difficulty_service.current_difficulty,
+            network=difficulty_service.network_manager.network
+        )
+        return difficulty_service
+
+    def warmup(self) -> None:
+        """
+        Создать все сервисы заранее (вызывается при старте приложения),
+        чтобы первые запросы не строили их конкурентно
+        """
+        for name in self.SERVICES:
+            getattr(self, name)
+
+        logger.info(
+            "Сервисы DependencyContainer созданы",
+            event="dependencies_warmed_up",
+            services=len(self.SERVICES)
+        )
 
     def get_stats(self) -> dict:
         """Получить статистику всех сервисов"""
-        stats = {
-            "auth_service": self._auth_service is not None,
-            "database_service": self._database_service is not None,
-            "job_service": self._job_service is not None,
-            "share_validator": self._share_validator is not None,
-            "job_manager": self._job_manager is not None,
-            "stratum_server": self._stratum_server is not None,
-            "tcp_stratum_server": self._tcp_stratum_server is not None,
-            "difficulty_service": self._difficulty_service is not None,
-            "network_manager": self._network_manager is not None,
-        }
+        # Созданный cached_property хранится в __dict__ экземпляра
+        stats = {name: name in self.__dict__ for name in self.SERVICES}
 
         logger.debug(
             "Получение статистики DependencyContainer",
@@ -217,14 +242,12 @@ class DependencyContainer:
 # Глобальный экземпляр контейнера
 container = DependencyContainer()
 
-# Удобные алиасы
-auth_service = container.auth_service
-database_service = container.database_service
-share_validator = container.share_validator
-job_service = container.job_service
-job_manager = container.job_manager
-stratum_server = container.stratum_server
-tcp_stratum_server = container.tcp_stratum_server
-difficulty_service = container.difficulty_service
-network_manager = container.network_manager
-block_builder = container.block_builder
\ No newline at end of file
+
+async def get_tcp_stratum_server():
+    """FastAPI-зависимость: TCP Stratum сервер из контейнера (подменяется в тестах)"""
+    return container.tcp_stratum_server
+
+
+async def now_utc() -> datetime:
+    """FastAPI-зависимость: текущее время UTC, одно на весь запрос (async — без перехода в threadpool)"""
+    return datetime.now(UTC)
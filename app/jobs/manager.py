@@ -1,11 +1,20 @@
 import asyncio
+import functools
+import logging
+import random
 import time
 
-from typing import Optional, Dict
+from collections import OrderedDict, deque, namedtuple
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
 from datetime import datetime, UTC
 
 from app.utils.config import settings
-from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1
+from app.utils.helpers import utc_now_iso
+from app.utils.protocol_helpers import (
+    STRATUM_EXTRA_NONCE1, JOB_MAX_HISTORY_SIZE, TEMPLATE_LRU_SIZE, UINT32_BE, DEFAULT_VERSION_HEX,
+    ZERO_HASH_HEX, DEFAULT_BITS, SubmitStatus
+)
 from app.utils.logging_config import StructuredLogger
 from app.jobs.real_node_client import RealBCHNodeClient
 
@@ -16,10 +25,49 @@ from app.jobs.real_node_client import RealBCHNodeClient
 
 logger = StructuredLogger(__name__)
 
+# Неизменная часть ответа validate_and_save_share
+SHARE_ACCEPTED_RESULT = {
+    "status": "accepted",
+    "message": "Share accepted (delegated to job_service)",
+    "difficulty": 1.0
+}
+# Принятые шары логируются в INFO только каждый N-й (иначе лог - горячая точка)
+SHARE_LOG_SAMPLE_RATE = 100
+# Неизменные поля mining.notify fallback задания: job_id, prevhash, merkle_branch,
+# version, nbits и ntime подставляются в копию
+_NOTIFY_PARAMS_TEMPLATE = (None, None, "fdfd0800", "", None, None, None, None, True)
+# Результат create_new_job: ID задания и данные mining.notify
+JobResult = namedtuple("JobResult", "job_id stratum")
+
+# Адрес выплаты для broadcast заданий, если pool_wallet не задан
+# (публичный тестовый адрес из Bitcoin Cash документации)
+DEFAULT_PAYOUT_ADDRESS = "qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a"
+# Сколько close() ждет незавершенные отправки найденных блоков (секунды)
+BLOCK_SUBMIT_DRAIN_TIMEOUT = 30.0
+
+
+@dataclass(frozen=True)
+class MinerContext:
+    """Данные майнера для заданий, считаются один раз на адрес"""
+    address: Optional[str]
+    id_suffix: str  # окончание ID задания: "_" + первые 8 символов адреса, для broadcast - ""
+    payout_address: str  # адрес в coinbase: адрес майнера или кошелек пула
+
+
+@functools.lru_cache(maxsize=1024)
+def miner_context(miner_address: Optional[str]) -> MinerContext:
+    """Контекст майнера (None - broadcast задание на кошелек пула)"""
+    if miner_address:
+        return MinerContext(miner_address, "_" + miner_address[:8], miner_address)
+    return MinerContext(None, "", settings.pool_wallet or DEFAULT_PAYOUT_ADDRESS)
+
 
 class JobManager:
     """Менеджер заданий для майнинг пула - только реальная нода"""
 
+    # Счетчик принятых шаров для выборочного логирования
+    _share_log_counter = 0
+
     def __init__(self, job_service=None, block_builder=None, stratum_server=None, tcp_stratum_server=None):
         # Используем настройки из config.py
         self.node_client = RealBCHNodeClient(
@@ -32,6 +80,8 @@ class JobManager:
         self.job_service = job_service
         self.block_builder = block_builder
         self.current_job = None
+        # Последние задания (новые в конце), размер ограничен
+        self.job_history: deque = deque(maxlen=JOB_MAX_HISTORY_SIZE)
         self.job_counter = 0
         self.block_height = 0
         self.difficulty = 0.0
@@ -39,9 +89,58 @@ class JobManager:
         self.stratum_server = stratum_server
         self.tcp_stratum_server = tcp_stratum_server
 
+        # Неизменная часть node_info в get_stats - настройки подключения к ноде.
+        # Ответ собирается заново на каждый вызов: его кэширует API, и правка
+        # общего словаря на месте изменила бы уже отданные ответы
+        self._node_info_static = {
+            "connection": f"{settings.bch_rpc_host}:{settings.bch_rpc_port}",
+            "auth_method": "cookie" if settings.bch_rpc_use_cookie else "user/pass"
+        }
+
         self.last_best_hash: Optional[str] = None
         self.reorg_check_interval = 10  # Проверка каждые 10 секунд
 
+        # Кэш шаблона блока: один getblocktemplate на всех майнеров в пределах TTL.
+        # key = (height, previousblockhash, longpollid), ts - time.monotonic(),
+        # version_hex - версия шаблона в hex, считается один раз на шаблон,
+        # clean_jobs - шаблон первый на своем previousblockhash (новый блок)
+        self._template_cache = {"key": None, "template": None, "ts": 0.0, "version_hex": None, "clean_jobs": True}
+        # Longpoll: пока цикл работает, шаблон в кэше актуален до ответа ноды
+        self._last_longpollid: Optional[str] = None
+        self.longpoll_active = False
+        # ZMQ hashblock: событие нового блока будит longpoll_loop, не дожидаясь ответа longpoll
+        self._new_tip = asyncio.Event()
+        self.zmq_active = False
+        # Кэш getmininginfo: (time.monotonic() получения, ответ ноды)
+        self._mining_info_cache = (0.0, None)
+        # LRU последних шаблонов: previousblockhash -> (шаблон, prepare_template, prepare_block_scaffold).
+        # Данные транзакций и заготовка блока собираются один раз на шаблон, а не
+        # на каждое задание и каждое найденное решение
+        self._template_lru: "OrderedDict[str, Tuple[Dict, Dict, Dict]]" = OrderedDict()
+        # Задания mining.notify по текущему шаблону: (шаблон, {payout_address -> задание}).
+        # Coinbase зависит только от шаблона и адреса выплаты, поэтому следующее
+        # задание того же адреса - копия params с новыми job_id и ntime
+        self._tip_job_skeleton: Tuple[Optional[Dict], Dict[str, Dict]] = (None, {})
+        # (previousblockhash, его сокращение для логов) - считается один раз на блок
+        self._prevhash_short: Tuple[Optional[str], str] = (None, "")
+
+        # Отправка найденных блоков в ноду идет в фоне, по одному блоку за раз;
+        # итоговые ответы ноды - в block_submit_results (новые в конце),
+        # они отдаются в get_stats()["last_block_submits"] и /jobs/stats
+        self._submit_tasks: Set[asyncio.Task] = set()
+        self._submit_lock = asyncio.Lock()
+        self.block_submit_results: deque = deque(maxlen=20)
+
+        # Single-flight: конкурентные вызовы с одним ключом ждут общий результат
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # Объединение рассылок: еще не начатая рассылка (к ней присоединяются новые
+        # вызовы), блокировка выполняющейся и последний разосланный шаблон
+        self._pending_broadcast: Optional[asyncio.Future] = None
+        self._broadcast_lock = asyncio.Lock()
+        self._last_broadcast_template: Optional[Dict] = None
+        self._last_broadcast_ts = 0.0
+
         logger.info(
             "JobManager инициализирован",
             event="job_manager_created",
@@ -56,7 +155,7 @@ class JobManager:
 
     async def initialize(self) -> bool:
         """Инициализация менеджера с реальной нодой"""
-        init_start = datetime.now(UTC)
+        init_start = time.monotonic_ns()
 
         try:
             logger.info(
@@ -67,51 +166,56 @@ class JobManager:
                 use_cookie=settings.bch_rpc_use_cookie
             )
 
-            # Пробуем подключиться несколько раз
+            # Пробуем подключиться несколько раз; зависшее подключение
+            # ограничено по времени и не съедает все попытки
             max_retries = 3
             for attempt in range(max_retries):
                 try:
-                    if await self.node_client.connect():
-                        # Обновляем локальные переменные из клиента
-                        self.block_height = self.node_client.block_height
-                        self.difficulty = self.node_client.difficulty
-
-                        init_time = (datetime.now(UTC) - init_start).total_seconds() * 1000
-
-                        logger.info(
-                            "JobManager успешно инициализирован",
-                            event="job_manager_initialized",
-                            block_height=self.block_height,
-                            difficulty=self.difficulty,
-                            chain=self.node_client.blockchain_info.get('chain', 'unknown') if hasattr(self.node_client,
-                                                                                                      'blockchain_info') else 'unknown',
-                            init_time_ms=init_time,
-                            connection_attempts=attempt + 1
-                        )
-                        return True
-                    else:
-                        if attempt < max_retries - 1:
-                            wait_time = 2 ** attempt  # Экспоненциальная задержка
-                            logger.warning(
-                                f"Попытка {attempt + 1} из {max_retries} не удалась, повтор через {wait_time} сек",
-                                event="job_manager_retry",
-                                attempt=attempt + 1,
-                                max_retries=max_retries,
-                                wait_time_seconds=wait_time
-                            )
-                            await asyncio.sleep(wait_time)
+                    connected = await asyncio.wait_for(
+                        self.node_client.connect(), timeout=settings.bch_node_connect_timeout
+                    )
                 except Exception as e:
+                    connected = False
                     logger.error(
                         f"Ошибка при попытке подключения {attempt + 1}",
                         event="job_manager_connection_error",
                         attempt=attempt + 1,
-                        error=str(e)
+                        error=str(e) or type(e).__name__
                     )
-                    if attempt < max_retries - 1:
-                        await asyncio.sleep(2 ** attempt)
+
+                if connected:
+                    # Обновляем локальные переменные из клиента
+                    self.block_height = self.node_client.block_height
+                    self.difficulty = self.node_client.difficulty
+                    await self._prefetch_node_state()
+
+                    init_time = (time.monotonic_ns() - init_start) / 1e6
+
+                    logger.info(
+                        "JobManager успешно инициализирован",
+                        event="job_manager_initialized",
+                        block_height=self.block_height,
+                        difficulty=self.difficulty,
+                        chain=self.node_client.blockchain_info.get('chain', 'unknown'),
+                        init_time_ms=init_time,
+                        connection_attempts=attempt + 1
+                    )
+                    return True
+
+                # После последней попытки ждать нечего
+                if attempt < max_retries - 1:
+                    wait_time = self._retry_delay(attempt)
+                    logger.warning(
+                        f"Попытка {attempt + 1} из {max_retries} не удалась, повтор через {wait_time:.1f} сек",
+                        event="job_manager_retry",
+                        attempt=attempt + 1,
+                        max_retries=max_retries,
+                        wait_time_seconds=wait_time
+                    )
+                    await asyncio.sleep(wait_time)
 
             # Все попытки исчерпаны
-            init_time = (datetime.now(UTC) - init_start).total_seconds() * 1000
+            init_time = (time.monotonic_ns() - init_start) / 1e6
             logger.error(
                 "Не удалось инициализировать JobManager после всех попыток",
                 event="job_manager_init_failed",
@@ -122,7 +226,7 @@ class JobManager:
             return False
 
         except Exception as e:
-            init_time = (datetime.now(UTC) - init_start).total_seconds() * 1000
+            init_time = (time.monotonic_ns() - init_start) / 1e6
             logger.error(
                 "Ошибка инициализации JobManager",
                 event="job_manager_init_error",
@@ -132,19 +236,99 @@ class JobManager:
             )
             return False
 
-    async def create_new_job(self, miner_address: str = None) -> Optional[Dict]:
+    async def close(self) -> None:
+        """
+        Закрыть пул HTTP соединений с нодой (при остановке приложения).
+
+        Сначала дожидаемся фоновых отправок найденных блоков (не дольше
+        BLOCK_SUBMIT_DRAIN_TIMEOUT), иначе блок внутри submitblock был бы потерян.
+        """
+        if self._submit_tasks:
+            pending = list(self._submit_tasks)
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*pending, return_exceptions=True),
+                    timeout=BLOCK_SUBMIT_DRAIN_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.error(
+                    "Отправка найденных блоков не завершилась до остановки",
+                    event="job_manager_block_submit_drain_timeout",
+                    pending=len(pending),
+                    timeout_seconds=BLOCK_SUBMIT_DRAIN_TIMEOUT
+                )
+
+        await self.node_client.close()
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        """
+        Экспоненциальная задержка со случайным разбросом (не больше 10 сек).
+
+        Пулы, перезапущенные одновременно, не переподключаются к ноде в один момент.
+        """
+        return random.uniform(0.5, min(10.0, 2 ** attempt))
+
+    async def _prefetch_node_state(self) -> None:
+        """
+        Сложность сети и первый шаблон блока одним batch запросом к ноде.
+
+        Шаблон попадает в кэш, и первая рассылка после запуска идет без RPC.
+        """
+        mining_info, template = await self.node_client.batch_call([
+            ("getmininginfo", []),
+            ("getblocktemplate", [])
+        ])
+
+        if isinstance(mining_info, dict):
+            self._mining_info_cache = (time.monotonic(), mining_info)
+            if 'difficulty' in mining_info:
+                self.difficulty = float(mining_info['difficulty'])
+        if isinstance(template, dict):
+            self.block_height = template.get('height', self.block_height)
+            self._store_template(template)
+
+    async def _single_flight(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнить factory() один раз на key.
+
+        Пока вызов в процессе, остальные вызовы с тем же ключом не повторяют
+        его, а ждут общий результат (массовое переподключение майнеров
+        после нового блока не превращается в N одинаковых RPC).
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = None
+        try:
+            result = await factory()
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            # При ошибке или отмене ожидающие получают None, как при неудаче RPC
+            future.set_result(result)
+
+    async def create_new_job(self, miner_address: str = None) -> Optional[JobResult]:
+        """Создать новое задание для майнера (конкурентные вызовы для одного майнера объединяются)"""
+        return await self._single_flight(("job", miner_address), lambda: self._create_new_job(miner_address))
+
+    async def _create_new_job(self, miner_address: str = None) -> Optional[JobResult]:
         """Создать новое задание для майнера"""
-        print(f"🔵 create_new_job called for {miner_address}", flush=True)
+        started = time.monotonic()
+        miner = miner_context(miner_address)
         try:
-            logger.debug(
-                "Создание нового задания",
-                event="job_manager_creating_job",
-                miner_address=miner_address or "broadcast"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Создание нового задания",
+                    event="job_manager_creating_job",
+                    miner_address=miner_address or "broadcast"
+                )
 
-            # Получаем шаблон блока от реальной ноды
-            template = await self.node_client.get_block_template()
-            print(f"🔵 template received: {template is not None}", flush=True)
+            # Получаем шаблон блока (из кэша или от реальной ноды)
+            template = await self._get_cached_template()
             if not template:
                 logger.warning(
                     "Не удалось получить шаблон блока от ноды",
@@ -167,17 +351,18 @@ class JobManager:
                         new_height=self.block_height
                     )
 
-            # Создаем уникальный ID задания
+            # Создаем уникальный ID задания. Одно чтение часов на задание:
+            # то же время идет в ID, ntime и created_at
             self.job_counter += 1
-            timestamp = int(time.time())
+            now = time.time()
+            timestamp = int(now)
 
-            if miner_address:
-                job_id = f"job_{timestamp}_{self.job_counter:08x}_{miner_address[:8]}"
-            else:
-                job_id = f"job_{timestamp}_{self.job_counter:08x}"
+            job_id = "job_%d_%08x%s" % (timestamp, self.job_counter, miner.id_suffix)
 
             # Используем block_builder для создания Stratum задания
-            stratum_job = await self._create_stratum_job_from_template(template, job_id, miner_address)
+            stratum_job = await self._create_stratum_job_from_template(
+                template, job_id, miner.payout_address, timestamp
+            )
 
             if not stratum_job:
                 logger.warning(
@@ -186,6 +371,7 @@ class JobManager:
                     height=template.get('height', 'unknown')
                 )
                 return None
+            stratum_job["params"][8] = self._clean_jobs_flag(template)
 
 
             # Сохраняем задание в job_service
@@ -195,27 +381,34 @@ class JobManager:
                 # Для broadcast задания сохраняем как последнее общее
                 self.job_service.set_last_broadcast_job(stratum_job)
 
-            # Сохраняем локально для истории
+            # Сохраняем локально для истории. Шаблон и задание - ссылки на общие
+            # объекты, без копий; запись в истории после создания не меняется.
+            # ISO-строка считается один раз здесь, а не при каждом запросе /history
+            created_at = datetime.fromtimestamp(now, UTC)
             self.current_job = {
                 "id": job_id,
                 "template": template,
                 "stratum_data": stratum_job,
-                "created_at": datetime.now(UTC),
+                "created_at": created_at,
+                "created_at_iso": created_at.isoformat(),
                 "miner_address": miner_address
             }
+            self.job_history.append(self.current_job)
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "Создано новое задание",
+                    event="job_manager_job_created",
+                    job_id=job_id,
+                    miner_address=miner_address or "broadcast",
+                    height=template.get('height', 'unknown'),
+                    previous_hash=self._short_prevhash(template.get('previousblockhash', '')),
+                    coinbase_value=template.get('coinbasevalue', 0),
+                    job_counter=self.job_counter,
+                    creation_time_ms=(time.monotonic() - started) * 1000.0
+                )
 
-            logger.info(
-                "Создано новое задание",
-                event="job_manager_job_created",
-                job_id=job_id,
-                miner_address=miner_address or "broadcast",
-                height=template.get('height', 'unknown'),
-                previous_hash=template.get('previousblockhash', '')[:16] + "...",
-                coinbase_value=template.get('coinbasevalue', 0),
-                job_counter=self.job_counter
-            )
-
-            return stratum_job
+            return JobResult(job_id, stratum_job)
 
         except Exception as e:
             logger.error(
@@ -227,13 +420,250 @@ class JobManager:
             )
             return None
 
+    async def _get_cached_template(self) -> Optional[Dict]:
+        """
+        Шаблон блока из кэша или от ноды.
+
+        Шаблон не зависит от майнера (адрес подставляется в coinbase при сборке
+        задания), поэтому в пределах TTL все create_new_job обходятся без RPC.
+        При работающем longpoll_loop шаблон обновляет сам цикл, и TTL не нужен;
+        при ZMQ подписке без longpoll цикл обновляет шаблон на каждый новый
+        блок, а job_zmq_template_max_age страхует от тихо оборвавшейся подписки.
+        Кэш сбрасывается при реорганизации и после принятого блока.
+        """
+        cache = self._template_cache
+        if cache["template"] is not None:
+            age = time.monotonic() - cache["ts"]
+            if (self.longpoll_active
+                    or age < settings.job_template_cache_ttl
+                    or (self.zmq_active and age < settings.job_zmq_template_max_age)):
+                return cache["template"]
+
+        return await self._single_flight("template", self._fetch_template)
+
+    async def _fetch_template(self) -> Optional[Dict]:
+        """Запросить шаблон у ноды и положить в кэш"""
+        template = await self.node_client.get_block_template()
+        if not template:
+            return None
+
+        self._store_template(template)
+        return template
+
+    def _store_template(self, template: Dict) -> None:
+        """Положить шаблон в кэш и запомнить его longpollid"""
+        cache = self._template_cache
+        key = (template.get('height'), template.get('previousblockhash'), template.get('longpollid'))
+        if key != cache["key"] and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Шаблон блока изменился",
+                event="job_manager_template_changed",
+                height=key[0],
+                longpollid=key[2]
+            )
+        # Новый шаблон того же блока (изменился mempool или истек TTL) не требует
+        # от майнеров бросать текущую работу - clean_jobs только на новом блоке
+        cache["clean_jobs"] = cache["key"] is None or cache["key"][1] != key[1]
+        cache["key"] = key
+        cache["template"] = template
+        cache["ts"] = time.monotonic()
+        version = template.get("version")
+        cache["version_hex"] = DEFAULT_VERSION_HEX if version is None else UINT32_BE.pack(version).hex()
+        self._last_longpollid = template.get('longpollid')
+
+    async def longpoll_loop(self):
+        """
+        Ожидание нового шаблона через getblocktemplate longpoll (BIP22).
+
+        Нода держит запрос с longpollid, пока не придет новый блок или не
+        изменится mempool, и задание уходит майнерам сразу, без интервала
+        опроса. Если задан bch_zmq_hashblock_endpoint, новый блок по ZMQ
+        прерывает ожидание longpoll. Если нода не отдает longpollid и ZMQ
+        нет, цикл завершается и задания обновляет периодическая рассылка.
+        """
+        logger.info(
+            "Запуск longpoll getblocktemplate",
+            event="job_manager_longpoll_started",
+            timeout_seconds=settings.job_longpoll_timeout
+        )
+
+        zmq_task = None
+        if settings.bch_zmq_hashblock_endpoint:
+            zmq_task = asyncio.create_task(self.zmq_listener(settings.bch_zmq_hashblock_endpoint))
+            # Даем подписке запуститься до первой проверки zmq_active
+            await asyncio.sleep(0)
+
+        try:
+            while True:
+                try:
+                    if self._last_longpollid is None and not self.zmq_active:
+                        # Первый шаблон запрашиваем без ожидания - он дает longpollid
+                        if not await self._get_cached_template():
+                            await asyncio.sleep(5)
+                            continue
+                        if self._last_longpollid is None:
+                            logger.warning(
+                                "Нода не поддерживает longpoll, остается периодическая рассылка",
+                                event="job_manager_longpoll_unsupported"
+                            )
+                            return
+
+                    self.longpoll_active = self._last_longpollid is not None
+                    template = await self._wait_template_update()
+                    if not template:
+                        # Ошибка или таймаут - до следующего ответа кэш работает по TTL
+                        self.longpoll_active = False
+                        await asyncio.sleep(5)
+                        continue
+
+                    self._store_template(template)
+                    self._mining_info_cache = (0.0, None)
+                    await self.broadcast_new_job_to_all()
+
+                except asyncio.CancelledError:
+                    self.longpoll_active = False
+                    logger.info(
+                        "Longpoll getblocktemplate остановлен",
+                        event="job_manager_longpoll_stopped"
+                    )
+                    break
+                except Exception as e:
+                    self.longpoll_active = False
+                    logger.error(
+                        "Ошибка longpoll getblocktemplate",
+                        event="job_manager_longpoll_error",
+                        error=str(e),
+                        error_type=type(e).__name__
+                    )
+                    await asyncio.sleep(5)
+        finally:
+            if zmq_task is not None:
+                zmq_task.cancel()
+
+    async def _wait_template_update(self) -> Optional[Dict]:
+        """Дождаться ответа longpoll или ZMQ уведомления о новом блоке - что придет раньше"""
+        if not self.zmq_active:
+            return await self.node_client.get_block_template(
+                longpollid=self._last_longpollid,
+                timeout=settings.job_longpoll_timeout
+            )
+
+        longpoll = None
+        waiters = {asyncio.ensure_future(self._new_tip.wait())}
+        if self._last_longpollid is not None:
+            longpoll = asyncio.ensure_future(self.node_client.get_block_template(
+                longpollid=self._last_longpollid,
+                timeout=settings.job_longpoll_timeout
+            ))
+            waiters.add(longpoll)
+
+        try:
+            done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+        self._new_tip.clear()
+        if longpoll is not None and longpoll in done:
+            return longpoll.result()
+        # Новый блок по ZMQ пришел раньше longpoll - берем шаблон без ожидания
+        return await self.node_client.get_block_template()
+
+    async def zmq_listener(self, endpoint: str):
+        """
+        Подписка на ZMQ hashblock ноды: каждое сообщение выставляет _new_tip.
+
+        pyzmq - необязательная зависимость, без нее остается только longpoll.
+        """
+        try:
+            import zmq
+            import zmq.asyncio
+        except ImportError as e:
+            logger.warning(
+                "pyzmq не установлен, ZMQ уведомления о блоках отключены",
+                event="job_manager_zmq_unavailable",
+                error=str(e)
+            )
+            return
+
+        socket = zmq.asyncio.Context.instance().socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, b"hashblock")
+        socket.connect(endpoint)
+        self.zmq_active = True
+        logger.info(
+            "Подписка на ZMQ hashblock",
+            event="job_manager_zmq_subscribed",
+            endpoint=endpoint
+        )
+
+        try:
+            while True:
+                _topic, block_hash, *_ = await socket.recv_multipart()
+                self._mining_info_cache = (0.0, None)
+                self._new_tip.set()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "ZMQ: новый блок",
+                        event="job_manager_zmq_hashblock",
+                        block_hash=block_hash.hex()
+                    )
+        except asyncio.CancelledError:
+            logger.info(
+                "Подписка на ZMQ hashblock остановлена",
+                event="job_manager_zmq_stopped"
+            )
+        except Exception as e:
+            logger.error(
+                "Ошибка ZMQ подписки",
+                event="job_manager_zmq_error",
+                error=str(e),
+                error_type=type(e).__name__
+            )
+        finally:
+            self.zmq_active = False
+            # Будим longpoll_loop, чтобы он не ждал уведомлений от закрытой подписки
+            self._new_tip.set()
+            socket.close(linger=0)
+
+    def _prepared_template(self, template: Dict) -> Dict:
+        """Подготовленные данные шаблона из LRU (считаются при первом обращении)"""
+        prevhash = template.get('previousblockhash', '')
+        entry = self._template_lru.get(prevhash)
+        if entry is not None and entry[0] is template:
+            self._template_lru.move_to_end(prevhash)
+            return entry[1]
+
+        prepared = self.block_builder.prepare_template(template)
+        scaffold = self.block_builder.prepare_block_scaffold(template, prepared)
+        self._template_lru[prevhash] = (template, prepared, scaffold)
+        self._template_lru.move_to_end(prevhash)
+        if len(self._template_lru) > TEMPLATE_LRU_SIZE:
+            self._template_lru.popitem(last=False)
+        return prepared
+
+    def _lookup_template_entry(self, template: Dict) -> Optional[Tuple[Dict, Dict, Dict]]:
+        """Запись LRU, если в ней лежит именно этот шаблон"""
+        entry = self._template_lru.get(template.get('previousblockhash', ''))
+        if entry is not None and entry[0] is template:
+            return entry
+        return None
+
+    def invalidate_template_cache(self) -> None:
+        """Сбросить кэш шаблона - следующее задание запросит шаблон у ноды"""
+        self._template_cache["template"] = None
+        self._last_longpollid = None
+
     async def _broadcast_clean_jobs(self):
         """Отправить clean_jobs=True всем майнерам"""
         if self.current_job:
-            clean_job = self.current_job['stratum_data'].copy()
-            # Устанавливаем clean_jobs = True (последний параметр)
-            if len(clean_job['params']) >= 9:
-                clean_job['params'][8] = True
+            stratum_data = self.current_job['stratum_data']
+            params = stratum_data['params']
+            # Устанавливаем clean_jobs = True (последний параметр).
+            # Новый список params вместо правки общего: задание хранится
+            # в истории и в job_service по ссылке, без копий
+            clean_job = stratum_data
+            if len(params) >= 9 and params[8] is not True:
+                clean_job = {**stratum_data, 'params': [*params[:8], True, *params[9:]]}
 
             # Рассылаем через серверы
             if hasattr(self.stratum_server, 'broadcast_new_job'):
@@ -259,6 +689,8 @@ class JobManager:
                     old_hash=self.last_best_hash[:16] + "...",
                     new_hash=current_best[:16] + "..."
                 )
+                # Шаблон из кэша построен на старой цепочке
+                self.invalidate_template_cache()
                 # Отправляем clean_jobs=True
                 await self._broadcast_clean_jobs()
 
@@ -270,23 +702,31 @@ class JobManager:
         except Exception as e:
             logger.error(f"Error checking for reorg: {e}")
 
-    async def _create_stratum_job_from_template(self, template: Dict, job_id: str, miner_address: str = None) -> \
-    Optional[Dict]:
-        """Создать Stratum задание из шаблона блока"""
-        try:
-            # Если есть адрес майнера, используем его, иначе адрес пула
-            if miner_address:
-                address = miner_address
-            else:
-                # публичный тестовый адрес из Bitcoin Cash документации
-                address = settings.pool_wallet if settings.pool_wallet else "qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a"
+    async def _create_stratum_job_from_template(self, template: Dict, job_id: str, payout_address: str,
+                                                now: Optional[int] = None) -> Optional[Dict]:
+        """
+        Создать Stratum задание из шаблона блока
 
+        payout_address - из MinerContext, now - время создания задания (unix, секунды)
+        """
+        skeleton_template, skeletons = self._tip_job_skeleton
+        if skeleton_template is not template:
+            skeletons = {}
+            self._tip_job_skeleton = (template, skeletons)
+
+        skeleton = skeletons.get(payout_address)
+        if skeleton is not None:
+            return self._job_from_skeleton(skeleton, template, job_id, now)
+
+        try:
             # Используем block_builder для создания данных задания
             job_data = self.block_builder.create_stratum_job_data(
                 template=template,
                 job_id=job_id,
-                miner_address=address,
-                extra_nonce1=STRATUM_EXTRA_NONCE1
+                miner_address=payout_address,
+                extra_nonce1=STRATUM_EXTRA_NONCE1,
+                prepared=self._prepared_template(template),
+                now=now
             )
 
             if not job_data:
@@ -296,8 +736,9 @@ class JobManager:
                     job_id=job_id
                 )
                 # Создаем fallback задание
-                return self._create_fallback_stratum_job(template, job_id)
+                return self._create_fallback_stratum_job(template, job_id, self._cached_version_hex(template), now)
 
+            skeletons[payout_address] = job_data
             return job_data
 
         except Exception as e:
@@ -307,42 +748,113 @@ class JobManager:
                 job_id=job_id,
                 error=str(e)
             )
-            return self._create_fallback_stratum_job(template, job_id)
+            return self._create_fallback_stratum_job(template, job_id, self._cached_version_hex(template), now)
+
 
+    def _short_prevhash(self, prevhash: str) -> str:
+        """Сокращенный previousblockhash для логов (заданиям одного блока - одна строка)"""
+        cached_hash, short = self._prevhash_short
+        if cached_hash is not prevhash:
+            short = prevhash[:16] + "..."
+            self._prevhash_short = (prevhash, short)
+        return short
 
     @staticmethod
-    def _create_fallback_stratum_job(template: Dict, job_id: str) -> Dict:
-        """Создать fallback Stratum задание"""
-        curtime = template.get("curtime", int(time.time()))
-        ntime_hex = format(curtime, '08x')
+    def _job_from_skeleton(skeleton: Dict, template: Dict, job_id: str, now: Optional[int] = None) -> Dict:
+        """Задание из готового: свой список params, новые job_id и ntime"""
+        curtime = max(template.get("curtime", 0), int(time.time()) if now is None else now)
+        params = skeleton["params"].copy()
+        params[0] = job_id
+        params[7] = UINT32_BE.pack(curtime).hex()
+        return {**skeleton, "params": params}
+
+    def _clean_jobs_flag(self, template: Dict) -> bool:
+        """clean_jobs для задания: False, только если шаблон - обновление того же блока"""
+        cache = self._template_cache
+        return cache["clean_jobs"] if cache["template"] is template else True
+
+    def _cached_version_hex(self, template: Dict) -> Optional[str]:
+        """Hex версии из кэша, если шаблон - тот, что лежит в кэше"""
+        cache = self._template_cache
+        return cache["version_hex"] if cache["template"] is template else None
+
+    @staticmethod
+    def _create_fallback_stratum_job(template: Dict, job_id: str, version_hex: Optional[str] = None,
+                                     now: Optional[int] = None) -> Dict:
+        """Создать fallback Stratum задание (version_hex - готовая версия из кэша шаблона)"""
+        # Не раньше текущего времени - шаблон из кэша мог быть получен давно
+        curtime = max(template.get("curtime", 0), int(time.time()) if now is None else now)
+        ntime_hex = UINT32_BE.pack(curtime).hex()
+        if version_hex is None:
+            version = template.get("version")
+            version_hex = DEFAULT_VERSION_HEX if version is None else UINT32_BE.pack(version).hex()
+
+        params = list(_NOTIFY_PARAMS_TEMPLATE)
+        params[0] = job_id
+        params[1] = template.get("previousblockhash", ZERO_HASH_HEX)
+        params[4] = []  # merkle_branch
+        params[5] = version_hex
+        params[6] = template.get("bits", DEFAULT_BITS)
+        params[7] = ntime_hex
 
         return {
             "method": "mining.notify",
-            "params": [
-                job_id,
-                template.get("previousblockhash", "0" * 64),
-                "fdfd0800",  # coinb1
-                "",  # coinb2
-                [],  # merkle_branch
-                format(template.get("version", 0x20000000), '08x'),
-                template.get("bits", "1d00ffff"),
-                ntime_hex,
-                True
-            ],
+            "params": params,
             "extra_nonce1": STRATUM_EXTRA_NONCE1,
             "template": template
         }
 
     async def broadcast_new_job_to_all(self):
-        """Рассылать новое задание всем подключенным майнерам"""
+        """
+        Рассылать новое задание всем подключенным майнерам.
+
+        Триггеры (longpoll, ZMQ, периодическая рассылка, API) часто приходят
+        пачкой. Вызовы в пределах job_broadcast_debounce, пока рассылка еще
+        не началась, присоединяются к ней; вызов во время рассылки ставит
+        одну следующую - новое событие не теряется, но и не дублируется.
+        """
+        pending = self._pending_broadcast
+        if pending is not None:
+            await asyncio.shield(pending)
+            return
+
+        pending = self._pending_broadcast = asyncio.get_running_loop().create_future()
+        try:
+            async with self._broadcast_lock:
+                await asyncio.sleep(settings.job_broadcast_debounce)
+                # С этого момента новые вызовы ставят следующую рассылку
+                self._pending_broadcast = None
+                await self._broadcast_new_job()
+        finally:
+            if self._pending_broadcast is pending:
+                self._pending_broadcast = None
+            pending.set_result(None)
+
+    async def _broadcast_new_job(self):
+        """Создать общее задание и разослать его (без объединения вызовов)"""
+        template = await self._get_cached_template()
+        if (
+                template is not None
+                and template is self._last_broadcast_template
+                and time.monotonic() - self._last_broadcast_ts < settings.job_broadcast_min_interval
+        ):
+            # Этот шаблон только что разослан - повтор ничего не даст майнерам
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Рассылка пропущена: шаблон не изменился",
+                    event="job_manager_broadcast_skipped",
+                    height=template.get('height', 'unknown')
+                )
+            return
+
         logger.info(
             "Начинаем рассылку задания всем майнерам",
             event="job_manager_broadcast_start"
         )
 
         # Создаем общее задание для всех майнеров
-        job_data = await self.create_new_job()
-        if not job_data:
+        job = await self.create_new_job()
+        if not job:
             logger.warning(
                 "Не удалось создать задание для рассылки",
                 event="job_manager_broadcast_no_job"
@@ -351,29 +863,33 @@ class JobManager:
 
         # Рассылаем через WebSocket сервер если есть
         if self.stratum_server:
-            await self.stratum_server.broadcast_new_job(job_data)
+            await self.stratum_server.broadcast_new_job(job.stratum)
 
         # Рассылаем через TCP сервер если есть
         if self.tcp_stratum_server:
-            await self.tcp_stratum_server.broadcast_new_job(job_data)
+            await self.tcp_stratum_server.broadcast_new_job(job.stratum)
+
+        self._last_broadcast_template = job.stratum.get('template')
+        self._last_broadcast_ts = time.monotonic()
 
         logger.info(
             "Broadcast задание разослано",
             event="job_manager_broadcast_job_created",
-            job_id=job_data['params'][0] if 'params' in job_data else 'unknown'
+            job_id=job.job_id
         )
 
     async def send_job_to_miner(self, miner_address: str) -> bool:
         """Отправить персональное задание конкретному майнеру"""
-        logger.info(
-            "Создание персонального задания для майнера",
-            event="job_manager_personal_job_start",
-            miner_address=miner_address
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Создание персонального задания для майнера",
+                event="job_manager_personal_job_start",
+                miner_address=miner_address
+            )
 
         # Создаем персональное задание
-        job_data = await self.create_new_job(miner_address)
-        if not job_data:
+        job = await self.create_new_job(miner_address)
+        if not job:
             logger.warning(
                 "Не удалось создать персональное задание",
                 event="job_manager_personal_job_failed",
@@ -382,46 +898,76 @@ class JobManager:
             return False
 
         # Задание уже сохранено в job_service через create_new_job()
-        logger.info(
-            "Персональное задание создано",
-            event="job_manager_personal_job_created",
-            miner_address=miner_address,
-            job_id=job_data['params'][0] if 'params' in job_data else 'unknown'
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Персональное задание создано",
+                event="job_manager_personal_job_created",
+                miner_address=miner_address,
+                job_id=job.job_id
+            )
         return True
 
-    @staticmethod
-    async def validate_and_save_share(miner_address: str, share_data: Dict) -> Dict:
-        """Валидация и сохранение шара - теперь делегируем job_service"""
-        logger.info(
-            "Валидация и сохранение шара",
-            event="job_manager_validate_share_start",
-            miner_address=miner_address,
-            job_id=share_data.get('job_id', 'unknown'),
-            share_id=share_data.get('share_id')
-        )
-
-        # Большая часть валидации теперь делается в job_service и validator
-        # Этот метод оставляем для совместимости и дополнительной логики
+    @classmethod
+    async def validate_and_save_share(cls, miner_address: str, share_data: Dict) -> Dict:
+        """
+        Ответ о принятом шаре - валидация и сохранение делегированы job_service.
+
+        Вызывается на каждый шар, поэтому только собирает ответ из готового
+        шаблона; timestamp берется из кэша utc_now_iso (точность - секунда).
+        В INFO попадает только каждый SHARE_LOG_SAMPLE_RATE-й шар.
+        """
+        cls._share_log_counter += 1
+        if cls._share_log_counter % SHARE_LOG_SAMPLE_RATE == 0:
+            logger.info(
+                "Шары приняты (выборочно)",
+                event="job_manager_shares_sampled",
+                shares_total=cls._share_log_counter,
+                miner_address=miner_address,
+                job_id=share_data.get('job_id')
+            )
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Шар принят (делегировано job_service)",
+                event="job_manager_share_accepted",
+                miner_address=miner_address,
+                job_id=share_data.get('job_id'),
+                share_id=share_data.get('share_id')
+            )
 
-        result = {
-            "status": "accepted",
-            "message": "Share accepted (delegated to job_service)",
-            "difficulty": 1.0,
-            "job_id": share_data.get('job_id'),
-            "timestamp": datetime.now(UTC).isoformat()
-        }
+        return {**SHARE_ACCEPTED_RESULT, "job_id": share_data.get('job_id'), "timestamp": utc_now_iso()}
+
+    def _assemble_block(self, template: Dict, job_data: Dict, entry: Optional[Tuple[Dict, Dict, Dict]],
+                        miner_address: str, extra_nonce2: str, ntime: str, nonce: str) -> Optional[Dict]:
+        """
+        Собрать полный блок из решения майнера (без обращений к состоянию менеджера).
+
+        Для шаблона из LRU блок склеивается из заготовки и coinbase задания;
+        иначе (старый шаблон, нестандартные поля решения) собирается полностью.
+        """
+        params = job_data.get('params')
+        if entry is not None and params:
+            complete_block = self.block_builder.assemble_block_fast(
+                entry[2],
+                params[2],
+                params[3],
+                job_data.get('extra_nonce1', STRATUM_EXTRA_NONCE1),
+                extra_nonce2,
+                ntime,
+                nonce
+            )
+            if complete_block is not None:
+                return complete_block
 
-        logger.info(
-            "Шар принят (делегировано job_service)",
-            event="job_manager_share_accepted",
+        return self.block_builder.create_complete_block(
+            template=template,
             miner_address=miner_address,
-            job_id=share_data.get('job_id'),
-            share_id=share_data.get('share_id')
+            extra_nonce1=STRATUM_EXTRA_NONCE1,
+            extra_nonce2=extra_nonce2,
+            ntime=ntime,
+            nonce=nonce,
+            prepared=entry[1] if entry is not None else None
         )
 
-        return result
-
     async def submit_block_solution(self, miner_address: str, block_data: Dict) -> Dict:
         """Обработка найденного блока"""
         logger.info(
@@ -464,14 +1010,12 @@ class JobManager:
                     "miner": miner_address
                 }
 
-            # Создаем полный блок
-            complete_block = self.block_builder.create_complete_block(
-                template=template,
-                miner_address=miner_address,
-                extra_nonce1=STRATUM_EXTRA_NONCE1,
-                extra_nonce2=extra_nonce2,
-                ntime=ntime,
-                nonce=nonce
+            # Сборка блока (сериализация всех транзакций шаблона) - CPU работа,
+            # пропорциональная размеру блока: выполняется в потоке, чтобы не
+            # задерживать шары и рассылки. LRU читается здесь, в потоке event loop
+            entry = self._lookup_template_entry(template)
+            complete_block = await asyncio.to_thread(
+                self._assemble_block, template, job_data, entry, miner_address, extra_nonce2, ntime, nonce
             )
 
             if not complete_block:
@@ -489,26 +1033,20 @@ class JobManager:
                 height=complete_block.get('height')
             )
 
-            # Отправляем блок в BCH ноду
-            submit_result = await self.node_client.submit_block(complete_block['block_hex'])
+            # Отправляем блок в BCH ноду в фоне: майнер получает ответ сразу,
+            # а итог submitblock попадает в лог и block_submit_results
+            task = asyncio.create_task(self._submit_and_report(complete_block, miner_address))
+            self._submit_tasks.add(task)
+            task.add_done_callback(self._submit_tasks.discard)
 
-            if submit_result and submit_result.get("status") == "accepted":
-                return {
-                    "status": "accepted",
-                    "message": "Block solution accepted and submitted to node",
-                    "miner": miner_address,
-                    "block_hash": complete_block.get('header_hash'),
-                    "height": complete_block.get('height'),
-                    "node_response": submit_result
-                }
-            else:
-                error_msg = submit_result.get("message", "Unknown error") if submit_result else "Node submission failed"
-                return {
-                    "status": "rejected",
-                    "message": f"Node rejected block: {error_msg}",
-                    "miner": miner_address,
-                    "block_hash": complete_block.get('header_hash')
-                }
+            return {
+                "status": "accepted",
+                "message": "Block solution accepted, submitting to node",
+                "miner": miner_address,
+                "block_hash": complete_block.get('header_hash'),
+                "height": complete_block.get('height'),
+                "pending_node_submit": True
+            }
 
         except Exception as e:
             logger.error(
@@ -525,54 +1063,131 @@ class JobManager:
                 "miner": miner_address
             }
 
+    async def _submit_and_report(self, complete_block: Dict, miner_address: str) -> Dict:
+        """Отправить собранный блок в ноду и сохранить ее ответ"""
+        block_hash = complete_block.get('header_hash')
+        try:
+            async with self._submit_lock:
+                status, detail = await self.node_client.submit_block(complete_block['block_hex'])
+        except Exception as e:
+            status, detail = SubmitStatus.REJECTED, {"message": f"Block submission error: {str(e)}"}
+
+        if status is SubmitStatus.ACCEPTED:
+            # Блок принят - кэшированные шаблон и сложность для этой высоты устарели
+            self.invalidate_template_cache()
+            self._mining_info_cache = (0.0, None)
+            result = {
+                "status": "accepted",
+                "message": "Block solution accepted and submitted to node",
+                "miner": miner_address,
+                "block_hash": block_hash,
+                "height": complete_block.get('height')
+            }
+            logger.info(
+                "Блок принят нодой",
+                event="job_manager_block_submitted",
+                miner_address=miner_address,
+                block_hash=block_hash,
+                height=complete_block.get('height')
+            )
+        else:
+            error_msg = detail.get("message", "Unknown error") if detail else "Node submission failed"
+            result = {
+                "status": "rejected",
+                "message": f"Node rejected block: {error_msg}",
+                "miner": miner_address,
+                "block_hash": block_hash
+            }
+            logger.error(
+                "Нода отклонила блок",
+                event="job_manager_block_submit_rejected",
+                miner_address=miner_address,
+                block_hash=block_hash,
+                error=error_msg
+            )
+
+        self.block_submit_results.append(result)
+        return result
+
     def get_stats(self) -> Dict:
         """Получить статистику JobManager"""
         stats = {
             "status": "connected" if self.block_height > 0 else "disconnected",
             "current_job": self.current_job["id"] if self.current_job else None,
             "total_jobs_created": self.job_counter,
+            # Итоги submitblock: майнер получает ответ до вердикта ноды
+            "last_block_submits": list(self.block_submit_results),
             "node_info": {
                 "block_height": self.block_height,
                 "difficulty": self.difficulty,
-                "connection": f"{settings.bch_rpc_host}:{settings.bch_rpc_port}",
-                "auth_method": "cookie" if settings.bch_rpc_use_cookie else "user/pass"
+                **self._node_info_static
             }
         }
 
-        logger.debug(
-            "Получение статистики JobManager",
-            event="job_manager_get_stats",
-            block_height=self.block_height,
-            job_counter=self.job_counter,
-            has_current_job=self.current_job is not None
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Получение статистики JobManager",
+                event="job_manager_get_stats",
+                block_height=self.block_height,
+                job_counter=self.job_counter,
+                has_current_job=self.current_job is not None
+            )
 
         return stats
 
+    async def _cached_mining_info(self, ttl: Optional[float] = None) -> Optional[Dict]:
+        """
+        getmininginfo с TTL (по умолчанию settings.job_mining_info_ttl).
+
+        Сложность меняется только с новым блоком, поэтому запросы в пределах
+        ttl обходятся без RPC, а одновременные промахи ждут один общий вызов.
+        Кэш сбрасывается при новом блоке (longpoll, ZMQ) и после принятого блока.
+        """
+        if ttl is None:
+            ttl = settings.job_mining_info_ttl
+        fetched_at, mining_info = self._mining_info_cache
+        if mining_info is not None and time.monotonic() - fetched_at < ttl:
+            return mining_info
+
+        return await self._single_flight("mining_info", self._fetch_mining_info)
+
+    async def _fetch_mining_info(self) -> Optional[Dict]:
+        """getmininginfo из ноды с сохранением в кэш"""
+        mining_info = await self.node_client.get_mining_info()
+        if mining_info:
+            self._mining_info_cache = (time.monotonic(), mining_info)
+            if 'blocks' in mining_info:
+                self.block_height = mining_info['blocks']
+        return mining_info
+
     async def get_current_difficulty(self) -> float:
         """Получить текущую сложность сети"""
         try:
-            logger.debug(
-                "Запрос текущей сложности сети",
-                event="job_manager_get_difficulty"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Запрос текущей сложности сети",
+                    event="job_manager_get_difficulty"
+                )
 
-            mining_info = await self.node_client.get_mining_info()
+            mining_info = await self._cached_mining_info()
             if mining_info and 'difficulty' in mining_info:
                 difficulty = float(mining_info['difficulty'])
+                self.difficulty = difficulty
 
-                logger.debug(
-                    "Получена сложность сети",
-                    event="job_manager_difficulty_received",
-                    difficulty=difficulty
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Получена сложность сети",
+                        event="job_manager_difficulty_received",
+                        difficulty=difficulty
+                    )
                 return difficulty
 
-            logger.debug(
-                "Используется сохраненная сложность",
-                event="job_manager_using_cached_difficulty",
-                difficulty=self.difficulty
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Используется сохраненная сложность",
+                    event="job_manager_using_cached_difficulty",
+                    difficulty=self.difficulty
+                )
             return self.difficulty
 
         except Exception as e:
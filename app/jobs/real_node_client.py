@@ -1,15 +1,29 @@
 import aiohttp
 import asyncio
+import time
 
-from typing import Optional, Dict, Union
+import orjson
+
+from typing import Optional, Dict, List, Tuple, Union
 from pathlib import Path
 from datetime import datetime, UTC
 
 from app.utils.logging_config import StructuredLogger
 from app.utils.config import settings
+from app.utils.protocol_helpers import SubmitStatus
 
 logger = StructuredLogger(__name__)
 
+# Заголовки JSON-RPC запросов; тело кодируется и разбирается orjson -
+# шаблон блока с тысячами транзакций stdlib json разбирает в разы дольше
+RPC_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "BCH-Pool/1.0"
+}
+
+# Значение _make_rpc_call при сбое вызова, когда None - законный успешный ответ (submitblock)
+RPC_FAILED = object()
+
 
 class RealBCHNodeClient:
     """Реальный клиент для подключения к BCH ноде"""
@@ -29,7 +43,8 @@ class RealBCHNodeClient:
         self.request_id = 0
         self.block_height = 0
         self.difficulty = 0.0
-        self.blockchain_info: Optional[Dict] = None
+        # Последний ответ getblockchaininfo; пустой словарь до подключения
+        self.blockchain_info: Dict = {}
         self.start_time = datetime.now(UTC)
         self.total_requests = 0
         self.failed_requests = 0
@@ -90,15 +105,18 @@ class RealBCHNodeClient:
         logger.warning("Не найдены данные для аутентификации RPC")
         return None
 
-    async def _make_rpc_call(self, method: str, params: list = None) -> Optional[
+    async def _make_rpc_call(self, method: str, params: list = None, timeout: float = 30, default=None) -> Optional[
         Union[Dict, str, int, float, bool, list]]:
-        """Выполнение RPC вызова к ноде"""
+        """
+        Выполнение RPC вызова к ноде (timeout - секунды на весь запрос).
+        При ошибке возвращает default
+        """
         if params is None:
             params = []
 
         self.request_id += 1
         self.total_requests += 1
-        request_start = datetime.now(UTC)
+        request_start = time.monotonic_ns()
 
         payload = {
             "jsonrpc": "1.0",
@@ -107,28 +125,21 @@ class RealBCHNodeClient:
             "params": params
         }
 
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": "BCH-Pool/1.0"
-        }
-
         try:
             auth = await self._get_auth()
-            timeout = aiohttp.ClientTimeout(total=30)
-
             async with self.session.post(
                     self.rpc_url,
-                    json=payload,
-                    headers=headers,
+                    data=orjson.dumps(payload),
+                    headers=RPC_HEADERS,
                     auth=auth,
-                    timeout=timeout,
+                    timeout=aiohttp.ClientTimeout(total=timeout, sock_connect=settings.bch_rpc_connect_timeout),
                     ssl=False
             ) as response:
 
-                response_time = (datetime.now(UTC) - request_start).total_seconds() * 1000
+                response_time = (time.monotonic_ns() - request_start) / 1e6
 
                 if response.status == 200:
-                    result_data = await response.json()
+                    result_data = orjson.loads(await response.read())
                     if "error" in result_data and result_data["error"]:
                         error_msg = result_data["error"]
                         logger.error(
@@ -139,7 +150,7 @@ class RealBCHNodeClient:
                             response_time_ms=response_time,
                             request_id=self.request_id
                         )
-                        return None
+                        return default
                     return result_data.get("result")
                 else:
                     self.failed_requests += 1
@@ -153,7 +164,7 @@ class RealBCHNodeClient:
                         response_time_ms=response_time,
                         request_id=self.request_id
                     )
-                    return None
+                    return default
 
         except aiohttp.ClientConnectionError as e:
             self.failed_requests += 1
@@ -165,7 +176,7 @@ class RealBCHNodeClient:
                 rpc_url=self.rpc_url,
                 request_id=self.request_id
             )
-            return None
+            return default
         except asyncio.TimeoutError:
             self.failed_requests += 1
             logger.error(
@@ -173,10 +184,10 @@ class RealBCHNodeClient:
                 event="bch_node_timeout",
                 method=method,
                 rpc_url=self.rpc_url,
-                timeout_seconds=30,
+                timeout_seconds=timeout,
                 request_id=self.request_id
             )
-            return None
+            return default
         except Exception as e:
             self.failed_requests += 1
             logger.error(
@@ -187,11 +198,75 @@ class RealBCHNodeClient:
                 error_type=type(e).__name__,
                 request_id=self.request_id
             )
-            return None
+            return default
+
+    async def batch_call(self, calls: List[Tuple[str, list]], timeout: float = 30) -> List[
+        Optional[Union[Dict, str, int, float, bool, list]]]:
+        """
+        Несколько RPC вызовов одним HTTP запросом (JSON-RPC batch).
+
+        Результаты возвращаются в порядке calls; на месте вызова с ошибкой - None.
+        """
+        first_id = self.request_id + 1
+        self.request_id += len(calls)
+        self.total_requests += 1
+
+        payload = [
+            {"jsonrpc": "1.0", "id": first_id + i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        results: List = [None] * len(calls)
+
+        try:
+            auth = await self._get_auth()
+            async with self.session.post(
+                    self.rpc_url,
+                    data=orjson.dumps(payload),
+                    headers=RPC_HEADERS,
+                    auth=auth,
+                    timeout=aiohttp.ClientTimeout(total=timeout, sock_connect=settings.bch_rpc_connect_timeout),
+                    ssl=False
+            ) as response:
+                if response.status != 200:
+                    self.failed_requests += 1
+                    logger.error(
+                        "HTTP ошибка при batch вызове ноды",
+                        event="bch_node_batch_http_error",
+                        methods=[method for method, _ in calls],
+                        status_code=response.status
+                    )
+                    return results
+
+                for item in orjson.loads(await response.read()):
+                    index = item.get("id", 0) - first_id
+                    if not 0 <= index < len(calls):
+                        continue
+                    if item.get("error"):
+                        logger.error(
+                            "RPC ошибка от ноды",
+                            event="bch_node_rpc_error",
+                            method=calls[index][0],
+                            error=item["error"],
+                            request_id=item.get("id")
+                        )
+                        continue
+                    results[index] = item.get("result")
+                return results
+
+        except Exception as e:
+            self.failed_requests += 1
+            logger.error(
+                "Ошибка batch вызова BCH ноды",
+                event="bch_node_batch_error",
+                methods=[method for method, _ in calls],
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            return results
 
     async def connect(self) -> bool:
         """Подключение к ноде"""
-        connect_start = datetime.now(UTC)
+        connect_start = time.monotonic_ns()
 
         try:
             logger.info(
@@ -200,15 +275,28 @@ class RealBCHNodeClient:
                 rpc_url=self.rpc_url
             )
 
-            self.session = aiohttp.ClientSession()
+            # Сессия прошлой (неудачной или прерванной) попытки больше не нужна
+            if self.session and not self.session.closed:
+                await self.session.close()
+
+            # Постоянные keep-alive соединения: RPC не открывает новое TCP
+            # соединение на каждый вызов, а longpoll занимает только одно из них.
+            # keepalive_timeout должен быть меньше таймаута простоя соединений
+            # у ноды, иначе первый запрос после паузы попадет в закрытый сокет
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=settings.bch_rpc_pool_size,
+                    keepalive_timeout=settings.bch_rpc_keepalive_timeout
+                )
+            )
 
             # Тестовый вызов для проверки подключения
-            self.blockchain_info = await self.get_blockchain_info()
+            self.blockchain_info = await self.get_blockchain_info() or {}
             if self.blockchain_info:
                 self.block_height = self.blockchain_info.get('blocks', 0)
                 self.difficulty = self.blockchain_info.get('difficulty', 0.0)
 
-                connect_time = (datetime.now(UTC) - connect_start).total_seconds() * 1000
+                connect_time = (time.monotonic_ns() - connect_start) / 1e6
                 logger.info(
                     "Успешно подключено к BCH ноде",
                     event="bch_node_connected",
@@ -225,7 +313,7 @@ class RealBCHNodeClient:
                 "Не удалось подключиться к BCH ноде",
                 event="bch_node_connect_failed",
                 rpc_url=self.rpc_url,
-                connect_time_ms=(datetime.now(UTC) - connect_start).total_seconds() * 1000
+                connect_time_ms=(time.monotonic_ns() - connect_start) / 1e6
             )
 
             return False
@@ -237,7 +325,7 @@ class RealBCHNodeClient:
                 rpc_url=self.rpc_url,
                 error=str(e),
                 error_type=type(e).__name__,
-                connect_time_ms=(datetime.now(UTC) - connect_start).total_seconds() * 1000
+                connect_time_ms=(time.monotonic_ns() - connect_start) / 1e6
             )
             return False
 
@@ -302,25 +390,35 @@ class RealBCHNodeClient:
             return result
         return None
 
-    async def get_block_template(self, rules: list = None) -> Optional[Dict]:
-        """Получение шаблона блока для майнинга"""
-        request_start = datetime.now(UTC)
+    async def get_block_template(self, rules: list = None, longpollid: Optional[str] = None,
+                                 timeout: float = 30) -> Optional[Dict]:
+        """
+        Получение шаблона блока для майнинга.
 
-        params = []
+        С longpollid (BIP22) нода держит запрос, пока шаблон не изменится,
+        поэтому timeout для такого запроса должен быть большим.
+        """
+        request_start = time.monotonic_ns()
+
+        request = {}
         if rules:
-            params.append({"rules": rules})
+            request["rules"] = rules
+        if longpollid:
+            request["longpollid"] = longpollid
+        params = [request] if request else []
 
         logger.debug(
             "Запрос шаблона блока от ноды",
             event="bch_node_get_block_template",
-            rules=rules
+            rules=rules,
+            longpollid=longpollid
         )
 
-        result = await self._make_rpc_call("getblocktemplate", params)
+        result = await self._make_rpc_call("getblocktemplate", params, timeout=timeout)
 
         if isinstance(result, dict):
             self.block_height = result.get('height', self.block_height)
-            response_time = (datetime.now(UTC) - request_start).total_seconds() * 1000
+            response_time = (time.monotonic_ns() - request_start) / 1e6
 
             logger.info(
                 "Получен шаблон блока от ноды",
@@ -336,12 +434,17 @@ class RealBCHNodeClient:
         logger.warning(
             "Не удалось получить шаблон блока от ноды",
             event="bch_node_block_template_failed",
-            response_time_ms=(datetime.now(UTC) - request_start).total_seconds() * 1000
+            response_time_ms=(time.monotonic_ns() - request_start) / 1e6
         )
         return None
 
-    async def submit_block(self, hex_data: str) -> Optional[Dict]:
-        """Отправка найденного блока"""
+    async def submit_block(self, hex_data: str) -> Tuple[SubmitStatus, Optional[Dict]]:
+        """
+        Отправка найденного блока
+
+        Returns:
+            (SubmitStatus, детали) - детали с причиной только при отклонении
+        """
         logger.info(
             "Отправка блока в BCH ноду",
             event="bch_node_submit_block",
@@ -349,22 +452,24 @@ class RealBCHNodeClient:
             hex_data_prefix=hex_data[:64] + "..."
         )
 
-        result = await self._make_rpc_call("submitblock", [hex_data])
+        result = await self._make_rpc_call("submitblock", [hex_data], default=RPC_FAILED)
 
-        # Bitcoin RPC возвращает None при успехе, строку при ошибке
+        # Bitcoin RPC возвращает None при успехе, строку при ошибке;
+        # сбой самого вызова (HTTP, таймаут, RPC error) - не принятие блока
         if result is None:
             logger.info(
                 "Блок принят BCH нодой",
                 event="bch_node_block_accepted"
             )
-            return {"status": "accepted", "message": "Block accepted"}
-        else:
-            logger.error(
-                "Блок отклонен BCH нодой",
-                event="bch_node_block_rejected",
-                rejection_reason=str(result)
-            )
-            return {"status": "rejected", "message": str(result)}
+            return SubmitStatus.ACCEPTED, None
+
+        reason = "RPC call failed" if result is RPC_FAILED else str(result)
+        logger.error(
+            "Блок отклонен BCH нодой",
+            event="bch_node_block_rejected",
+            rejection_reason=reason
+        )
+        return SubmitStatus.REJECTED, {"status": "rejected", "message": reason}
 
     async def get_mining_info(self) -> Optional[Dict]:
         """Получение информации о майнинге"""
@@ -434,13 +539,13 @@ class RealBCHNodeClient:
 
     async def ping(self) -> bool:
         """Проверка доступности ноды"""
-        ping_start = datetime.now(UTC)
+        ping_start = time.monotonic_ns()
 
         try:
             result = await self._make_rpc_call("getblockcount")
             success = isinstance(result, int)
 
-            ping_time = (datetime.now(UTC) - ping_start).total_seconds() * 1000
+            ping_time = (time.monotonic_ns() - ping_start) / 1e6
 
             logger.debug(
                 "Проверка доступности BCH ноды",
@@ -452,7 +557,7 @@ class RealBCHNodeClient:
             return success
 
         except Exception as e:
-            ping_time = (datetime.now(UTC) - ping_start).total_seconds() * 1000
+            ping_time = (time.monotonic_ns() - ping_start) / 1e6
             logger.debug(
                 "Ошибка проверки доступности ноды",
                 event="bch_node_ping_error",
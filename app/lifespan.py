@@ -6,8 +6,9 @@ import asyncio
 from datetime import datetime, UTC
 
 from app.utils.logging_config import StructuredLogger
-from app.dependencies import job_manager, stratum_server, tcp_stratum_server, share_validator, difficulty_service
+from app.dependencies import container
 from app.utils.config import settings
+from app.models.database import warm_up_pool
 
 logger = StructuredLogger(__name__)
 
@@ -35,6 +36,25 @@ async def lifespan(_app):
     background_tasks = []
 
     try:
+        # 0. Создаем все сервисы контейнера до приема запросов
+        container.warmup()
+
+        # Прогреваем пул соединений с БД
+        try:
+            warmed = await warm_up_pool()
+            logger.info(
+                "Пул соединений с БД прогрет",
+                event="db_pool_warmed",
+                connections=warmed
+            )
+        except Exception as e:
+            logger.warning(
+                "Не удалось прогреть пул соединений с БД",
+                event="db_pool_warm_up_failed",
+                error=str(e),
+                error_type=type(e).__name__
+            )
+
         # 1. Инициализируем JobManager
         logger.info("Инициализация JobManager...", event="job_manager_initializing")
 
@@ -43,20 +63,20 @@ async def lifespan(_app):
         else:
             logger.info(f"Подключение к BCH ноде: {settings.bch_rpc_host}:{settings.bch_rpc_port}")
 
-        if await job_manager.initialize():
+        if await container.job_manager.initialize():
             logger.info(
                 "JobManager готов к работе",
                 event="job_manager_initialized",
-                block_height=getattr(job_manager, 'block_height', 0),
+                block_height=getattr(container.job_manager, 'block_height', 0),
                 node_connection=f"{settings.bch_rpc_host}:{settings.bch_rpc_port}"
             )
 
             # 2. Создаем первое задание
-            await job_manager.broadcast_new_job_to_all()
+            await container.job_manager.broadcast_new_job_to_all()
             logger.info(
                 "Первое задание создано",
                 event="first_job_created",
-                job_counter=getattr(job_manager, 'job_counter', 0)
+                job_counter=getattr(container.job_manager, 'job_counter', 0)
             )
         else:
             logger.error(
@@ -69,13 +89,13 @@ async def lifespan(_app):
         # 3. Запускаем TCP Stratum сервер в фоне (если включен)
         if settings.stratum_tcp_enabled:
             try:
-                tcp_task = asyncio.create_task(tcp_stratum_server.start())
+                tcp_task = asyncio.create_task(container.tcp_stratum_server.start())
                 background_tasks.append(tcp_task)
                 logger.info(
-                    f"TCP Stratum сервер запущен на порту {tcp_stratum_server.port}",
+                    f"TCP Stratum сервер запущен на порту {container.tcp_stratum_server.port}",
                     event="tcp_server_started",
-                    host=tcp_stratum_server.host,
-                    port=tcp_stratum_server.port,
+                    host=container.tcp_stratum_server.host,
+                    port=container.tcp_stratum_server.port,
                     task_id=id(tcp_task)
                 )
             except Exception as e:
@@ -83,8 +103,8 @@ async def lifespan(_app):
                     "Ошибка запуска TCP сервера",
                     event="tcp_server_start_failed",
                     error=str(e),
-                    host=tcp_stratum_server.host,
-                    port=tcp_stratum_server.port
+                    host=container.tcp_stratum_server.host,
+                    port=container.tcp_stratum_server.port
                 )
 
         # 4. Запускаем периодическую рассылку заданий
@@ -104,6 +124,17 @@ async def lifespan(_app):
                 error=str(e)
             )
 
+        # 4.1. Новые шаблоны от ноды через longpoll (только при подключенной ноде)
+        if settings.job_longpoll_enabled and container.job_manager.block_height > 0:
+            longpoll_task = asyncio.create_task(container.job_manager.longpoll_loop())
+            background_tasks.append(longpoll_task)
+            logger.info(
+                "Longpoll шаблонов блока запущен",
+                event="job_longpoll_started",
+                timeout_seconds=settings.job_longpoll_timeout,
+                task_id=id(longpoll_task)
+            )
+
         # 5. Запускаем очистку старых заданий
         try:
             cleanup_task = asyncio.create_task(_periodic_job_cleanup())
@@ -200,7 +231,8 @@ async def lifespan(_app):
 
             # Отправляем уведомление WebSocket майнерам
             ws_count = 0
-            for conn_id, ws in stratum_server.active_connections.items():
+            # Обходим снимки: во время await отправки клиенты могут отключиться
+            for conn_id, ws in list(container.stratum_server.active_connections.items()):
                 try:
                     await ws.send_json(shutdown_notice)
                     ws_count += 1
@@ -209,7 +241,7 @@ async def lifespan(_app):
 
             # Отправляем уведомление TCP майнерам
             tcp_count = 0
-            for client_id, writer in tcp_stratum_server.connections.items():
+            for client_id, writer in list(container.tcp_stratum_server.connections.items()):
                 try:
                     writer.write((json.dumps(shutdown_notice) + "\n").encode())
                     await writer.drain()
@@ -267,12 +299,12 @@ async def lifespan(_app):
         # Останавливаем TCP сервер
         if settings.stratum_tcp_enabled:
             try:
-                await tcp_stratum_server.stop()
+                await container.tcp_stratum_server.stop()
                 logger.info(
                     "TCP Stratum сервер остановлен",
                     event="tcp_server_stopped",
-                    host=tcp_stratum_server.host,
-                    port=tcp_stratum_server.port
+                    host=container.tcp_stratum_server.host,
+                    port=container.tcp_stratum_server.port
                 )
             except Exception as e:
                 logger.warning(
@@ -281,13 +313,23 @@ async def lifespan(_app):
                     error=str(e)
                 )
 
+        # Закрываем соединения с нодой (фоновые задачи уже остановлены)
+        try:
+            await container.job_manager.close()
+        except Exception as e:
+            logger.warning(
+                "Ошибка закрытия соединения с нодой",
+                event="node_client_close_error",
+                error=str(e)
+            )
+
         # Очищаем данные WebSocket сервера
         try:
-            stratum_server.cleanup_all()
+            container.stratum_server.cleanup_all()
             logger.info(
                 "WebSocket сервер очищен",
                 event="websocket_server_cleaned",
-                active_connections_before=len(stratum_server.active_connections)
+                active_connections_before=len(container.stratum_server.active_connections)
             )
         except Exception as e:
             logger.warning(
@@ -330,12 +372,12 @@ async def _periodic_job_broadcaster():
             await asyncio.sleep(settings.job_broadcast_interval)
 
             # Проверяем есть ли активные майнеры
-            ws_miners = len(stratum_server.active_connections)
-            tcp_miners = len(tcp_stratum_server.connections)
+            ws_miners = len(container.stratum_server.active_connections)
+            tcp_miners = len(container.tcp_stratum_server.connections)
             active_miners = ws_miners + tcp_miners
 
             if active_miners > 0:
-                await job_manager.broadcast_new_job_to_all()
+                await container.job_manager.broadcast_new_job_to_all()
                 logger.debug(
                     f"Задание разослано {active_miners} майнерам",
                     event="job_broadcasted",
@@ -389,11 +431,11 @@ async def _periodic_difficulty_updater():
             await asyncio.sleep(settings.difficulty_update_interval)
 
             # Обновляем сложность
-            updated, new_difficulty, message = await difficulty_service.update_difficulty()
+            updated, new_difficulty, message = await container.difficulty_service.update_difficulty()
 
             if updated:
                 # Обновляем валидатор
-                share_validator.target_difficulty = new_difficulty
+                container.share_validator.target_difficulty = new_difficulty
 
                 logger.info(
                     "Сложность обновлена периодической задачей",
@@ -407,12 +449,12 @@ async def _periodic_difficulty_updater():
                     "Сложность не изменилась",
                     event="difficulty_no_update",
                     iteration=iteration,
-                    current_difficulty=difficulty_service.current_difficulty,
+                    current_difficulty=container.difficulty_service.current_difficulty,
                     message=message
                 )
 
             # Очищаем старые данные
-            difficulty_service.cleanup_old_data(max_age_hours=24)
+            container.difficulty_service.cleanup_old_data(max_age_hours=24)
 
         except asyncio.CancelledError:
             logger.info(
@@ -448,8 +490,8 @@ async def _periodic_reorg_checker():
         try:
             await asyncio.sleep(10)  # Проверяем каждые 10 секунд
 
-            if job_manager and hasattr(job_manager, 'check_for_reorg'):
-                await job_manager.check_for_reorg()
+            if container.job_manager and hasattr(container.job_manager, 'check_for_reorg'):
+                await container.job_manager.check_for_reorg()
                 logger.debug(
                     "Проверка реорганизации выполнена",
                     event="reorg_check_completed",
@@ -490,14 +532,14 @@ async def _periodic_job_cleanup():
             await asyncio.sleep(60)
 
             # Очищаем задания в WebSocket сервере
-            ws_jobs_before = len(getattr(stratum_server, 'subscriptions', {}))
-            stratum_server.cleanup_old_jobs(max_age_seconds=settings.job_cleanup_age)
+            ws_jobs_before = len(getattr(container.stratum_server, 'subscriptions', {}))
+            container.stratum_server.cleanup_old_jobs(max_age_seconds=settings.job_cleanup_age)
 
             # Очищаем задания в валидаторе
             validator_jobs_before = 0
-            if hasattr(share_validator, 'jobs_cache'):
-                validator_jobs_before = len(share_validator.jobs_cache)
-                share_validator.cleanup_old_jobs(max_age_seconds=settings.job_cleanup_age)
+            if hasattr(container.share_validator, 'jobs_cache'):
+                validator_jobs_before = len(container.share_validator.jobs_cache)
+                container.share_validator.cleanup_old_jobs(max_age_seconds=settings.job_cleanup_age)
 
             logger.debug(
                 "Очистка старых заданий выполнена",
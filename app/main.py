@@ -2,6 +2,7 @@ from datetime import datetime, UTC
 
 from fastapi import FastAPI, Depends, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import SQLAlchemyError
 from starlette.middleware.base import BaseHTTPMiddleware
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -21,8 +22,7 @@ from app.api.v1.jobs import router as jobs_router
 from app.api.v1.tcp_stratum import router as tcp_stratum_router
 
 from app.lifespan import lifespan, logger
-from app.dependencies import stratum_server, tcp_stratum_server, database_service, job_service, \
-    job_manager, share_validator
+from app.dependencies import container
 
 # Настройка логов
 api_logger = StructuredLogger(__name__)
@@ -34,6 +34,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/api/v1/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -66,6 +67,29 @@ app.include_router(jobs_router, prefix="/api/v1", tags=["jobs"])
 app.include_router(tcp_stratum_router, prefix="/api/v1", tags=["tcp-stratum"])
 
 
+# ========== Обработчик необработанных исключений ==========
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """
+    Единый ответ 500 вместо try/except в каждом эндпоинте.
+
+    Текст исключения наружу не отдаем - он попадает только в лог.
+    HTTPException сюда не доходят, их обрабатывает FastAPI.
+    """
+    api_logger.error(
+        "Необработанная ошибка при обработке запроса",
+        event="api_unhandled_exception",
+        method=request.method,
+        path=request.url.path,
+        error_type=type(exc).__name__,
+        error=str(exc)
+    )
+    return ORJSONResponse(
+        status_code=500,
+        content={"detail": "Внутренняя ошибка сервера"}
+    )
+
+
 # ========== Middleware для логирования запросов ==========
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -203,9 +227,9 @@ async def readiness(db: AsyncSession = Depends(get_db)):
 
     # Проверяем подключение к ноде
     node_ok = False
-    if job_manager and hasattr(job_manager, 'node_client'):
+    if container.job_manager and hasattr(container.job_manager, 'node_client'):
         try:
-            node_ok = await job_manager.node_client.ping()
+            node_ok = await container.job_manager.node_client.ping()
         except Exception as e:
             logger.error(f"Node connection failed: {e}")
 
@@ -306,13 +330,13 @@ async def websocket_endpoint(websocket: WebSocket, miner_address: str):
     connection_id = None
 
     try:
-        connection_id = await stratum_server.connect(websocket, miner_address)
+        connection_id = await container.stratum_server.connect(websocket, miner_address)
 
         try:
             while True:
                 data = await websocket.receive_json()
                 api_logger.debug(f"Stratum сообщение от {miner_address}: {data}")
-                await stratum_server.handle_message(websocket, connection_id, data)
+                await container.stratum_server.handle_message(websocket, connection_id, data)
 
         except WebSocketDisconnect:
             api_logger.info(f"Stratum отключился: {miner_address}")
@@ -325,22 +349,22 @@ async def websocket_endpoint(websocket: WebSocket, miner_address: str):
         api_logger.error(f"Ошибка подключения WebSocket: {e}")
     finally:
         if connection_id:
-            await stratum_server.disconnect(connection_id)
+            await container.stratum_server.disconnect(connection_id)
 
 
 @app.get("/stratum/stats", response_model=ApiResponse)
 async def get_stratum_stats():
     """Статистика всех Stratum серверов"""
     try:
-        ws_stats = stratum_server.get_stats()
+        ws_stats = container.stratum_server.get_stats()
         tcp_stats = {
-            "active_connections": len(tcp_stratum_server.connections),
-            "active_miners": len(tcp_stratum_server.miners),
-            "port": tcp_stratum_server.port
+            "active_connections": len(container.tcp_stratum_server.connections),
+            "active_miners": len(container.tcp_stratum_server.miners),
+            "port": container.tcp_stratum_server.port
         }
 
         total_connections = ws_stats["active_connections"] + tcp_stats["active_connections"]
-        total_miners = ws_stats["active_miners"] + len(tcp_stratum_server.miners)
+        total_miners = ws_stats["active_miners"] + len(container.tcp_stratum_server.miners)
 
         return ApiResponse(
             status="success",
@@ -375,9 +399,9 @@ async def get_services_stats():
     try:
         # Получаем статистику пула из database_service
         pool_stats = {}
-        if hasattr(database_service, 'get_pool_stats'):
+        if hasattr(container.database_service, 'get_pool_stats'):
             try:
-                pool_stats = await database_service.get_pool_stats()
+                pool_stats = await container.database_service.get_pool_stats()
             except Exception as e:
                 api_logger.error(f"Ошибка получения статистики пула из database_service: {e}")
                 pool_stats = {"error": "unavailable"}
@@ -396,21 +420,21 @@ async def get_services_stats():
                         "type": "AuthService",
                         "status": "active"
                     },
-                    "job_service": job_service.get_stats() if hasattr(job_service, 'get_stats') else {},
-                    "stratum_server": stratum_server.get_stats(),
+                    "job_service": container.job_service.get_stats() if hasattr(container.job_service, 'get_stats') else {},
+                    "stratum_server": container.stratum_server.get_stats(),
                     "tcp_stratum_server": {
-                        "active_connections": len(tcp_stratum_server.connections),
-                        "active_miners": len(tcp_stratum_server.miners),
-                        "port": tcp_stratum_server.port
+                        "active_connections": len(container.tcp_stratum_server.connections),
+                        "active_miners": len(container.tcp_stratum_server.miners),
+                        "port": container.tcp_stratum_server.port
                     },
                     "validator": {
-                        "jobs_count": len(share_validator.jobs_cache) if hasattr(share_validator, 'jobs_cache') else 0
+                        "jobs_count": len(container.share_validator.jobs_cache) if hasattr(container.share_validator, 'jobs_cache') else 0
                     },
-                    "job_manager": job_manager.get_stats() if hasattr(job_manager, 'get_stats') else {}
+                    "job_manager": container.job_manager.get_stats() if hasattr(container.job_manager, 'get_stats') else {}
                 },
                 "totals": {
-                    "active_miners": len(set(stratum_server.miner_addresses.values())) + len(tcp_stratum_server.miners),
-                    "total_connections": len(stratum_server.active_connections) + len(tcp_stratum_server.connections),
+                    "active_miners": container.stratum_server.active_miner_count + len(container.tcp_stratum_server.miners),
+                    "total_connections": len(container.stratum_server.active_connections) + len(container.tcp_stratum_server.connections),
                     "pool_stats": pool_stats
                 }
             }
@@ -434,9 +458,9 @@ async def get_services_health():
             "database_service": "healthy",
             "auth_service": "healthy",
             "job_service": "healthy",
-            "stratum_server": "healthy" if hasattr(stratum_server, 'active_connections') else "degraded",
-            "tcp_server": "healthy" if hasattr(tcp_stratum_server, 'connections') else "degraded",
-            "job_manager": "connected" if hasattr(job_manager, 'block_height') and job_manager.block_height > 0 else "disconnected",
+            "stratum_server": "healthy" if hasattr(container.stratum_server, 'active_connections') else "degraded",
+            "tcp_server": "healthy" if hasattr(container.tcp_stratum_server, 'connections') else "degraded",
+            "job_manager": "connected" if hasattr(container.job_manager, 'block_height') and container.job_manager.block_height > 0 else "disconnected",
         }
 
         all_healthy = all(
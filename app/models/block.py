@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, text
 from datetime import datetime, UTC
 from app.models import Base
 
@@ -11,4 +11,11 @@ class Block(Base):
     hash = Column(String(64), unique=True, nullable=False, index=True)
     miner_address = Column(String(128), nullable=False, index=True)
     confirmed = Column(Boolean, default=False)
-    found_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
\ No newline at end of file
+    found_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
+
+    __table_args__ = (
+        # Блоки майнера по времени (списки ORDER BY found_at DESC, фильтр по периоду)
+        Index('ix_blocks_miner_found_at', miner_address, found_at.desc()),
+        # Только подтверждённые блоки - для confirmed_only
+        Index('ix_blocks_miner_confirmed_found_at', miner_address, found_at.desc(), postgresql_where=text('confirmed')),
+    )
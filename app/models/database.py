@@ -1,3 +1,7 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 # from sqlalchemy import create_engine
@@ -14,7 +18,16 @@ class Base(DeclarativeBase):
 
 # ========== 3. ASYNC ДВИЖОК (для приложения) ==========
 ASYNC_DATABASE_URL = f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
-async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+# Диалект asyncpg сам выбирает AsyncAdaptedQueuePool.
+# Пул прогревается при старте (warm_up_pool), свежесть соединений - через pool_recycle
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.debug,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping
+)
 AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 # ========== 4. DEPENDENCY ДЛЯ FASTAPI ==========
@@ -26,11 +39,48 @@ async def get_db():
         finally:
             await session.close()
 
+
+async def get_db_connector():
+    """
+    Фабрика async соединений для read-only эндпоинтов.
+
+    Без ORM сессии: нет identity map и unit of work, только Core запросы.
+    Соединение берется из пула там, где оно нужно (async with connect() as db):
+    в кэшируемых эндпоинтах - только на промахе кэша, в потоковых - внутри генератора.
+    """
+    return async_engine.connect
+
+
+async def get_db_session_factory():
+    """
+    Фабрика ORM сессий для потоковых ответов.
+
+    Генератор StreamingResponse открывает и закрывает сессию сам
+    (async with session_factory() as db), поэтому чтение курсора не зависит
+    от того, когда FastAPI выполняет teardown yield-зависимостей.
+    """
+    return AsyncSessionLocal
+
 # ========== 5. ПОЛЕЗНЫЕ ФУНКЦИИ ==========
 # def get_sync_engine():
 #     """Получение sync движка (для миграций, скриптов)"""
 #     return sync_engine
 
+async def warm_up_pool(size: int = settings.db_pool_size) -> int:
+    """
+    Заранее открыть соединения пула, чтобы первые запросы не тратили время на connect.
+
+    Все соединения держатся открытыми одновременно, иначе пул вернул бы
+    одно и то же соединение несколько раз.
+    """
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(async_engine.connect()) for _ in range(size))
+        )
+        await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in connections))
+        return len(connections)
+
+
 def get_async_engine():
     """Получение async движка (для приложения)"""
     return async_engine
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Index, bindparam, func, select, text
 from app.models import Base
 
 
@@ -14,5 +14,18 @@ class Miner(Base):
     is_active = Column(Boolean, default=True)
     hashrate = Column(Float, default=0.0)
 
+    # Серверные значения (id, created_at) забираются через INSERT ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        # Частичный индекс для списка активных майнеров (active_only=True)
+        Index('ix_miners_active_id', 'id', postgresql_where=text('is_active')),
+    )
+
     def __repr__(self):
-        return f"<Miner {self.bch_address}:{self.worker_name}>"
\ No newline at end of file
+        return f"<Miner {self.bch_address}:{self.worker_name}>"
+
+
+# Общий запрос "майнер по адресу": собирается один раз при импорте,
+# адрес передается параметром - execute(MINER_BY_ADDRESS, {"bch_address": ...})
+MINER_BY_ADDRESS = select(Miner).where(Miner.bch_address == bindparam("bch_address"))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float
+from sqlalchemy import Column, Integer, String, Boolean, Float, Index, text
 from datetime import datetime, UTC
 from sqlalchemy import TIMESTAMP
 from app.models import Base
@@ -18,5 +18,12 @@ class Share(Base):
     nonce = Column(String(16), nullable=True)
     submitted_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(UTC), index=True)
 
+    __table_args__ = (
+        # Шары майнера по времени (списки ORDER BY submitted_at DESC, фильтр по периоду)
+        Index('ix_shares_miner_submitted_at', miner_address, submitted_at.desc()),
+        # Только валидные шары - для агрегатов статистики и valid_only
+        Index('ix_shares_miner_valid_submitted_at', miner_address, submitted_at, postgresql_where=text('is_valid')),
+    )
+
     def __repr__(self):
         return f"<Share {self.id}:{self.miner_address[:8]}:{self.job_id}>"
\ No newline at end of file
@@ -2,11 +2,16 @@
 Pydantic схемы для валидации данных - версия для Pydantic V2
 """
 from datetime import datetime, UTC
-from typing import Optional, List, Dict, Any, ClassVar, TYPE_CHECKING
-from pydantic import BaseModel, Field, field_validator, ConfigDict, StringConstraints
+from typing import Optional, List, Dict, Any, ClassVar, Generic, Literal, TypeVar, Union, TYPE_CHECKING
+from pydantic import (
+    AliasChoices, AliasPath, BaseModel, Field, field_validator, computed_field, model_serializer, ConfigDict,
+    SerializationInfo, SerializerFunctionWrapHandler, StringConstraints
+)
 from typing_extensions import Annotated
 import re
 
+from app.utils.helpers import humanize_time_ago
+
 
 # ========== БАЗОВЫЕ СХЕМЫ ==========
 class PaginationParams(BaseModel):
@@ -102,6 +107,24 @@ class ShareResponse(ShareBase):
     submitted_at: datetime
 
 
+class MinerShareItem(BaseModel):
+    """Шар в списке шаров майнера"""
+    id: int
+    job_id: str
+    difficulty: float
+    is_valid: bool
+    submitted_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_serializer(mode="wrap")
+    def _with_time_ago(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo) -> Dict[str, Any]:
+        """Добавляет time_ago; момент "сейчас" берется из context["now"] один раз на список"""
+        data = handler(self)
+        data["time_ago"] = humanize_time_ago(self.submitted_at, (info.context or {}).get("now"))
+        return data
+
+
 # ========== БЛОКИ ==========
 class BlockBase(BaseModel):
     """Базовая схема блока"""
@@ -124,12 +147,62 @@ class BlockResponse(BlockBase):
     found_at: datetime
 
 
+class MinerBlockItem(BaseModel):
+    """Блок в списке блоков майнера"""
+    id: int
+    height: int
+    hash: str
+    confirmed: bool
+    found_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_serializer(mode="wrap")
+    def _with_time_ago(self, handler: SerializerFunctionWrapHandler, info: SerializationInfo) -> Dict[str, Any]:
+        """Добавляет time_ago; момент "сейчас" берется из context["now"] один раз на список"""
+        data = handler(self)
+        data["time_ago"] = humanize_time_ago(self.found_at, (info.context or {}).get("now"))
+        return data
+
+
+# ========== ЗАДАНИЯ ==========
+class JobHistoryItem(BaseModel):
+    """
+    Элемент истории заданий.
+
+    Строится напрямую из записей JobManager.job_history через алиасы,
+    поэтому разбор и сериализация списка выполняются в pydantic-core.
+    """
+    id: str = "unknown"
+    created_at: Union[str, datetime] = Field(
+        default="unknown",
+        validation_alias=AliasChoices("created_at_iso", "created_at")
+    )
+    miner: Optional[str] = Field(default="broadcast", validation_alias="miner_address")
+    height: Union[int, str] = Field(default="unknown", validation_alias=AliasPath("template", "height"))
+
+    @computed_field
+    @property
+    def type(self) -> Literal["personal", "broadcast"]:
+        """Тип задания: персональное или общее"""
+        return "personal" if self.miner and self.miner != "broadcast" else "broadcast"
+
+
 # ========== API ОТВЕТЫ С ДЕТАЛИЗАЦИЕЙ ==========
-class ApiResponse(BaseModel):
-    """Базовая схема ответа API"""
+DataT = TypeVar("DataT")
+
+
+class ApiResponse(BaseModel, Generic[DataT]):
+    """
+    Базовая схема ответа API.
+
+    Тип data можно уточнить (ApiResponse[Dict[str, MinerResponse]]) - тогда
+    вложенные модели передаются как есть, без model_dump() и повторной
+    валидации словаря. Без параметра data принимает любые данные.
+    """
     status: str = Field(..., description="Статус операции: success, error, warning")
     message: str = Field(..., description="Сообщение для пользователя")
-    data: Optional[Dict[str, Any]] = Field(default=None, description="Данные ответа")
+    data: Optional[DataT] = Field(default=None, description="Данные ответа")
     timestamp: datetime = Field(default_factory=lambda: datetime.now(UTC), description="Временная метка")
     request_id: Optional[str] = Field(default=None, description="Идентификатор запроса (для трассировки)")
 
@@ -151,6 +224,27 @@ class ApiResponse(BaseModel):
         return cls(status="warning", message=message, data=data)
 
 
+def api_response_content(
+        status: str,
+        message: str,
+        data: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Содержимое ответа в формате ApiResponse без создания Pydantic модели.
+
+    Используется с ORJSONResponse на горячих эндпоинтах: orjson сам
+    сериализует datetime, валидация модели не нужна.
+    """
+    return {
+        "status": status,
+        "message": message,
+        "data": data,
+        "timestamp": timestamp or datetime.now(UTC),
+        "request_id": None
+    }
+
+
 class PaginatedResponse(BaseModel):
     """Схема для пагинированных ответов"""
     items: List[Any]
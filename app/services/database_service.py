@@ -3,11 +3,12 @@
 """
 from typing import Optional, Dict, List, Tuple
 from datetime import datetime, UTC, timedelta
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists
 
 from app.utils.logging_config import StructuredLogger
 from app.models.database import AsyncSessionLocal
 from app.models import Miner, Share, Block
+from app.models.miner import MINER_BY_ADDRESS
 
 
 logger = StructuredLogger(__name__)
@@ -23,9 +24,7 @@ class DatabaseService:
         """Получить майнера по адресу"""
         try:
             async with AsyncSessionLocal() as session:
-                result = await session.execute(
-                    select(Miner).where(Miner.bch_address == bch_address)
-                )
+                result = await session.execute(MINER_BY_ADDRESS, {"bch_address": bch_address})
                 miner = result.scalar_one_or_none()
 
                 logger.debug(
@@ -52,9 +51,7 @@ class DatabaseService:
         try:
             async with AsyncSessionLocal() as session:
                 # Проверяем существование
-                result = await session.execute(
-                    select(Miner).where(Miner.bch_address == bch_address)
-                )
+                result = await session.execute(MINER_BY_ADDRESS, {"bch_address": bch_address})
                 miner = result.scalar_one_or_none()
 
                 if miner:
@@ -62,7 +59,6 @@ class DatabaseService:
                     if miner.worker_name != worker_name:
                         miner.worker_name = worker_name
                         await session.commit()
-                        await session.refresh(miner)
 
                         logger.info(
                             "Обновлено имя воркера майнера",
@@ -87,8 +83,8 @@ class DatabaseService:
                     hashrate=0.0
                 )
                 session.add(miner)
+                # id и created_at приходят через RETURNING (eager_defaults) - refresh не нужен
                 await session.commit()
-                await session.refresh(miner)
 
                 logger.info(
                     "Майнер зарегистрирован",
@@ -115,9 +111,7 @@ class DatabaseService:
         try:
             async with AsyncSessionLocal() as session:
                 # Получаем майнера
-                result = await session.execute(
-                    select(Miner).where(Miner.bch_address == miner_address)
-                )
+                result = await session.execute(MINER_BY_ADDRESS, {"bch_address": miner_address})
                 miner = result.scalar_one_or_none()
 
                 if not miner:
@@ -335,13 +329,13 @@ class DatabaseService:
         """Сохранение информации о найденном блоке"""
         try:
             async with AsyncSessionLocal() as session:
-                # Проверяем существование
+                # Проверяем существование: EXISTS по уникальному индексу, без загрузки строки
                 result = await session.execute(
-                    select(Block).where(Block.hash == block_hash)
+                    select(exists().where(Block.hash == block_hash))
                 )
-                existing_block = result.scalar_one_or_none()
+                block_exists = result.scalar()
 
-                if existing_block:
+                if block_exists:
                     logger.warning(
                         "Блок уже существует в БД",
                         event="db_block_exists",
@@ -362,9 +356,7 @@ class DatabaseService:
                 session.add(block)
 
                 # Обновляем счетчик блоков у майнера
-                result = await session.execute(
-                    select(Miner).where(Miner.bch_address == miner_address)
-                )
+                result = await session.execute(MINER_BY_ADDRESS, {"bch_address": miner_address})
                 miner = result.scalar_one_or_none()
                 if miner:
                     miner.total_blocks += 1
@@ -478,9 +470,7 @@ class DatabaseService:
         try:
             async with AsyncSessionLocal() as session:
                 # Получаем майнера
-                result = await session.execute(
-                    select(Miner).where(Miner.bch_address == miner_address)
-                )
+                result = await session.execute(MINER_BY_ADDRESS, {"bch_address": miner_address})
                 miner = result.scalar_one_or_none()
 
                 if not miner:
@@ -1,8 +1,7 @@
 """
 Сервис для управления динамической сложностью
 """
-import statistics
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, UTC, timedelta
 from collections import deque
 
@@ -47,6 +46,10 @@ class DifficultyService:
         self.average_hashrate = 0.0
         self.last_difficulty_update = datetime.now(UTC)
 
+        # Число подключенных майнеров (WebSocket + TCP), которое серверы
+        # присылают событиями. None - подключения не отслеживаются
+        self.connected_clients: Optional[int] = None
+
         logger.info(
             "DifficultyService инициализирован",
             event="difficulty_service_initialized",
@@ -58,6 +61,35 @@ class DifficultyService:
             enable_dynamic_difficulty=settings.enable_dynamic_difficulty
         )
 
+    def track_connections(self, *servers) -> None:
+        """
+        Подписаться на события подключения Stratum серверов.
+
+        Начальное значение берется из connection_count, дальше счетчик
+        обновляется событиями, без обхода словарей подключений.
+        """
+        servers = [server for server in servers if server is not None]
+        self.connected_clients = sum(server.connection_count for server in servers)
+        for server in servers:
+            server.add_connection_listener(self.on_connection_event)
+
+        logger.debug(
+            "DifficultyService отслеживает подключения",
+            event="difficulty_tracking_connections",
+            servers=len(servers),
+            connected_clients=self.connected_clients
+        )
+
+    def on_connection_event(self, event: str, client_id: str) -> None:
+        """Обработка события miner_connected / miner_disconnected от сервера"""
+        if self.connected_clients is None:
+            return
+
+        if event == "miner_connected":
+            self.connected_clients += 1
+        elif event == "miner_disconnected":
+            self.connected_clients = max(0, self.connected_clients - 1)
+
     async def add_share(self, miner_address: str, difficulty: float = 1.0) -> None:
         """Добавление шара для расчета сложности"""
         try:
@@ -184,6 +216,14 @@ class DifficultyService:
 
     async def update_difficulty(self) -> Tuple[bool, float, str]:
         """Обновление сложности и рассылка майнерам"""
+        if self.connected_clients == 0:
+            # Некому рассылать - не пересчитываем сложность впустую
+            logger.debug(
+                "Нет подключенных майнеров, обновление сложности пропущено",
+                event="difficulty_update_skipped_no_miners"
+            )
+            return False, self.current_difficulty, "No connected miners"
+
         try:
             # Рассчитываем новую сложность
             new_difficulty = await self.calculate_difficulty()
@@ -305,30 +345,26 @@ class DifficultyService:
             if miner_address not in self.share_timestamps:
                 return 0.0
 
-            timestamps = list(self.share_timestamps[miner_address])
-            if not timestamps:
-                return 0.0
-
-            # Фильтруем по периоду
+            # Один проход по таймстампам за период без промежуточных списков:
+            # среднее интервалов между соседними шарами телескопируется
+            # в (последний - первый) / (n - 1)
             cutoff_time = datetime.now(UTC) - timedelta(minutes=period_minutes)
-            recent_timestamps = [ts for ts in timestamps if ts > cutoff_time]
-
-            if len(recent_timestamps) < 2:
+            first_timestamp = last_timestamp = None
+            shares_count = 0
+            for timestamp in self.share_timestamps[miner_address]:
+                if timestamp > cutoff_time:
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+                    last_timestamp = timestamp
+                    shares_count += 1
+
+            if shares_count < 2:
                 return 0.0
 
-            # Рассчитываем время между шарами
-            time_diffs = []
-            for i in range(1, len(recent_timestamps)):
-                diff = (recent_timestamps[i] - recent_timestamps[i - 1]).total_seconds()
-                time_diffs.append(diff)
-
+            avg_time_between_shares = (last_timestamp - first_timestamp).total_seconds() / (shares_count - 1)
             # Если все шары были почти одновременно, используем минимальное время
-            if not time_diffs:
-                avg_time_between_shares = 1.0
-            else:
-                avg_time_between_shares = statistics.mean(time_diffs)
-                if avg_time_between_shares < 0.1:  # Минимум 0.1 секунды
-                    avg_time_between_shares = 0.1
+            if avg_time_between_shares < 0.1:  # Минимум 0.1 секунды
+                avg_time_between_shares = 0.1
 
             # Рассчитываем хэшрейт
             # Каждый шар при сложности 1.0 соответствует 2^32 хэшей
@@ -340,7 +376,7 @@ class DifficultyService:
                 event="difficulty_miner_hashrate_calculated",
                 miner_address=miner_address[:20] + "...",
                 hashrate=hashrate,
-                shares_count=len(recent_timestamps),
+                shares_count=shares_count,
                 period_minutes=period_minutes,
                 avg_time_between_shares=avg_time_between_shares
             )
@@ -436,7 +472,8 @@ class DifficultyService:
             "enable_dynamic": settings.enable_dynamic_difficulty,
             "min_difficulty": self.min_difficulty,
             "max_difficulty": self.max_difficulty,
-            "history_size": len(self.share_history)
+            "history_size": len(self.share_history),
+            "connected_clients": self.connected_clients
         }
 
 
@@ -1,16 +1,26 @@
 """
 Сервис для управления заданиями (jobs) - координация между JobManager и Stratum серверами
 """
+import functools
+import logging
 import time
+from collections import deque
+from itertools import islice
 from typing import Dict, Optional, Set, List, Tuple
 from datetime import datetime, UTC
 
 from app.utils.logging_config import StructuredLogger
-from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, create_job_id
+from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, JOB_MAX_HISTORY_SIZE, UINT32_BE, create_job_id
 
 logger = StructuredLogger(__name__)
 
 
+@functools.lru_cache(maxsize=1024)
+def _job_id_suffix(miner_address: Optional[str]) -> str:
+    """Окончание ID задания: первые 8 символов адреса (считается один раз на адрес)"""
+    return "_" + miner_address[:8] if miner_address else "_broadcast"
+
+
 class JobService:
     """Сервис для управления заданиями майнинг-пула"""
 
@@ -25,9 +35,9 @@ class JobService:
         # Счетчик заданий для уникальных ID
         self.job_counter = 0
 
-        # История заданий (последние N)
-        self.job_history: List[dict] = []
-        self.max_history_size = 100
+        # История заданий (последние N) - старые записи вытесняет сам deque
+        self.max_history_size = JOB_MAX_HISTORY_SIZE
+        self.job_history: deque = deque(maxlen=self.max_history_size)
 
         # Последнее общее задание
         self.last_broadcast_job: Optional[dict] = None
@@ -49,22 +59,17 @@ class JobService:
     def create_job_id(self, miner_address: str = None) -> str:
         """Создание уникального ID задания"""
         self.job_counter += 1
-        timestamp = int(datetime.now(UTC).timestamp())
-
-        if miner_address:
-            # Персональное задание для майнера
-            job_id = f"job_{timestamp}_{self.job_counter:08x}_{miner_address[:8]}"
-        else:
-            # Общее задание для broadcast
-            job_id = f"job_{timestamp}_{self.job_counter:08x}_broadcast"
+        # Вызывается на каждого майнера при каждой рассылке
+        job_id = "job_%d_%08x%s" % (time.time(), self.job_counter, _job_id_suffix(miner_address))
 
-        logger.debug(
-            "Создан ID задания",
-            event="job_service_job_id_created",
-            job_id=job_id,
-            miner_address=miner_address or "broadcast",
-            job_counter=self.job_counter
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Создан ID задания",
+                event="job_service_job_id_created",
+                job_id=job_id,
+                miner_address=miner_address or "broadcast",
+                job_counter=self.job_counter
+            )
 
         return job_id
 
@@ -72,6 +77,11 @@ class JobService:
         """
         Добавить задание в систему
 
+        Вызывается синхронно, до отправки задания майнеру: шар по заданию
+        может прийти сразу, поэтому откладывать запись (очередь) нельзя.
+        Работа только в памяти, подробный лог - в DEBUG (вызов на каждого
+        майнера при каждой рассылке).
+
         Args:
             job_id: Уникальный ID задания
             job_data: Данные задания в формате Stratum
@@ -90,9 +100,7 @@ class JobService:
 
             # Если это персональное задание, добавляем в подписки майнера
             if miner_address:
-                if miner_address not in self.miner_subscriptions:
-                    self.miner_subscriptions[miner_address] = set()
-                self.miner_subscriptions[miner_address].add(job_id)
+                self.miner_subscriptions.setdefault(miner_address, set()).add(job_id)
 
             # Добавляем в историю
             job_record = {
@@ -104,20 +112,16 @@ class JobService:
             }
             self.job_history.append(job_record)
 
-            # Ограничиваем размер истории
-            if len(self.job_history) > self.max_history_size:
-                self.job_history = self.job_history[-self.max_history_size:]
-
-            logger.info(
-                "Задание добавлено в систему",
-                event="job_added",
-                job_id=job_id,
-                miner_address=miner_address or "broadcast",
-                job_type="personal" if miner_address else "broadcast",
-                total_active_jobs=len(self.active_jobs),
-                total_subscribed_miners=len(self.miner_subscriptions)
-            )
-
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Задание добавлено в систему",
+                    event="job_added",
+                    job_id=job_id,
+                    miner_address=miner_address or "broadcast",
+                    job_type="personal" if miner_address else "broadcast",
+                    total_active_jobs=len(self.active_jobs),
+                    total_subscribed_miners=len(self.miner_subscriptions)
+                )
 
         except Exception as e:
             logger.error(
@@ -247,13 +251,13 @@ class JobService:
         """Создать fallback задание с реалистичными тестовыми данными"""
 
 
-        job_id = create_job_id(timestamp=int(time.time()),
+        # Одно чтение часов: то же время идет в ID задания и в ntime
+        timestamp = int(time.time())
+        job_id = create_job_id(timestamp=timestamp,
                                counter=self.job_counter,
                                miner_address=miner_address)
         self.job_counter += 1
 
-        timestamp = int(datetime.now(UTC).timestamp())
-
         # Реалистичные тестовые данные для BCH testnet4
         job_data = {
             "method": "mining.notify",
@@ -263,9 +267,9 @@ class JobService:
                 "01000000010000000000000000000000000000000000000000000000000000000000000000ffffffff",
                 "ffffffff0100f2052a010000001976a9147c154ed1dc59609e3d26abb2df2ea3d587cd8c4188ac00000000",
                 [],
-                format(self.network_manager.get_default_block_version(), '08x'),  # из конфига
+                UINT32_BE.pack(self.network_manager.get_default_block_version()).hex(),  # из конфига
                 self.network_manager.get_default_bits(),  # из конфига
-                format(timestamp, '08x'),
+                UINT32_BE.pack(timestamp).hex(),
                 True
             ],
             "extra_nonce1": STRATUM_EXTRA_NONCE1,
@@ -288,7 +292,8 @@ class JobService:
 
     def cleanup_old_jobs(self, max_age_seconds: int = 300):
         """Очистка старых заданий"""
-        current_time = datetime.now(UTC)
+        # Время создания - unix timestamp из job_id, сравниваем числа без datetime
+        current_time = time.time()
         jobs_to_remove = []
 
         for job_id, job_data in self.active_jobs.items():
@@ -297,10 +302,7 @@ class JobService:
                 if job_id.startswith("job_"):
                     parts = job_id.split('_')
                     if len(parts) >= 2:
-                        timestamp_str = parts[1]
-                        job_time = datetime.fromtimestamp(float(timestamp_str), UTC)
-
-                        age = (current_time - job_time).total_seconds()
+                        age = current_time - float(parts[1])
                         if age > max_age_seconds:
                             jobs_to_remove.append(job_id)
             except (IndexError, ValueError, AttributeError):
@@ -345,11 +347,9 @@ class JobService:
 
     def get_job_history(self, limit: int = 10) -> List[dict]:
         """Получить историю заданий"""
-        history = self.job_history[-limit:] if self.job_history else []
-
         # Форматируем для отображения
         formatted_history = []
-        for job in reversed(history):  # Новые сверху
+        for job in islice(reversed(self.job_history), limit):  # Новые сверху
             formatted_history.append({
                 "id": job["id"],
                 "created_at": job["created_at"].isoformat(),
@@ -2,13 +2,17 @@
 Модуль для сборки полного блока BCH из данных майнера
 """
 import hashlib
+import logging
 import struct
 import json
+import time
 from typing import Dict, List, Optional, Tuple
-from datetime import datetime, UTC
 
 from app.utils.logging_config import StructuredLogger
-from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1
+from app.utils.protocol_helpers import (
+    STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE, BLOCK_HEADER_SIZE, UINT32_BE, DEFAULT_VERSION_HEX,
+    ZERO_HASH_HEX, DEFAULT_BITS, SubmitStatus
+)
 from app.utils.bch_address import create_coinbase_script
 from app.utils.config import settings
 
@@ -78,7 +82,7 @@ class BlockBuilder:
     def calculate_merkle_root(tx_hashes: List[str]) -> str:
         """Вычисление Merkle root из списка хэшей транзакций"""
         if not tx_hashes:
-            return "0" * 64
+            return ZERO_HASH_HEX
 
         # Конвертируем все хэши в бинарный формат (little-endian как в BCH)
         hashes = [bytes.fromhex(h)[::-1] for h in tx_hashes]
@@ -100,6 +104,41 @@ class BlockBuilder:
 
         return hashes[0][::-1].hex()  # Возвращаем в big-endian для отображения
 
+    @classmethod
+    def prepare_template(cls, template: Dict) -> Dict:
+        """
+        Данные шаблона, не зависящие от майнера и nonce
+
+        Хэши и hex транзакций, сумма комиссий и merkle branch coinbase
+        одинаковы для всех заданий одного шаблона, поэтому их достаточно
+        собрать один раз. Branch для индекса 0 не зависит от самой coinbase.
+        """
+        transactions = template.get('transactions', [])
+        tx_hashes = [tx['hash'] for tx in transactions if 'hash' in tx]
+        return {
+            "tx_hashes": tx_hashes,
+            "merkle_branch": cls._calculate_merkle_branch(["00" * 32] + tx_hashes),
+            "tx_data": [
+                tx['data'] if 'data' in tx else tx['hex']
+                for tx in transactions
+                if 'data' in tx or 'hex' in tx
+            ],
+            "fees": sum(tx.get('fee', 0) for tx in transactions)
+        }
+
+    @staticmethod
+    def _split_coinbase(coinbase_hex: str, extra_nonce1: str) -> Optional[Tuple[bytes, bytes]]:
+        """Разделить coinbase на coinb1/coinb2 вокруг extra_nonce1 + extra_nonce2"""
+        coinbase_bytes = bytes.fromhex(coinbase_hex)
+        extra_nonce1_bytes = bytes.fromhex(extra_nonce1)
+        pos = coinbase_bytes.find(extra_nonce1_bytes)
+        if pos < 0:
+            return None
+        return (
+            coinbase_bytes[:pos],
+            coinbase_bytes[pos + len(extra_nonce1_bytes) + EXTRA_NONCE2_SIZE:]
+        )
+
     @staticmethod
     def _encode_varint(value: int) -> bytes:
         """Кодирование varint (переменная длина)"""
@@ -116,7 +155,8 @@ class BlockBuilder:
                                    template: Dict,
                                    miner_address: str,
                                    extra_nonce1: str = STRATUM_EXTRA_NONCE1,
-                                   extra_nonce2: str = "00000000"
+                                   extra_nonce2: str = "00000000",
+                                   prepared: Optional[Dict] = None
                                    ) -> Tuple[str, str, str]:
         """
         Сборка coinbase транзакции
@@ -126,27 +166,32 @@ class BlockBuilder:
             miner_address: Адрес майнера для выплаты
             extra_nonce1: Extra nonce 1 из Stratum
             extra_nonce2: Extra nonce 2 от майнера
+            prepared: Результат prepare_template (если уже посчитан)
 
         Returns:
             Tuple[coinbase_hex, coinbase_txid, merkle_branch]
         """
         try:
+            if prepared is None:
+                prepared = self.prepare_template(template)
+
             # Получаем награду за блок из шаблона
             coinbase_value = self._get_coinbase_value(template)
 
             # Суммируем комиссии транзакций из шаблона
-            transaction_fees = sum(tx.get('fee', 0) for tx in template.get('transactions', []))
+            transaction_fees = prepared["fees"]
             total_value = coinbase_value + transaction_fees
 
-            logger.debug(
-                "Создание coinbase транзакции",
-                event="block_builder_coinbase_creating",
-                height=template.get('height', 'unknown'),
-                coinbase_value=coinbase_value,
-                transaction_fees=transaction_fees,
-                total_value=total_value,
-                miner_address=miner_address[:20] + "..." if miner_address else "unknown"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Создание coinbase транзакции",
+                    event="block_builder_coinbase_creating",
+                    height=template.get('height', 'unknown'),
+                    coinbase_value=coinbase_value,
+                    transaction_fees=transaction_fees,
+                    total_value=total_value,
+                    miner_address=miner_address[:20] + "..." if miner_address else "unknown"
+                )
 
             # ========== 1. Создание ScriptSig (coinbase input) ==========
             # BIP-34: Height должен быть в ScriptSig (начиная с блока 227,836 для BCH)
@@ -246,30 +291,22 @@ class BlockBuilder:
             # Переворачиваем для правильного порядка байт (little-endian для Merkle tree)
             coinbase_txid_le = coinbase_txid[::-1].hex()
 
-            # ========== 4. Создание Merkle branch для Stratum ==========
-            # Для Stratum протокола нужен список хэшей транзакций для Merkle branch
-            merkle_branch = []
-            all_tx_hashes = [coinbase_txid_le]
-
-            # Добавляем хэши других транзакций из шаблона
-            for tx in template.get('transactions', []):
-                if 'hash' in tx:
-                    all_tx_hashes.append(tx['hash'])
-
-            # Вычисляем Merkle branch для coinbase
-            if len(all_tx_hashes) > 1:
-                merkle_branch = self._calculate_merkle_branch(all_tx_hashes)
-
-            logger.info(
-                "Coinbase транзакция создана",
-                event="block_builder_coinbase_created",
-                height=height,
-                txid=coinbase_txid.hex(),
-                value=total_value,
-                script_sig_size=script_sig_size,
-                script_pubkey_size=script_pubkey_size,
-                merkle_branch_length=len(merkle_branch)
-            )
+            # ========== 4. Merkle branch для Stratum ==========
+            # Branch coinbase не зависит от ее txid и посчитан в prepare_template
+            merkle_branch = prepared["merkle_branch"]
+
+            # Coinbase строится на каждое задание - подробности только в DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Coinbase транзакция создана",
+                    event="block_builder_coinbase_created",
+                    height=height,
+                    txid=coinbase_txid.hex(),
+                    value=total_value,
+                    script_sig_size=script_sig_size,
+                    script_pubkey_size=script_pubkey_size,
+                    merkle_branch_length=len(merkle_branch)
+                )
 
             return coinbase_tx.hex(), coinbase_txid_le, json.dumps(merkle_branch)
 
@@ -410,14 +447,15 @@ class BlockBuilder:
             # Для проверки сложности нужен big-endian
             header_hash_be = header_hash[::-1].hex()
 
-            logger.debug(
-                "Заголовок блока создан",
-                event="block_builder_header_created",
-                height=template.get('height', 'unknown'),
-                header_hash_prefix=header_hash_be[:16],
-                header_length=len(header),
-                merkle_root_prefix=merkle_root[:16]
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Заголовок блока создан",
+                    event="block_builder_header_created",
+                    height=template.get('height', 'unknown'),
+                    header_hash_prefix=header_hash_be[:16],
+                    header_length=len(header),
+                    merkle_root_prefix=merkle_root[:16]
+                )
 
             return header, header_hash_be
 
@@ -602,7 +640,8 @@ class BlockBuilder:
             extra_nonce1: str,
             extra_nonce2: str,
             ntime: str,
-            nonce: str
+            nonce: str,
+            prepared: Optional[Dict] = None
     ) -> Optional[Dict]:
         """
         Полное создание блока из всех компонентов
@@ -614,12 +653,15 @@ class BlockBuilder:
             extra_nonce2: Extra nonce 2
             ntime: Время
             nonce: Nonce
+            prepared: Результат prepare_template (если уже посчитан)
 
         Returns:
             Dict с полной информацией о блоке или None при ошибке
         """
         try:
             height = template.get('height', 'unknown')
+            if prepared is None:
+                prepared = self.prepare_template(template)
 
             logger.info(
                 "Создание полного блока",
@@ -630,7 +672,7 @@ class BlockBuilder:
 
             # 1. Создаем coinbase транзакцию
             coinbase_hex, coinbase_txid, merkle_branch_json = self.build_coinbase_transaction(
-                template, miner_address, extra_nonce1, extra_nonce2
+                template, miner_address, extra_nonce1, extra_nonce2, prepared
             )
 
             if not coinbase_hex:
@@ -641,13 +683,8 @@ class BlockBuilder:
                 )
                 return None
 
-            # 2. Собираем хэши транзакций для Merkle root
-            tx_hashes = [coinbase_txid]
-
-            # Добавляем хэши других транзакций из шаблона
-            for tx in template.get('transactions', []):
-                if 'hash' in tx:
-                    tx_hashes.append(tx['hash'])
+            # 2. Хэши транзакций для Merkle root: coinbase + заранее собранные из шаблона
+            tx_hashes = [coinbase_txid] + prepared["tx_hashes"]
 
             # 3. Рассчитываем Merkle root
             merkle_root = self.calculate_merkle_root(tx_hashes)
@@ -665,17 +702,9 @@ class BlockBuilder:
                 )
                 return None
 
-            # 5. Собираем остальные транзакции в hex
-            other_transactions = []
-            for tx in template.get('transactions', []):
-                if 'data' in tx:
-                    other_transactions.append(tx['data'])
-                elif 'hex' in tx:
-                    other_transactions.append(tx['hex'])
-
-            # 6. Собираем полный блок
+            # 5. Собираем полный блок (hex остальных транзакций уже собран)
             block_hex = self.assemble_full_block(
-                template, header, coinbase_hex, other_transactions
+                template, header, coinbase_hex, prepared["tx_data"]
             )
 
             if not block_hex:
@@ -686,10 +715,10 @@ class BlockBuilder:
                 )
                 return None
 
-            # 7. Рассчитываем размер блока
+            # 6. Рассчитываем размер блока
             block_size = len(block_hex) // 2  # hex -> bytes
 
-            # 8. Создаем результат
+            # 7. Создаем результат
             result = {
                 "block_hex": block_hex,
                 "header_hash": header_hash,
@@ -700,7 +729,7 @@ class BlockBuilder:
                 "transaction_count": len(tx_hashes),
                 "timestamp": int(ntime, 16) if len(ntime) == 8 else int(ntime),
                 "size_bytes": block_size,
-                "difficulty": template.get('bits', '1d00ffff'),
+                "difficulty": template.get('bits', DEFAULT_BITS),
                 "previous_block": template.get('previousblockhash', ''),
                 "version": template.get('version', 0x20000000),
                 "coinbase_value": template.get('coinbasevalue', 0)
@@ -732,7 +761,9 @@ class BlockBuilder:
             template: Dict,
             job_id: str,
             miner_address: str,
-            extra_nonce1: str = STRATUM_EXTRA_NONCE1
+            extra_nonce1: str = STRATUM_EXTRA_NONCE1,
+            prepared: Optional[Dict] = None,
+            now: Optional[int] = None
     ) -> Optional[Dict]:
         """
         Создание данных задания для Stratum протокола
@@ -742,45 +773,43 @@ class BlockBuilder:
             job_id: ID задания
             miner_address: Адрес майнера
             extra_nonce1: Extra nonce 1
+            prepared: Результат prepare_template (если уже посчитан)
+            now: Текущее время (unix, секунды), если уже известно вызывающему
 
         Returns:
             Данные задания в формате Stratum или None
         """
         try:
             height = template.get('height', 'unknown')
+            if prepared is None:
+                prepared = self.prepare_template(template)
 
             # Создаем coinbase транзакцию с placeholder для extra_nonce2
-            coinbase_hex, coinbase_txid, merkle_branch_json = self.build_coinbase_transaction(
-                template, miner_address, extra_nonce1, "00000000"  # placeholder
+            coinbase_hex, coinbase_txid, _ = self.build_coinbase_transaction(
+                template, miner_address, extra_nonce1, "00000000", prepared  # placeholder
             )
 
             if not coinbase_hex:
                 return None
 
-            # Разделяем coinbase на части для Stratum
-            coinbase_bytes = bytes.fromhex(coinbase_hex)
-            extra_nonce1_bytes = bytes.fromhex(extra_nonce1)
-
-            # Ищем extra_nonce1 в coinbase
-            try:
-                pos = coinbase_bytes.index(extra_nonce1_bytes)
-                coinb1 = coinbase_bytes[:pos].hex()
-                # extra_nonce2 placeholder занимает 4 байта (8 hex символов)
-                coinb2 = coinbase_bytes[pos + len(extra_nonce1_bytes) + 8:].hex()
-            except ValueError:
+            # Разделяем coinbase на части для Stratum: extra_nonce1 + placeholder extra_nonce2
+            parts = self._split_coinbase(coinbase_hex, extra_nonce1)
+            if parts:
+                coinb1, coinb2 = parts[0].hex(), parts[1].hex()
+            else:
                 # Если не нашли, используем упрощенное разделение
                 coinb1 = coinbase_hex[:100]  # Первая часть
                 coinb2 = coinbase_hex[100:]  # Вторая часть
 
-            # Получаем Merkle branch из JSON
-            try:
-                merkle_branch = json.loads(merkle_branch_json)
-            except (json.JSONDecodeError, TypeError):
-                merkle_branch = []
+            # Merkle branch уже посчитан в prepare_template - без круга через JSON
+            merkle_branch = prepared["merkle_branch"]
 
-            # Время из шаблона
-            curtime = template.get('curtime', int(datetime.now(UTC).timestamp()))
-            ntime_hex = format(curtime, '08x')
+            # Время из шаблона, но не раньше текущего: шаблон из кэша может
+            # использоваться для заданий долго (longpoll), ntime должен быть свежим
+            curtime = max(template.get('curtime', 0), int(time.time()) if now is None else now)
+            ntime_hex = UINT32_BE.pack(curtime).hex()
+            version = template.get('version')
+            version_hex = DEFAULT_VERSION_HEX if version is None else UINT32_BE.pack(version).hex()
 
             # Создаем Stratum job data
             job_data = {
@@ -791,8 +820,8 @@ class BlockBuilder:
                     coinb1,  # coinb1
                     coinb2,  # coinb2
                     merkle_branch,  # merkle_branch
-                    format(template.get('version', 0x20000000), '08x'),  # version
-                    template.get('bits', '1d00ffff'),  # nbits
+                    version_hex,  # version
+                    template.get('bits', DEFAULT_BITS),  # nbits
                     ntime_hex,  # ntime
                     True  # clean_jobs
                 ],
@@ -800,15 +829,17 @@ class BlockBuilder:
                 "template": template  # Сохраняем шаблон для сборки блока
             }
 
-            logger.info(
-                "Созданы данные задания Stratum",
-                event="block_builder_stratum_job_created",
-                height=height,
-                job_id=job_id,
-                coinb1_length=len(coinb1),
-                coinb2_length=len(coinb2),
-                merkle_branch_length=len(merkle_branch)
-            )
+            # Создание задания логирует JobManager, здесь - только детали в DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Созданы данные задания Stratum",
+                    event="block_builder_stratum_job_created",
+                    height=height,
+                    job_id=job_id,
+                    coinb1_length=len(coinb1),
+                    coinb2_length=len(coinb2),
+                    merkle_branch_length=len(merkle_branch)
+                )
 
             return job_data
 
@@ -822,6 +853,105 @@ class BlockBuilder:
             )
             return None
 
+    def prepare_block_scaffold(self, template: Dict, prepared: Optional[Dict] = None) -> Dict:
+        """
+        Заготовка блока шаблона: все, что не зависит от coinbase и решения майнера
+
+        Merkle branch для coinbase (индекс 0) не зависит от самой coinbase,
+        поэтому при найденном решении остается посчитать txid coinbase,
+        пройти по branch (O(log n) хэшей) и склеить заранее готовые байты.
+
+        Args:
+            template: Шаблон блока от ноды
+            prepared: Результат prepare_template (если уже посчитан)
+
+        Returns:
+            Dict для assemble_block_fast
+        """
+        if prepared is None:
+            prepared = self.prepare_template(template)
+
+        merkle_branch = prepared["merkle_branch"]
+        tx_data = prepared["tx_data"]
+        return {
+            "merkle_branch": [bytes.fromhex(h)[::-1] for h in merkle_branch],
+            "merkle_branch_json": json.dumps(merkle_branch),
+            "header_prefix": struct.pack('<I', template.get('version', self._get_default_version())) +
+                             bytes.fromhex(template.get('previousblockhash', self._get_prev_block_hash(template)))[::-1],
+            "bits": bytes.fromhex(template.get('bits', self._get_default_bits()))[::-1],
+            "tx_count_varint": self._encode_varint(len(tx_data) + 1),
+            "other_transactions": bytes.fromhex("".join(tx_data)),
+            "transaction_count": len(prepared["tx_hashes"]) + 1,
+            "height": template.get('height', 'unknown'),
+            "difficulty": template.get('bits', DEFAULT_BITS),
+            "previous_block": template.get('previousblockhash', ''),
+            "version": template.get('version', 0x20000000),
+            "coinbase_value": template.get('coinbasevalue', 0)
+        }
+
+    @staticmethod
+    def assemble_block_fast(
+            scaffold: Dict,
+            coinb1: str,
+            coinb2: str,
+            extra_nonce1: str,
+            extra_nonce2: str,
+            ntime: str,
+            nonce: str
+    ) -> Optional[Dict]:
+        """
+        Сборка блока из заготовки prepare_block_scaffold и coinbase задания
+
+        Coinbase берется из coinb1/coinb2, отправленных майнеру, то есть
+        ровно та, что он хэшировал. Результат в формате create_complete_block.
+        None - решение не подходит под заготовку (другой размер extra_nonce2,
+        ntime/nonce не в hex), тогда блок собирается через create_complete_block.
+        """
+        if len(extra_nonce2) != EXTRA_NONCE2_SIZE * 2 or len(ntime) != 8 or len(nonce) != 8:
+            return None
+
+        try:
+            coinbase_tx = bytes.fromhex(coinb1 + extra_nonce1 + extra_nonce2 + coinb2)
+            coinbase_txid = hashlib.sha256(hashlib.sha256(coinbase_tx).digest()).digest()
+
+            merkle_root = coinbase_txid
+            for branch_hash in scaffold["merkle_branch"]:
+                merkle_root = hashlib.sha256(hashlib.sha256(merkle_root + branch_hash).digest()).digest()
+
+            header = (
+                    scaffold["header_prefix"] +
+                    merkle_root +
+                    bytes.fromhex(ntime)[::-1] +
+                    scaffold["bits"] +
+                    bytes.fromhex(nonce)[::-1]
+            )
+        except ValueError:
+            return None
+
+        if len(header) != BLOCK_HEADER_SIZE:
+            return None
+
+        header_hash = hashlib.sha256(hashlib.sha256(header).digest()).digest()[::-1].hex()
+        block_bytes = b"".join((
+            header, scaffold["tx_count_varint"], coinbase_tx, scaffold["other_transactions"]
+        ))
+
+        return {
+            "block_hex": block_bytes.hex(),
+            "header_hash": header_hash,
+            "height": scaffold["height"],
+            "merkle_root": merkle_root[::-1].hex(),
+            "coinbase_txid": coinbase_txid[::-1].hex(),
+            "merkle_branch": scaffold["merkle_branch_json"],
+            "transaction_count": scaffold["transaction_count"],
+            "timestamp": int(ntime, 16),
+            "size_bytes": len(block_bytes),
+            "difficulty": scaffold["difficulty"],
+            "previous_block": scaffold["previous_block"],
+            "version": scaffold["version"],
+            "coinbase_value": scaffold["coinbase_value"]
+        }
+
     @staticmethod
     async def verify_block_with_node_async(
             block_hex: str,
@@ -852,19 +982,16 @@ class BlockBuilder:
 
             # Используем node_client если он имеет метод submit_block
             if hasattr(node_client, 'submit_block'):
-                result = await node_client.submit_block(block_hex)
+                status, detail = await node_client.submit_block(block_hex)
 
                 # Анализируем результат
-                if result and isinstance(result, dict):
-                    if result.get("status") == "accepted" or result.get("result") is None:
-                        logger.info("Блок принят нодой", event="block_builder_node_accepted")
-                        return True, "Block accepted by node", result
-                    else:
-                        error_msg = result.get("message", str(result))
-                        logger.error("Блок отклонен нодой", event="block_builder_node_rejected", error=error_msg)
-                        return False, f"Block rejected: {error_msg}", result
-                else:
-                    return False, "Unexpected response from node", result
+                if status is SubmitStatus.ACCEPTED:
+                    logger.info("Блок принят нодой", event="block_builder_node_accepted")
+                    return True, "Block accepted by node", detail
+
+                error_msg = detail.get("message", str(detail)) if detail else "Unknown error"
+                logger.error("Блок отклонен нодой", event="block_builder_node_rejected", error=error_msg)
+                return False, f"Block rejected: {error_msg}", detail
             else:
                 # Если node_client не имеет метода submit_block, возвращаем ошибку
                 logger.error(
@@ -1,11 +1,15 @@
 import asyncio
 import json
 import random
+
+import orjson
 from datetime import datetime, UTC
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app.utils.logging_config import StructuredLogger
-from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE
+from app.utils.protocol_helpers import (
+    STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE, UINT32_BE, ZERO_HASH_HEX, DEFAULT_VERSION_HEX, DEFAULT_BITS
+)
 from app.utils.config import settings
 
 logger = StructuredLogger(__name__)
@@ -26,6 +30,13 @@ class StratumTCPServer:
         self.connections: Dict[str, asyncio.StreamWriter] = {}
         self.miners: Dict[str, str] = {}  # client_id -> bch_address
         self._connection_times: Dict[str, datetime] = {}
+        # Вычисляются один раз при подключении - для /tcp-stratum/connections
+        self._remote_addrs: Dict[str, str] = {}  # client_id -> "ip:port"
+        self._connection_times_iso: Dict[str, str] = {}
+        # Кэш данных /tcp-stratum/stats (словарь и готовый JSON):
+        # сбрасывается при изменении connections/miners
+        self._stats_payload: Optional[Dict] = None
+        self._stats_payload_json: Optional[bytes] = None
         self.auth_service = auth_service
         self.database_service = database_service
         self.job_service = job_service
@@ -34,6 +45,8 @@ class StratumTCPServer:
         self.max_connections = 1000  # Максимальное количество подключений
         self._ip_connections: Dict[str, int] = {}
         self.max_per_ip = 10
+        # Подписчики на события подключения: callback(event, client_id)
+        self._connection_listeners: List[Callable[[str, str], None]] = []
 
         logger.info(
             "TCP Stratum сервер инициализирован",
@@ -91,10 +104,13 @@ class StratumTCPServer:
 
         if addr is None:
             client_id = f"unknown_{id(writer)}"
+            remote_address = "unknown"
         elif isinstance(addr, tuple) and len(addr) >= 2:
             client_id = f"{addr[0]}:{addr[1]}"
+            remote_address = client_id
         else:
             client_id = f"unknown_{id(writer)}"
+            remote_address = "unknown"
 
         print("=== NEW CLIENT CONNECTED ===", flush=True)
         logger.info("=== NEW CLIENT CONNECTED ===")
@@ -114,17 +130,22 @@ class StratumTCPServer:
 
         # Записываем время подключения
         connect_time = datetime.now(UTC)
+        connect_time_iso = connect_time.isoformat()
 
         async with self._lock:
             self._connection_times[client_id] = connect_time
+            self._connection_times_iso[client_id] = connect_time_iso
+            self._remote_addrs[client_id] = remote_address
             self.connections[client_id] = writer
+            self._invalidate_stats()
+        self._notify_connection("miner_connected", client_id)
 
         logger.info(
             'Новое TCP подключение',
             event="tcp_client_connected",
             client_id=client_id,
             remote_address=str(addr),
-            connect_time=connect_time.isoformat(),
+            connect_time=connect_time_iso,
             total_connections=len(self.connections) + 1
         )
 
@@ -200,8 +221,14 @@ class StratumTCPServer:
 
                 # Очищаем все данные клиента
                 self.miners.pop(client_id, None)
-                self.connections.pop(client_id, None)
+                was_connected = self.connections.pop(client_id, None) is not None
                 self._connection_times.pop(client_id, None)
+                self._connection_times_iso.pop(client_id, None)
+                self._remote_addrs.pop(client_id, None)
+                self._invalidate_stats()
+
+            if was_connected:
+                self._notify_connection("miner_disconnected", client_id)
 
             # Рассчитываем длительность подключения
             if connect_time:
@@ -277,6 +304,7 @@ class StratumTCPServer:
                 if success:
                     async with self._lock:
                         self.miners[client_id] = authorized_address
+                        self._invalidate_stats()
                     response = {"id": msg_id, "result": True, "error": None}
                     await self._send_json(writer, response)
                     await self.send_new_job_tcp(authorized_address, writer)
@@ -489,13 +517,13 @@ class StratumTCPServer:
                 "method": "mining.notify",
                 "params": [
                     job_id,
-                    "0000000000000000000000000000000000000000000000000000000000000000",
+                    ZERO_HASH_HEX,
                     "01000000010000000000000000000000000000000000000000000000000000000000000000ffffffff",
                     "ffffffff0100f2052a010000001976a9147c154ed1dc59609e3d26abb2df2ea3d587cd8c4188ac00000000",
                     [],
-                    "20000000",
-                    "1d00ffff",
-                    format(timestamp, '08x'),
+                    DEFAULT_VERSION_HEX,
+                    DEFAULT_BITS,
+                    UINT32_BE.pack(timestamp).hex(),
                     True
                 ]
             }
@@ -531,14 +559,20 @@ class StratumTCPServer:
             total_clients=total_clients
         )
 
-        for client_id, writer in self.connections.items():
-            miner_address = self.miners.get(client_id)
+        # Снимок подключений: во время await отправки обработчики клиентов
+        # могут изменить connections (отключение) - обходим копию
+        miners = self.miners
+        # Общая часть параметров: у каждого майнера меняется только job_id
+        shared_params = job_data["params"][1:]
+        for client_id, writer in list(self.connections.items()):
+            miner_address = miners.get(client_id)
             if miner_address:
                 try:
                     # Создаем персональную копию задания
                     job_data_copy = job_data.copy()
                     job_id = self.job_service.create_job_id(miner_address)
-                    job_data_copy["params"][0] = job_id
+                    # Свой список params: иначе все сохраненные задания делили бы один
+                    job_data_copy["params"] = [job_id, *shared_params]
 
                     # Сохраняем в job_service
                     self.job_service.add_job(job_id, job_data_copy, miner_address)
@@ -600,8 +634,10 @@ class StratumTCPServer:
             "id": None  # Stratum протокол позволяет без ID для notification
         }
 
-        for client_id, writer in self.connections.items():
-            miner_address = self.miners.get(client_id, "unauthorized")
+        # Снимок подключений: connections может измениться во время await отправки
+        miners = self.miners
+        for client_id, writer in list(self.connections.items()):
+            miner_address = miners.get(client_id, "unauthorized")
             try:
                 await self._send_json(writer, method_data)
                 successful_sends += 1
@@ -733,6 +769,72 @@ class StratumTCPServer:
                 uptime_seconds=(datetime.now(UTC) - self.start_time).total_seconds()
             )
 
+    def snapshot_connections(self) -> List[Tuple[str, str, str, Optional[str]]]:
+        """
+        Снимок активных подключений:
+        [(client_id, remote_address, miner_address, connection_time_iso), ...].
+
+        Адрес и время подключения готовятся один раз в handle_client, поэтому
+        здесь нет ни get_extra_info, ни форматирования дат - только чтение
+        словарей. Собирается синхронно, без await, поэтому обработчики клиентов
+        не могут изменить connections/miners во время обхода.
+        """
+        miners = self.miners
+        remote_addrs = self._remote_addrs
+        connection_times_iso = self._connection_times_iso
+        return [
+            (
+                client_id,
+                remote_addrs.get(client_id, "unknown"),
+                miners.get(client_id, "unknown"),
+                connection_times_iso.get(client_id)
+            )
+            for client_id in self.connections
+        ]
+
+    @property
+    def connection_count(self) -> int:
+        """Количество активных TCP подключений - O(1)"""
+        return len(self.connections)
+
+    def add_connection_listener(self, callback: Callable[[str, str], None]) -> None:
+        """Подписаться на события miner_connected / miner_disconnected"""
+        self._connection_listeners.append(callback)
+
+    def _notify_connection(self, event: str, client_id: str) -> None:
+        """Оповестить подписчиков о подключении или отключении клиента"""
+        for callback in self._connection_listeners:
+            callback(event, client_id)
+
+    def _invalidate_stats(self) -> None:
+        """Сбросить кэш статистики (при изменении connections/miners)"""
+        self._stats_payload = None
+        self._stats_payload_json = None
+
+    def stats_payload(self) -> Dict:
+        """
+        Данные для /tcp-stratum/stats (без timestamp).
+
+        Значения меняются только при подключении, отключении и авторизации
+        клиента - там кэш и сбрасывается, а между ними словарь отдается готовым.
+        """
+        if self._stats_payload is None:
+            self._stats_payload = {
+                "status": "running",
+                "host": self.host,
+                "port": self.port,
+                "active_connections": len(self.connections),
+                "active_miners": len(self.miners),
+                "protocol": "stratum+tcp"
+            }
+        return self._stats_payload
+
+    def stats_payload_json(self) -> bytes:
+        """stats_payload(), закодированный orjson - кодируется один раз до сброса кэша"""
+        if self._stats_payload_json is None:
+            self._stats_payload_json = orjson.dumps(self.stats_payload())
+        return self._stats_payload_json
+
     def get_stats(self) -> Dict:
         """Получение статистики сервера"""
         stats = {
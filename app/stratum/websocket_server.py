@@ -1,5 +1,8 @@
-from typing import Dict, Set, Optional, Any
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime, UTC
+
+import orjson
 from fastapi import WebSocket
 
 from app.utils.logging_config import StructuredLogger
@@ -8,6 +11,11 @@ from app.utils.protocol_helpers import STRATUM_EXTRA_NONCE1, EXTRA_NONCE2_SIZE
 
 logger = StructuredLogger(__name__)
 
+# Метка на месте job_id: сообщение рассылки сериализуется один раз, job_id
+# каждого майнера подставляется в готовую строку
+_JOB_ID_PLACEHOLDER = "\x00job_id\x00"
+_JOB_ID_PLACEHOLDER_JSON = orjson.dumps(_JOB_ID_PLACEHOLDER).decode()
+
 
 class StratumServer:
     def __init__(
@@ -19,6 +27,7 @@ class StratumServer:
     ):
         self.active_connections: Dict[str, WebSocket] = {}
         self.miner_addresses: Dict[str, str] = {}  # websocket_id -> bch_address
+        self._address_refcount: Dict[str, int] = {}  # bch_address -> число подключений
         self.subscriptions: Dict[str, Set[str]] = {}  # miner_address -> job_ids
         self.current_job_id = None
         self.auth_service = auth_service
@@ -27,6 +36,8 @@ class StratumServer:
         self.job_manager = job_manager
         self.start_time = datetime.now(UTC)
         self._connection_times: Dict[str, datetime] = {}
+        # Подписчики на события подключения: callback(event, connection_id)
+        self._connection_listeners: List[Callable[[str, str], None]] = []
 
         logger.info(
             "WebSocket Stratum сервер инициализирован",
@@ -46,9 +57,10 @@ class StratumServer:
         client_ip = websocket.client.host if websocket.client else "unknown"
 
         self.active_connections[connection_id] = websocket
-        self.miner_addresses[connection_id] = miner_address
+        self._set_miner_address(connection_id, miner_address)
         self.subscriptions[miner_address] = set()
         self._connection_times[connection_id] = datetime.now(UTC)
+        self._notify_connection("miner_connected", connection_id)
 
         logger.info(
             f"Майнер {miner_address} подключился",
@@ -79,7 +91,8 @@ class StratumServer:
 
             # Удаляем из всех словарей
             self.active_connections.pop(connection_id, None)
-            self.miner_addresses.pop(connection_id, None)
+            self._remove_miner_address(connection_id)
+            self._notify_connection("miner_disconnected", connection_id)
 
             if miner_address:
                 # Очищаем подписки майнера
@@ -106,6 +119,43 @@ class StratumServer:
                     connection_duration_seconds=connection_duration
                 )
 
+    def _set_miner_address(self, connection_id: str, miner_address: str):
+        """Привязать адрес к подключению с учетом счетчика уникальных адресов"""
+        self._remove_miner_address(connection_id)
+        self.miner_addresses[connection_id] = miner_address
+        self._address_refcount[miner_address] = self._address_refcount.get(miner_address, 0) + 1
+
+    def _remove_miner_address(self, connection_id: str):
+        """Отвязать адрес от подключения с учетом счетчика уникальных адресов"""
+        miner_address = self.miner_addresses.pop(connection_id, None)
+        if miner_address is None:
+            return
+
+        count = self._address_refcount.get(miner_address, 0) - 1
+        if count > 0:
+            self._address_refcount[miner_address] = count
+        else:
+            self._address_refcount.pop(miner_address, None)
+
+    @property
+    def active_miner_count(self) -> int:
+        """Количество уникальных адресов майнеров - O(1)"""
+        return len(self._address_refcount)
+
+    @property
+    def connection_count(self) -> int:
+        """Количество активных WebSocket подключений - O(1)"""
+        return len(self.active_connections)
+
+    def add_connection_listener(self, callback: Callable[[str, str], None]) -> None:
+        """Подписаться на события miner_connected / miner_disconnected"""
+        self._connection_listeners.append(callback)
+
+    def _notify_connection(self, event: str, connection_id: str) -> None:
+        """Оповестить подписчиков о подключении или отключении майнера"""
+        for callback in self._connection_listeners:
+            callback(event, connection_id)
+
     @staticmethod
     async def _send_welcome(websocket: WebSocket):
         """Отправляем приветственное сообщение майнеру"""
@@ -226,7 +276,7 @@ class StratumServer:
 
         # Обновляем адрес майнера в маппинге
         connection_id = str(id(websocket))
-        self.miner_addresses[connection_id] = authorized_address
+        self._set_miner_address(connection_id, authorized_address)
 
         # Отправляем успешный ответ
         response = {
@@ -510,30 +560,26 @@ class StratumServer:
             total_miners=total_miners
         )
 
-        for connection_id, websocket in self.active_connections.items():
+        # Задание с шаблоном блока сериализуется один раз на рассылку, а не на майнера
+        shared_params = job_data["params"][1:]
+        head, tail = self._notify_frame_parts(job_data)
+
+        # Снимок подключений: во время await отправки список может измениться
+        sends = []
+        for connection_id, websocket in list(self.active_connections.items()):
             miner_address = self.miner_addresses.get(connection_id)
             if miner_address:
                 try:
-                    # Создаем персональную копию задания
-                    job_data_copy = job_data.copy()
+                    # Персональная копия задания со своим списком params
                     job_id = self.job_service.create_job_id(miner_address)
-                    job_data_copy["params"][0] = job_id
+                    job_data_copy = {**job_data, "params": [job_id, *shared_params]}
 
-                    # Сохраняем в job_service
+                    # Сохраняем в job_service до отправки: шар может прийти сразу
                     self.job_service.add_job(job_id, job_data_copy, miner_address)
 
-                    # Отправляем майнеру
-                    await websocket.send_json(job_data_copy)
-
-                    # Обновляем подписки
-                    if miner_address in self.subscriptions:
-                        self.subscriptions[miner_address].add(job_id)
-                    else:
-                        self.subscriptions[miner_address] = {job_id}
-
-                    successful_sends += 1
-
+                    message = head + orjson.dumps(job_id).decode() + tail
                 except Exception as e:
+                    # Ошибка подготовки задания одного майнера не прерывает рассылку остальным
                     failed_sends += 1
                     logger.error(
                         f"Ошибка рассылки задания майнеру {miner_address}",
@@ -542,6 +588,27 @@ class StratumServer:
                         miner_address=miner_address,
                         error=str(e)
                     )
+                    continue
+
+                sends.append((connection_id, miner_address, job_id, websocket.send_text(message)))
+
+        # Отправляем параллельно: медленный майнер не задерживает остальных
+        results = await asyncio.gather(*(send for *_, send in sends), return_exceptions=True)
+        for (connection_id, miner_address, job_id, _), result in zip(sends, results):
+            if isinstance(result, Exception):
+                failed_sends += 1
+                logger.error(
+                    f"Ошибка рассылки задания майнеру {miner_address}",
+                    event="stratum_broadcast_error",
+                    connection_id=connection_id,
+                    miner_address=miner_address,
+                    error=str(result)
+                )
+                continue
+
+            # Обновляем подписки
+            self.subscriptions.setdefault(miner_address, set()).add(job_id)
+            successful_sends += 1
 
         if successful_sends > 0:
             logger.info(
@@ -555,6 +622,13 @@ class StratumServer:
         else:
             logger.warning("Не удалось разослать задание ни одному майнеру")
 
+    @staticmethod
+    def _notify_frame_parts(job_data: dict) -> Tuple[str, str]:
+        """JSON сообщения задания до и после job_id (формат как у send_json)"""
+        frame = orjson.dumps({**job_data, "params": [_JOB_ID_PLACEHOLDER, *job_data["params"][1:]]}).decode()
+        head, tail = frame.split(_JOB_ID_PLACEHOLDER_JSON, 1)
+        return head, tail
+
     def cleanup_old_jobs(self, max_age_seconds: int = 300):
         """Очистка старых заданий из локальных подписок"""
         # Очистка делается через job_service
@@ -699,6 +773,7 @@ class StratumServer:
 
         self.active_connections.clear()
         self.miner_addresses.clear()
+        self._address_refcount.clear()
         self.subscriptions.clear()
 
         logger.info(
@@ -11,6 +11,12 @@ class Settings(BaseSettings):
     db_user: str = "pool_admin"
     db_password: str = ""  #  по умолчанию, берется из .env
 
+    # Пул соединений с БД
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800  # секунды
+    db_pool_pre_ping: bool = False
+
     # BCH нода
     bch_rpc_host: str = "127.0.0.1"
     bch_rpc_port: int = 28332
@@ -18,6 +24,13 @@ class Settings(BaseSettings):
     bch_rpc_password: Optional[str] = None
     bch_rpc_use_cookie: bool = True
     bch_network: Optional[str] = None
+    bch_rpc_pool_size: int = 8  # постоянных HTTP соединений с нодой
+    bch_rpc_keepalive_timeout: int = 30  # секунды
+    bch_rpc_connect_timeout: float = 2.0  # секунды на установку TCP соединения
+    bch_node_connect_timeout: float = 5.0  # секунды на одну попытку подключения к ноде
+    # ZMQ уведомления о новых блоках (-zmqpubhashblock ноды), например tcp://127.0.0.1:28333.
+    # Нужен pyzmq; без него или без адреса новые блоки приходят только через longpoll
+    bch_zmq_hashblock_endpoint: Optional[str] = None
 
     # Настройки пула
     pool_fee_percent: float = 1.5
@@ -39,8 +52,15 @@ class Settings(BaseSettings):
 
     # Настройки заданий
     job_broadcast_interval: int = 30
+    job_broadcast_debounce: float = 0.1  # секунды, окно объединения одновременных рассылок
+    job_broadcast_min_interval: float = 1.0  # секунды, повтор рассылки того же шаблона не чаще
     job_cleanup_age: int = 300
     job_max_history_size: int = 100
+    job_template_cache_ttl: float = 1.0  # секунды, шаблон блока общий для всех майнеров
+    job_longpoll_enabled: bool = True  # getblocktemplate longpoll вместо ожидания рассылки
+    job_longpoll_timeout: int = 300  # секунды, сколько ждать ответа ноды на longpoll
+    job_zmq_template_max_age: float = 15.0  # секунды, шаблон при ZMQ без longpoll (страховка от тихого обрыва)
+    job_mining_info_ttl: float = 10.0  # секунды, кэш getmininginfo (сбрасывается на новом блоке)
 
     # Настройки блоков
     block_version: int = 0x20000000
@@ -1,16 +1,26 @@
+import time
 from datetime import datetime, UTC
+from typing import Optional
 
+# Кэш ISO-строки текущего времени: [строка, monotonic момент расчета]
+_now_iso_cache = ["", float("-inf")]
+NOW_ISO_MAX_AGE = 1.0  # секунды
 
-def humanize_time_ago(dt: datetime) -> str:
-    """Форматирует время в человекочитаемый вид"""
+
+def humanize_time_ago(dt: datetime, now: Optional[datetime] = None) -> str:
+    """
+    Форматирует время в человекочитаемый вид.
+
+    now можно передать заранее, чтобы при форматировании списка
+    не вызывать datetime.now() для каждой строки.
+    """
     if not dt:
         return "никогда"
 
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=UTC)
 
-    now = datetime.now(UTC)
-    diff = now - dt
+    diff = (now or datetime.now(UTC)) - dt
 
     if diff.days > 365:
         return f"{diff.days // 365} лет назад"
@@ -26,6 +36,20 @@ def humanize_time_ago(dt: datetime) -> str:
         return f"{diff.seconds} секунд назад"
 
 
+def utc_now_iso() -> str:
+    """
+    Текущее время UTC в ISO формате (может отставать до NOW_ISO_MAX_AGE секунд).
+
+    Строка пересчитывается не чаще раза в NOW_ISO_MAX_AGE секунд,
+    поэтому частые запросы не создают datetime и не форматируют его заново.
+    """
+    now = time.monotonic()
+    if now - _now_iso_cache[1] >= NOW_ISO_MAX_AGE:
+        _now_iso_cache[0] = datetime.now(UTC).isoformat()
+        _now_iso_cache[1] = now
+    return _now_iso_cache[0]
+
+
 def calculate_pagination_info(skip: int, limit: int, total: int, current_count: int):
     """
     Рассчитывает информацию о пагинации
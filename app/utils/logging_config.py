@@ -6,19 +6,36 @@ import logging
 import sys
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-import json
 from datetime import datetime, UTC
 from typing import Dict, Any, Optional
 
+import orjson
+
 from app.utils.config import settings
 
 
+# Ключи extra могут быть не строками, а значения - любыми объектами (str() как fallback)
+JSON_LOG_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
 class JSONFormatter(logging.Formatter):
-    """Форматировщик логов в JSON"""
+    """Форматировщик логов в JSON (orjson - сериализация на каждую запись)"""
+
+    # (секунда, ISO дата-время этой секунды) - общий префикс записей одной секунды
+    _second_iso = (-1, "")
+
+    def _timestamp(self, created: float) -> str:
+        """Время события записи в ISO формате UTC с миллисекундами"""
+        second = int(created)
+        cached_second, prefix = self._second_iso
+        if second != cached_second:
+            prefix = datetime.fromtimestamp(second, UTC).strftime("%Y-%m-%dT%H:%M:%S")
+            self._second_iso = (second, prefix)
+        return "%s.%03d+00:00" % (prefix, (created - second) * 1000)
 
     def format(self, record: logging.LogRecord) -> str:
         log_record: Dict[str, Any] = {
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -37,7 +54,7 @@ class JSONFormatter(logging.Formatter):
                 if key not in log_record and not key.startswith('_'):
                     log_record[key] = value
 
-        return json.dumps(log_record, ensure_ascii=False, default=str)
+        return orjson.dumps(log_record, default=str, option=JSON_LOG_OPTIONS).decode()
 
 
 class ColorFormatter(logging.Formatter):
@@ -160,12 +177,24 @@ class StructuredLogger:
         elif level == "CRITICAL":
             self.logger.critical(msg, extra=extra, stacklevel=2)
 
+    def isEnabledFor(self, level: int) -> bool:
+        """
+        Включен ли уровень - для горячих путей, где даже сборка kwargs
+        для выключенного уровня заметна (по аналогии с logging.Logger)
+        """
+        return self.logger.isEnabledFor(level)
+
     def info(self, msg: str, **kwargs):
         """Логирование уровня INFO"""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         self._log_with_context("INFO", msg, **kwargs)
 
     def debug(self, msg: str, **kwargs):
         """Логирование уровня DEBUG"""
+        # Ранний выход до копирования kwargs - DEBUG обычно выключен
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
         self._log_with_context("DEBUG", msg, **kwargs)
 
     def warning(self, msg: str, **kwargs):
@@ -117,7 +117,7 @@ class NetworkManager:
         default_network = 'testnet4'
 
         # Пытаемся определить по порту RPC
-        rpc_port = getattr(settings, 'bch_rpc_port', 28332)
+        rpc_port = settings.bch_rpc_port
 
         port_to_network = {
             8332: 'mainnet',
@@ -139,7 +139,7 @@ class NetworkManager:
 
     def get_rpc_url(self, host: str = None) -> str:
         """Получение URL для RPC подключения"""
-        host = host or getattr(settings, 'bch_rpc_host', '127.0.0.1')
+        host = host or settings.bch_rpc_host
         port = self.config['rpc_port']
         return f"http://{host}:{port}/"
 
@@ -191,24 +191,19 @@ class NetworkManager:
 
     def get_fallback_coinbase_value(self) -> int:
         """Получение fallback значения coinbase"""
-        # Если в настройках указано значение, используем его
-        if hasattr(settings, 'fallback_coinbase_value'):
-            return settings.fallback_coinbase_value
-
-        # Иначе рассчитываем из награды за блок
-        reward_bch = self.get_block_reward()
-        return self.bch_to_satoshis(reward_bch)
+        # Поле всегда есть в Settings (со значением по умолчанию)
+        return settings.fallback_coinbase_value
 
     @staticmethod
     def get_coinbase_prefix() -> bytes:
         """Получение префикса для ScriptSig coinbase"""
-        prefix = getattr(settings, 'coinbase_prefix', '/BCHPool/')
+        prefix = settings.coinbase_prefix
         return prefix.encode('utf-8')
 
     @staticmethod
     def get_max_script_sig_size() -> int:
         """Получение максимального размера ScriptSig"""
-        return getattr(settings, 'max_script_sig_size', 100)
+        return settings.max_script_sig_size
 
     @staticmethod
     def get_default_block_version() -> int:
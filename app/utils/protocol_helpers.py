@@ -1,7 +1,9 @@
 """
 Вспомогательные функции для работы с протоколами (Stratum, TCP)
 """
+import struct
 import time
+from enum import IntEnum
 from typing import Tuple
 
 # ========== КОНСТАНТЫ STRATUM ПРОТОКОЛА ==========
@@ -9,6 +11,15 @@ STRATUM_EXTRA_NONCE1 = "ae6812eb4cd7735a302a8a9dd95cf71f"
 EXTRA_NONCE2_SIZE = 4  # 4 байта = 8 hex символов
 BLOCK_HEADER_SIZE = 80  # байт
 
+# uint32 -> 8 hex символов big-endian (ntime, version в mining.notify):
+# UINT32_BE.pack(x).hex() == format(x, '08x'), но без разбора строки формата
+UINT32_BE = struct.Struct(">I")
+DEFAULT_BLOCK_VERSION = 0x20000000
+DEFAULT_VERSION_HEX = UINT32_BE.pack(DEFAULT_BLOCK_VERSION).hex()
+# Значения по умолчанию для полей шаблона без previousblockhash / bits
+ZERO_HASH_HEX = "0" * 64
+DEFAULT_BITS = "1d00ffff"
+
 # ========== КОНСТАНТЫ BCH АДРЕСОВ ==========
 BCH_TESTNET_PREFIXES = ['bchtest:', 'qq', 'qp']
 BCH_MAINNET_PREFIXES = ['bitcoincash:', 'q', 'p']
@@ -19,6 +30,15 @@ MAX_PAGINATION_LIMIT = 1000
 
 # ========== КОНСТАНТЫ ИСТОРИИ ЗАДАНИЙ ==========
 JOB_MAX_HISTORY_SIZE = 100
+# Сколько последних шаблонов (по previousblockhash) держать с подготовленными данными
+TEMPLATE_LRU_SIZE = 8
+
+# ========== ОТПРАВКА БЛОКА ==========
+
+class SubmitStatus(IntEnum):
+    """Итог submitblock"""
+    ACCEPTED = 0
+    REJECTED = 1
 
 # ========== ФУНКЦИИ ==========
 
@@ -0,0 +1,159 @@
+"""
+Кэш ответов API в памяти процесса (TTL + инвалидация по namespace)
+"""
+import functools
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+
+from app.utils.logging_config import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Простой TTL-кэш для результатов эндпоинтов.
+
+    Пул работает в одном процессе и все состояние (задания, подключения)
+    и так хранится в памяти, поэтому внешний кэш (Redis) не нужен.
+    """
+
+    def __init__(self):
+        # key -> (expires_at (monotonic), value)
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Получить значение, если оно не устарело"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, expire: float) -> None:
+        """Сохранить значение на expire секунд"""
+        self._entries[key] = (time.monotonic() + expire, value)
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        """Очистить весь кэш или только ключи namespace"""
+        if namespace is None:
+            removed = len(self._entries)
+            self._entries.clear()
+        else:
+            prefix = f"{namespace}:"
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            removed = len(keys)
+
+        if removed:
+            logger.debug(
+                "Кэш ответов очищен",
+                event="response_cache_cleared",
+                namespace=namespace or "all",
+                removed=removed
+            )
+        return removed
+
+    def get_stats(self) -> Dict:
+        """Статистика кэша"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """Снимок Response: готовое тело, статус и заголовки (сам объект Response повторно не отдается)"""
+    body: bytes
+    status_code: int
+    raw_headers: Tuple[Tuple[bytes, bytes], ...]
+
+    @classmethod
+    def from_response(cls, response: Response) -> "CachedResponse":
+        return cls(bytes(response.body), response.status_code, tuple(response.raw_headers))
+
+    def to_response(self) -> Response:
+        """Новый Response на каждое попадание в кэш"""
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            headers=Headers(raw=list(self.raw_headers))
+        )
+
+
+def _is_cacheable(value: Any) -> bool:
+    """Потоковые ответы и ответы с фоновой задачей не кэшируются"""
+    if isinstance(value, Response):
+        return not isinstance(value, StreamingResponse) and value.background is None
+    return True
+
+
+# Типы значений, которые попадают в ключ (параметры запроса, а не зависимости вроде сессии БД)
+KEY_PARAM_TYPES = (str, int, float, bool, type(None))
+
+
+def default_key_builder(namespace: str, func: Callable, kwargs: Dict) -> str:
+    """Ключ кэша: namespace + имя функции + параметры запроса"""
+    params = ",".join(
+        f"{name}={kwargs[name]!r}"
+        for name in sorted(kwargs)
+        if isinstance(kwargs[name], KEY_PARAM_TYPES)
+    )
+    return f"{namespace}:{func.__name__}:{params}"
+
+
+def cached(
+    namespace: str,
+    expire: float,
+    key_builder: Callable = default_key_builder,
+    cache_if: Optional[Callable[[Any], bool]] = None
+):
+    """
+    Декоратор кэширования async эндпоинта.
+
+    Кэшируется только успешный результат - исключения (HTTPException и др.)
+    пробрасываются как есть, а cache_if позволяет не кэшировать ответы
+    об ошибке, возвращенные без исключения. Сигнатура функции сохраняется
+    через functools.wraps, поэтому FastAPI видит исходные параметры.
+
+    Response хранится как CachedResponse (тело, статус, заголовки),
+    и на каждое попадание собирается новый объект Response.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(namespace, func, kwargs)
+            value = response_cache.get(key)
+            if value is not None:
+                return value.to_response() if isinstance(value, CachedResponse) else value
+
+            value = await func(*args, **kwargs)
+            if _is_cacheable(value) and (cache_if is None or cache_if(value)):
+                stored = CachedResponse.from_response(value) if isinstance(value, Response) else value
+                response_cache.set(key, stored, expire)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+# Глобальный экземпляр кэша
+response_cache = ResponseCache()
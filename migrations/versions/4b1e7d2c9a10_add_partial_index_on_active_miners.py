@@ -0,0 +1,34 @@
+"""Add partial index on active miners
+
+Revision ID: 4b1e7d2c9a10
+Revises: 00f766c2fbb0
+Create Date: 2026-10-16 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e7d2c9a10'
+down_revision: Union[str, Sequence[str], None] = '00f766c2fbb0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_miners_active_id',
+        'miners',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_miners_active_id', table_name='miners', postgresql_where=sa.text('is_active'))
@@ -0,0 +1,60 @@
+"""Add miner/time composite indexes on shares and blocks
+
+Revision ID: 7e3a5f0b2d61
+Revises: 4b1e7d2c9a10
+Create Date: 2026-10-16 14:37:05.918233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e3a5f0b2d61'
+down_revision: Union[str, Sequence[str], None] = '4b1e7d2c9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_shares_miner_submitted_at',
+        'shares',
+        ['miner_address', sa.text('submitted_at DESC')],
+        unique=False,
+        postgresql_using='btree'
+    )
+    op.create_index(
+        'ix_shares_miner_valid_submitted_at',
+        'shares',
+        ['miner_address', 'submitted_at'],
+        unique=False,
+        postgresql_using='btree',
+        postgresql_where=sa.text('is_valid')
+    )
+    op.create_index(
+        'ix_blocks_miner_found_at',
+        'blocks',
+        ['miner_address', sa.text('found_at DESC')],
+        unique=False,
+        postgresql_using='btree'
+    )
+    op.create_index(
+        'ix_blocks_miner_confirmed_found_at',
+        'blocks',
+        ['miner_address', sa.text('found_at DESC')],
+        unique=False,
+        postgresql_using='btree',
+        postgresql_where=sa.text('confirmed')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_blocks_miner_confirmed_found_at', table_name='blocks', postgresql_where=sa.text('confirmed'))
+    op.drop_index('ix_blocks_miner_found_at', table_name='blocks')
+    op.drop_index('ix_shares_miner_valid_submitted_at', table_name='shares', postgresql_where=sa.text('is_valid'))
+    op.drop_index('ix_shares_miner_submitted_at', table_name='shares')
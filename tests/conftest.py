@@ -5,6 +5,7 @@ import pytest
 import sys
 import os
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime, UTC
 from unittest.mock import Mock, AsyncMock, MagicMock
 
@@ -48,6 +49,9 @@ def mock_settings():
     mock_settings.max_difficulty = 1000.0
     mock_settings.enable_dynamic_difficulty = True
 
+    # Окно объединения рассылок JobManager (asyncio.sleep не принимает Mock)
+    mock_settings.job_broadcast_debounce = 0.0
+
     # Заменяем settings на mock
     config_module.settings = mock_settings
 
@@ -57,6 +61,16 @@ def mock_settings():
     config_module.settings = original_settings
 
 
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Очистка кэша ответов API между тестами"""
+    from app.utils.response_cache import response_cache
+
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Создание event loop для асинхронных тестов"""
@@ -154,6 +168,17 @@ def mock_database_for_api_tests():
     mock_result.scalars.return_value.all.return_value = []
     mock_result.scalar.return_value = 0
     mock_session.execute.return_value = mock_result
+
+    # Мок для потокового чтения (session.stream) - пустой курсор
+    mock_stream_result = MagicMock()
+    mock_stream_result.mappings.return_value.__aiter__.return_value = []
+    mock_session.stream.return_value = mock_stream_result
+
+    # Мок для session.stream_scalars - пустой курсор с чтением пачками
+    mock_stream_scalars_result = MagicMock()
+    mock_stream_scalars_result.partitions.return_value.__aiter__.return_value = []
+    mock_session.stream_scalars.return_value = mock_stream_scalars_result
+
     mock_session.commit = AsyncMock()
     mock_session.refresh = AsyncMock()
     mock_session.close = AsyncMock()
@@ -162,8 +187,18 @@ def mock_database_for_api_tests():
     async def mock_get_db():
         yield mock_session
 
+    # Фабрика соединений для кэшируемых эндпоинтов отдает тот же мок
+    @asynccontextmanager
+    async def mock_connect():
+        yield mock_session
+
+    async def mock_get_db_connector():
+        return mock_connect
+
     # Подменяем зависимость
     app.dependency_overrides[database.get_db] = mock_get_db
+    app.dependency_overrides[database.get_db_connector] = mock_get_db_connector
+    app.dependency_overrides[database.get_db_session_factory] = mock_get_db_connector
 
     yield mock_session
 
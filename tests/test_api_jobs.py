@@ -2,7 +2,8 @@
 Тесты для API эндпоинтов заданий
 """
 import pytest
-from unittest.mock import patch
+from collections import deque
+from unittest.mock import patch, AsyncMock
 from fastapi.testclient import TestClient
 from datetime import datetime, UTC
 
@@ -18,8 +19,8 @@ class TestAPIJobs:
         """Создаем тестовый клиент"""
         return TestClient(app)
 
-    @patch('app.api.v1.jobs.job_manager')
-    @patch('app.api.v1.jobs.stratum_server')
+    @patch('app.dependencies.container.job_manager')
+    @patch('app.dependencies.container.stratum_server')
     def test_get_job_stats_success(self, _mock_stratum_server, mock_job_manager, client):
         """Тест успешного получения статистики заданий"""
         # Настраиваем моки
@@ -39,20 +40,22 @@ class TestAPIJobs:
         assert "job_manager" in data["data"]
         assert data["data"]["job_manager"]["current_job"] == "test_job_123"
 
-    @patch('app.api.v1.jobs.job_manager')
+    @patch('app.dependencies.container.job_manager')
     def test_get_job_stats_exception(self, mock_job_manager, client):
         """Тест исключения при получении статистики"""
         mock_job_manager.get_stats.side_effect = Exception("Test error")
 
+        # Ошибку обрабатывает глобальный обработчик, а не сам эндпоинт
+        client = TestClient(app, raise_server_exceptions=False)
         response = client.get("/api/v1/jobs/stats")
 
         assert response.status_code == 500
         data = response.json()
-        assert "detail" in data
-        assert "Ошибка получения статистики заданий" in data["detail"]
+        assert data["detail"] == "Внутренняя ошибка сервера"
+        assert "Test error" not in data["detail"]
 
-    @patch('app.api.v1.jobs.job_manager')
-    @patch('app.api.v1.jobs.stratum_server')
+    @patch('app.dependencies.container.job_manager')
+    @patch('app.dependencies.container.stratum_server')
     def test_get_job_history_success(self, _mock_stratum_server, mock_job_manager, client):
         """Тест успешного получения истории заданий"""
         # Настраиваем мок job_history
@@ -78,6 +81,78 @@ class TestAPIJobs:
         assert "jobs" in data["data"]
         assert len(data["data"]["jobs"]) == 2
 
+    @patch('app.dependencies.container.job_manager')
+    def test_get_job_history_uses_precomputed_iso(self, mock_job_manager, client):
+        """Тест: история отдает заранее вычисленный created_at_iso"""
+        mock_job_manager.job_history = [
+            {
+                "id": "job_1",
+                "created_at": datetime.now(UTC),
+                "created_at_iso": "2024-01-01T00:00:00+00:00",
+                "template": {"height": 100}
+            },
+            {"id": "job_2", "template": {"height": 101}}
+        ]
+
+        response = client.get("/api/v1/jobs/history")
+
+        jobs = response.json()["data"]["jobs"]
+        assert jobs[0]["created_at"] == "unknown"
+        assert jobs[1]["created_at"] == "2024-01-01T00:00:00+00:00"
+
+    @patch('app.dependencies.container.job_manager')
+    def test_get_job_stats_reports_block_submits(self, mock_job_manager, client):
+        """Тест: итог отправки блока в ноду виден в статистике заданий"""
+        submit = {"status": "rejected", "message": "Node rejected block: high-hash", "block_hash": "ab" * 32}
+        mock_job_manager.get_stats.return_value = {
+            "current_job": "job_1", "node_info": {}, "last_block_submits": [submit]
+        }
+
+        response = client.get("/api/v1/jobs/stats")
+
+        assert response.json()["data"]["last_block_submits"] == [submit]
+
+    @patch('app.dependencies.container.job_manager')
+    def test_get_job_stats_cached(self, mock_job_manager, client):
+        """Тест: повторный запрос статистики отдается из кэша"""
+        mock_job_manager.get_stats.return_value = {"current_job": "job_1", "node_info": {}}
+
+        first = client.get("/api/v1/jobs/stats")
+        mock_job_manager.get_stats.return_value = {"current_job": "job_2", "node_info": {}}
+        second = client.get("/api/v1/jobs/stats")
+
+        assert first.status_code == second.status_code == 200
+        assert second.json()["data"]["job_manager"]["current_job"] == "job_1"
+        assert mock_job_manager.get_stats.call_count == 1
+
+    @patch('app.dependencies.container.job_manager')
+    def test_broadcast_invalidates_jobs_cache(self, mock_job_manager, client):
+        """Тест: рассылка нового задания сбрасывает кэш статистики"""
+        mock_job_manager.get_stats.return_value = {"current_job": "job_1", "node_info": {}}
+        mock_job_manager.broadcast_new_job_to_all = AsyncMock()
+        client.get("/api/v1/jobs/stats")
+
+        client.post("/api/v1/jobs/broadcast")
+        mock_job_manager.get_stats.return_value = {"current_job": "job_2", "node_info": {}}
+        response = client.get("/api/v1/jobs/stats")
+
+        assert response.json()["data"]["job_manager"]["current_job"] == "job_2"
+
+    @patch('app.dependencies.container.job_manager')
+    def test_get_job_history_limit_newest_first(self, mock_job_manager, client):
+        """Тест: limit возвращает последние задания, новые сверху"""
+        mock_job_manager.job_history = deque(
+            ({"id": f"job_{i}", "template": {"height": i}} for i in range(5)),
+            maxlen=100
+        )
+
+        response = client.get("/api/v1/jobs/history?limit=2")
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [job["id"] for job in data["jobs"]] == ["job_4", "job_3"]
+        assert data["total_jobs"] == 5
+
     def test_get_job_history_invalid_limit(self, client):
         """Тест невалидного параметра limit"""
         response = client.get("/api/v1/jobs/history?limit=0")
@@ -86,7 +161,7 @@ class TestAPIJobs:
         response = client.get("/api/v1/jobs/history?limit=101")
         assert response.status_code == 400
 
-    @patch('app.api.v1.jobs.job_manager')
+    @patch('app.dependencies.container.job_manager')
     def test_get_job_history_empty(self, mock_job_manager, client):
         """Тест получения истории при пустой истории"""
         mock_job_manager.job_history = None
@@ -59,57 +59,233 @@ class TestAPIMiners:
         assert data["data"]["pagination"]["skip"] == 10
         assert data["data"]["pagination"]["limit"] == 20
 
-    @patch('app.api.v1.miners.get_db')
-    def test_register_miner_success(self, mock_get_db, client):
-        """Тест успешной регистрации майнера"""
+    def test_list_miners_total_from_count_query(self, client, mock_database_for_api_tests):
+        """Тест: на пустой странице total берётся из отдельного COUNT запроса"""
+        mock_result = MagicMock()
+        mock_result.scalar.return_value = 42
+        mock_database_for_api_tests.execute.return_value = mock_result
 
-        # Создаем мок-сессию
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        # Мокаем проверку существующего майнера (не существует)
-        mock_result_exists = MagicMock()
-        mock_result_exists.scalar_one_or_none.return_value = None
-        mock_session.execute.return_value = mock_result_exists
-
-        # Мокаем add, commit, refresh
-        mock_session.add = MagicMock()
-        mock_session.commit = AsyncMock()
-        mock_session.refresh = AsyncMock()
-
-        # мокаем создание объекта Miner через patch
-        with patch('app.api.v1.miners.Miner') as MockMiner:
-            mock_miner_instance = MagicMock()
-            mock_miner_instance.id = 1
-            mock_miner_instance.bch_address = "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a"
-            mock_miner_instance.worker_name = "test_worker"
-            mock_miner_instance.is_active = True
-            mock_miner_instance.created_at = datetime.now(UTC)
-            mock_miner_instance.total_shares = 0
-            mock_miner_instance.total_blocks = 0
-            mock_miner_instance.hashrate = 0.0
-
-            MockMiner.return_value = mock_miner_instance
-
-            miner_data = {
-                "bch_address": "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
-                "worker_name": "test_worker"
+        response = client.get("/api/v1/miners/?skip=0&limit=10")
+
+        assert response.status_code == 200
+        pagination = response.json()["data"]["pagination"]
+        assert pagination["total"] == 42
+        assert pagination["count"] == 0
+        # Страница читается потоком, COUNT - обычным запросом только для пустой страницы
+        assert mock_database_for_api_tests.stream.await_count == 1
+        assert mock_database_for_api_tests.execute.await_count == 1
+
+    def test_list_miners_streams_rows(self, client, mock_database_for_api_tests):
+        """Тест потоковой отдачи строк майнеров"""
+        rows = [
+            {
+                "id": i,
+                "bch_address": f"addr{i}",
+                "worker_name": "default",
+                "is_active": True,
+                "total_shares": 0,
+                "total_blocks": 0,
+                "hashrate": 0.0,
+                "registered_at": datetime.now(UTC),
+                "total": 5
             }
+            for i in (1, 2)
+        ]
+        stream_result = MagicMock()
+        stream_result.mappings.return_value.__aiter__.return_value = rows
+        mock_database_for_api_tests.stream.return_value = stream_result
 
-            response = client.post("/api/v1/miners/register", json=miner_data)
+        response = client.get("/api/v1/miners/")
 
-            # Должен быть 201
-            assert response.status_code == 201
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "success"
+        assert [m["id"] for m in data["data"]["miners"]] == [1, 2]
+        assert "total" not in data["data"]["miners"][0]
+        assert data["data"]["pagination"]["count"] == 2
+        assert data["data"]["pagination"]["total"] == 5
+        # Страница неполная (2 из 100) - это последняя страница
+        assert data["data"]["pagination"]["next_cursor"] is None
+
+        full_page = client.get("/api/v1/miners/?limit=2")
+        assert full_page.json()["data"]["pagination"]["next_cursor"] == 2
+        # total пришёл вместе со страницей - отдельного COUNT нет
+        mock_database_for_api_tests.execute.assert_not_awaited()
+
+    def test_list_miners_stream_error_is_well_formed(self, client, mock_database_for_api_tests):
+        """Тест: ошибка чтения курсора дает корректный JSON со status=error"""
+        mock_database_for_api_tests.stream.side_effect = Exception("DB connection failed")
 
-    @patch('app.api.v1.miners.get_db')
-    def test_register_miner_already_exists(self, mock_get_db, client, mock_db_session):
-        """Тест регистрации уже существующего майнера"""
-        mock_get_db.return_value = mock_db_session
+        response = client.get("/api/v1/miners/")
+
+        data = response.json()
+        assert data["status"] == "error"
+        assert data["message"] == "Ошибка получения списка майнеров"
+        assert "DB connection failed" not in response.text
+        assert data["data"]["miners"] == []
+        assert data["data"]["pagination"] is None
+
+    def test_list_miners_keyset_after_id(self, client, mock_database_for_api_tests):
+        """Тест keyset пагинации: after_id превращается в WHERE id > :after_id без OFFSET"""
+        response = client.get("/api/v1/miners/?after_id=100&limit=10")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["pagination"]["next_cursor"] is None
+
+        query = mock_database_for_api_tests.stream.await_args[0][0]
+        compiled = query.compile()
+        assert "miners.id > :id_1" in str(compiled)
+        assert "OFFSET" not in str(compiled)
+        assert compiled.params["id_1"] == 100
+
+    def test_get_miner_shares_reads_partitions(self, client, mock_database_for_api_tests):
+        """Тест: шары читаются пачками через stream_scalars().partitions() и отдаются потоком"""
+        submitted_at = datetime.now(UTC)
+        share = MagicMock(id=1, job_id="job_1", difficulty=1.0, is_valid=True, submitted_at=submitted_at)
+        stream_result = MagicMock()
+        stream_result.partitions.return_value.__aiter__.return_value = [[share], [share]]
+        mock_database_for_api_tests.stream_scalars.return_value = stream_result
+
+        miner_result = MagicMock()
+        miner_result.first.return_value = Mock(worker_name="rig1")
+        mock_database_for_api_tests.execute.return_value = miner_result
+
+        response = client.get("/api/v1/miners/bitcoincash:qtest/shares?limit=2")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["shares_count"] == 2
+        assert data["shares"][0]["submitted_at"] == submitted_at.isoformat()
+        assert data["shares"][0]["time_ago"].endswith("секунд назад")
+        assert data["worker_name"] == "rig1"
+        # Страница заполнена - курсор указывает на последний шар
+        assert data["next_cursor"] == submitted_at.isoformat()
+        assert data["next_cursor_id"] == 1
 
-        # Настраиваем мок для существующего майнера
+    def test_get_miner_shares_stream_error_is_well_formed(self, client, mock_database_for_api_tests):
+        """Тест: ошибка посреди потока закрывает JSON корректно и отдает error"""
+        submitted_at = datetime.now(UTC)
+        share = MagicMock(id=1, job_id="job_1", difficulty=1.0, is_valid=True, submitted_at=submitted_at)
+
+        async def failing_partitions():
+            yield [share]
+            raise Exception("cursor lost")
+
+        stream_result = MagicMock()
+        stream_result.partitions.return_value = failing_partitions()
+        mock_database_for_api_tests.stream_scalars.return_value = stream_result
+
+        miner_result = MagicMock()
+        miner_result.first.return_value = Mock(worker_name="rig1")
+        mock_database_for_api_tests.execute.return_value = miner_result
+
+        response = client.get("/api/v1/miners/bitcoincash:qtest/shares?limit=2")
+
+        data = response.json()
+        assert data["shares_count"] == 1
+        assert len(data["shares"]) == 1
+        assert data["next_cursor"] is None
+        assert data["error"] == "Ошибка чтения списка"
+        assert "cursor lost" not in response.text
+
+    def test_get_miner_shares_keyset_before(self, client, mock_database_for_api_tests):
+        """Тест keyset пагинации шаров: before превращается в WHERE submitted_at < :before без OFFSET"""
+        miner_result = MagicMock()
+        miner_result.first.return_value = Mock(worker_name="rig1")
+        mock_database_for_api_tests.execute.return_value = miner_result
+
+        response = client.get(
+            "/api/v1/miners/bitcoincash:qtest/shares",
+            params={"before": "2024-01-01T00:00:00+00:00", "limit": 10}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["next_cursor"] is None
+
+        query = mock_database_for_api_tests.stream_scalars.await_args[0][0]
+        compiled = query.compile()
+        assert "shares.submitted_at < :submitted_at_1" in str(compiled)
+        assert "OFFSET" not in str(compiled)
+        assert compiled.params["submitted_at_1"] == datetime(2024, 1, 1, tzinfo=UTC)
+
+    def test_get_miner_shares_keyset_before_id(self, client, mock_database_for_api_tests):
+        """Тест составного курсора: (submitted_at, id) < (before, before_id) не теряет шары с тем же временем"""
+        miner_result = MagicMock()
+        miner_result.first.return_value = Mock(worker_name="rig1")
+        mock_database_for_api_tests.execute.return_value = miner_result
+
+        response = client.get(
+            "/api/v1/miners/bitcoincash:qtest/shares",
+            params={"before": "2024-01-01T03:00:00+03:00", "before_id": 7, "limit": 10}
+        )
+
+        assert response.status_code == 200
+        query = mock_database_for_api_tests.stream_scalars.await_args[0][0]
+        compiled = query.compile()
+        assert "(shares.submitted_at, shares.id) < (:param_1, :param_2)" in str(compiled)
+        assert "ORDER BY shares.submitted_at DESC, shares.id DESC" in str(compiled)
+        assert compiled.params["param_1"] == datetime(2024, 1, 1, tzinfo=UTC)
+        assert compiled.params["param_2"] == 7
+
+    def test_get_miner_blocks_cursor_is_naive_utc(self, client, mock_database_for_api_tests):
+        """Тест: курсор блоков приводится к naive UTC, как хранится found_at"""
+        miner_result = MagicMock()
+        miner_result.first.return_value = Mock(worker_name="rig1")
+        mock_database_for_api_tests.execute.return_value = miner_result
+
+        response = client.get(
+            "/api/v1/miners/bitcoincash:qtest/blocks",
+            params={"before": "2024-01-01T03:00:00+03:00", "before_id": 5}
+        )
+
+        assert response.status_code == 200
+        query = mock_database_for_api_tests.stream_scalars.await_args[0][0]
+        compiled = query.compile()
+        assert "(blocks.found_at, blocks.id) < (:param_1, :param_2)" in str(compiled)
+        assert compiled.params["param_1"] == datetime(2024, 1, 1)
+        assert compiled.params["param_1"].tzinfo is None
+
+    def test_get_miner_shares_limit_too_large(self, client):
+        """Тест: limit больше MAX_PAGINATION_LIMIT отклоняется"""
+        response = client.get("/api/v1/miners/bitcoincash:qtest/shares?limit=100000")
+
+        assert response.status_code == 422
+
+    def test_register_miner_success(self, client, mock_database_for_api_tests):
+        """Тест успешной регистрации майнера"""
+        # INSERT ... ON CONFLICT DO NOTHING RETURNING вернул новую строку
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = Mock()  # Майнер уже существует
-        mock_db_session.execute.return_value = mock_result
+        mock_result.mappings.return_value.first.return_value = {
+            "id": 1,
+            "bch_address": "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
+            "worker_name": "test_worker",
+            "is_active": True,
+            "total_shares": 0,
+            "total_blocks": 0,
+            "hashrate": 0.0,
+            "registered_at": datetime.now(UTC)
+        }
+        mock_database_for_api_tests.execute.return_value = mock_result
+
+        miner_data = {
+            "bch_address": "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
+            "worker_name": "test_worker"
+        }
+
+        response = client.post("/api/v1/miners/register", json=miner_data)
+
+        # Должен быть 201
+        assert response.status_code == 201
+        assert response.json()["data"]["miner"]["id"] == 1
+        # Одна вставка без предварительного SELECT
+        assert mock_database_for_api_tests.execute.await_count == 1
+
+    def test_register_miner_already_exists(self, client, mock_database_for_api_tests):
+        """Тест регистрации уже существующего майнера"""
+        # При конфликте по адресу RETURNING не возвращает строк
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.first.return_value = None
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         miner_data = {
             "bch_address": "existing_address",
@@ -123,45 +299,29 @@ class TestAPIMiners:
         assert "detail" in data
         assert "уже зарегистрирован" in data["detail"]
 
-    @patch('app.api.v1.miners.get_db')
-    def test_get_miner_success(self, mock_get_db, client):
+    def test_get_miner_success(self, client, mock_database_for_api_tests):
         """Тест успешного получения информации о майнере"""
-
-        # Создаем мок-сессию
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        # Создаем словарь с данными, как их вернет SQLAlchemy
-        from sqlalchemy.engine import Result
-
-        # Мокаем результат execute
+        registered_at = datetime(2024, 1, 1, tzinfo=UTC)
         mock_result = MagicMock()
-
-        # создаем объект с нужными атрибутами
-        class MockMiner:
-            def __init__(self):
-                self.id = 1
-                self.bch_address = "test_address"
-                self.worker_name = "test_worker"
-                self.is_active = True
-                self.total_shares = 100
-                self.total_blocks = 2
-                self.hashrate = 1000.0
-                self.created_at = datetime.now(UTC)
-
-            def __getattr__(self, name):
-                return getattr(self, name, None)
-
-        mock_miner = MockMiner()
-        mock_result.scalar_one_or_none.return_value = mock_miner
-        mock_session.execute.return_value = mock_result
+        mock_result.mappings.return_value.one_or_none.return_value = {
+            "id": 1,
+            "bch_address": "test_address",
+            "worker_name": "test_worker",
+            "is_active": True,
+            "total_shares": 100,
+            "total_blocks": 2,
+            "hashrate": 1000.0,
+            "registered_at": registered_at
+        }
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.get("/api/v1/miners/test_address")
 
         assert response.status_code == 200
         data = response.json()
-        assert "miner" in data
         assert data["miner"]["bch_address"] == "test_address"
+        # datetime сериализует orjson, формат совпадает с isoformat()
+        assert data["miner"]["registered_at"] == registered_at.isoformat()
 
     @pytest.mark.asyncio
     async def test_get_miner_not_found(self, client):
@@ -170,7 +330,7 @@ class TestAPIMiners:
         # Создаем мок-сессию
         mock_session = AsyncMock()
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = None
+        mock_result.mappings.return_value.one_or_none.return_value = None
         mock_session.execute.return_value = mock_result
 
         # Подменяем зависимость
@@ -188,11 +348,8 @@ class TestAPIMiners:
         finally:
             app.dependency_overrides.clear()
 
-    @patch('app.api.v1.miners.get_db')
-    def test_get_miner_stats_success(self, mock_get_db, client, mock_db_session):
+    def test_get_miner_stats_success(self, client, mock_database_for_api_tests):
         """Тест успешного получения статистики майнера"""
-        mock_get_db.return_value = mock_db_session
-
         # Настраиваем мок для майнера
         mock_miner = Mock()
         mock_miner.bch_address = "test_address"
@@ -205,34 +362,37 @@ class TestAPIMiners:
 
         mock_result = MagicMock()
         mock_result.scalar_one_or_none.return_value = mock_miner
-        mock_db_session.execute.return_value = mock_result
-
-        # Моки для шар и блоков
-        mock_share = Mock()
-        mock_share.is_valid = True
-        mock_share.difficulty = 1.0
-
-        mock_block = Mock()
-        mock_block.confirmed = True
 
+        # Агрегаты по шарам и блокам - одна строка на таблицу
+        last_share_at = datetime.now(UTC)
         mock_shares_result = MagicMock()
-        mock_shares_result.scalars.return_value.all.return_value = [mock_share] * 10
+        mock_shares_result.one.return_value = Mock(
+            total=10, valid=8, avg_difficulty=1.0, total_difficulty=8.0, last_submitted_at=last_share_at
+        )
 
         mock_blocks_result = MagicMock()
-        mock_blocks_result.scalars.return_value.all.return_value = [mock_block] * 2
+        mock_blocks_result.one.return_value = Mock(total=2, confirmed=2, last_found_at=None)
 
-        # Последовательные вызовы execute
         def execute_side_effect(*args, **_kwargs):
             query_str = str(args[0])
-            if "SELECT miner" in query_str:
+            if "FROM miners" in query_str:
                 return mock_result
-            elif "SELECT share" in query_str:
+            elif "FROM shares" in query_str:
                 return mock_shares_result
-            elif "SELECT block" in query_str:
+            elif "FROM blocks" in query_str:
                 return mock_blocks_result
             return MagicMock()
 
-        mock_db_session.execute.side_effect = execute_side_effect
+        mock_database_for_api_tests.execute.side_effect = execute_side_effect
+
+        response = client.get("/api/v1/miners/test_address/stats?time_range=1h")
+
+        assert response.status_code == 200
+        statistics = response.json()["data"]["statistics"]
+        assert statistics["shares"]["invalid"] == 2
+        assert statistics["blocks"]["confirmation_rate"] == 1
+        assert statistics["performance"]["calculated_hashrate"] == 8.0 * 2 ** 32 / 3600
+        assert response.json()["data"]["recent_activity"]["last_share"] == last_share_at.isoformat()
 
         # ТЕСТ ДЛЯ ПРОБЛЕМЫ №3: разные значения time_range
         test_cases = [
@@ -252,24 +412,20 @@ class TestAPIMiners:
             assert data["status"] == "success"
             assert data["data"]["time_range"]["human_readable"] == expected_human
 
-    @patch('app.api.v1.miners.get_db')
-    def test_update_miner_success(self, mock_get_db, client, mock_db_session):
+    def test_update_miner_success(self, client, mock_database_for_api_tests):
         """Тест успешного обновления майнера"""
-        mock_get_db.return_value = mock_db_session
-
-        # Настраиваем мок для существующего майнера
-        mock_miner = Mock()
-        mock_miner.bch_address = "test_address"
-        mock_miner.worker_name = "old_worker"
-        mock_miner.is_active = True
-
+        # UPDATE ... RETURNING вернул новое состояние майнера
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_miner
-        mock_db_session.execute.return_value = mock_result
-
-        # Настраиваем commit
-        mock_db_session.commit = AsyncMock()
-        mock_db_session.refresh = AsyncMock()
+        mock_result.mappings.return_value.one_or_none.return_value = {
+            "id": 1,
+            "bch_address": "test_address",
+            "worker_name": "new_worker",
+            "is_active": False,
+            "total_shares": 0,
+            "total_blocks": 0,
+            "hashrate": 0.0
+        }
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.put("/api/v1/miners/test_address/update?worker_name=new_worker&is_active=false")
 
@@ -278,6 +434,24 @@ class TestAPIMiners:
         assert data["status"] == "updated"
         assert data["updated_fields"]["worker_name"] == "new_worker"
         assert data["updated_fields"]["is_active"] is False
+        assert data["miner"]["worker_name"] == "new_worker"
+
+        # Один запрос: UPDATE без предварительного SELECT
+        assert mock_database_for_api_tests.execute.await_count == 1
+        query = str(mock_database_for_api_tests.execute.await_args[0][0])
+        assert query.startswith("UPDATE miners")
+        assert "RETURNING" in query
+
+    def test_update_miner_not_found(self, client, mock_database_for_api_tests):
+        """Тест обновления несуществующего майнера"""
+        mock_result = MagicMock()
+        mock_result.mappings.return_value.one_or_none.return_value = None
+        mock_database_for_api_tests.execute.return_value = mock_result
+
+        response = client.put("/api/v1/miners/unknown/update?is_active=false")
+
+        assert response.status_code == 404
+        mock_database_for_api_tests.commit.assert_not_awaited()
 
     @patch('app.api.v1.miners.get_db')
     def test_update_miner_no_fields(self, mock_get_db, client, mock_db_session):
@@ -308,23 +482,12 @@ class TestAPIMiners:
         response = client.put(f"/api/v1/miners/test_address/update?worker_name={long_name}")
         assert response.status_code == 400
 
-    @patch('app.api.v1.miners.get_db')
-    def test_delete_miner_success(self, mock_get_db, client, mock_db_session):
+    def test_delete_miner_success(self, client, mock_database_for_api_tests):
         """Тест успешного удаления (деактивации) майнера"""
-        mock_get_db.return_value = mock_db_session
-
-        # Настраиваем мок для существующего майнера
-        mock_miner = Mock()
-        mock_miner.bch_address = "test_address"
-        mock_miner.is_active = True
-        mock_miner.id = 1
-
+        # UPDATE ... RETURNING id нашёл майнера
         mock_result = MagicMock()
-        mock_result.scalar_one_or_none.return_value = mock_miner
-        mock_db_session.execute.return_value = mock_result
-
-        # Настраиваем commit
-        mock_db_session.commit = AsyncMock()
+        mock_result.scalar_one_or_none.return_value = 1
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.delete("/api/v1/miners/test_address")
 
@@ -333,7 +496,18 @@ class TestAPIMiners:
         assert data["status"] == "deactivated"
         assert data["action"] == "soft_delete"
 
-        # Проверяем, что is_active установлен в False
-        # Важно: мок должен обновиться
-        mock_miner.is_active = False
-        assert mock_miner.is_active is False
\ No newline at end of file
+        # is_active = False выставляется одним UPDATE
+        query = mock_database_for_api_tests.execute.await_args[0][0]
+        assert str(query).startswith("UPDATE miners SET is_active")
+        assert query.compile().params["is_active"] is False
+        mock_database_for_api_tests.commit.assert_awaited_once()
+
+    def test_delete_miner_not_found(self, client, mock_database_for_api_tests):
+        """Тест удаления несуществующего майнера"""
+        mock_result = MagicMock()
+        mock_result.scalar_one_or_none.return_value = None
+        mock_database_for_api_tests.execute.return_value = mock_result
+
+        response = client.delete("/api/v1/miners/unknown")
+
+        assert response.status_code == 404
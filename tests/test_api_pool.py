@@ -2,10 +2,13 @@
 Тесты для API эндпоинтов пула
 """
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
+from datetime import datetime, UTC
+from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.dependencies import now_utc
+from app.models import database
 
 
 class TestAPIPool:
@@ -15,51 +18,39 @@ class TestAPIPool:
     def client(self):
         return TestClient(app)
 
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_stats_success(self, mock_get_db, client):
+    def test_pool_stats_success(self, client, mock_database_for_api_tests):
         """Тест успешного получения статистики пула"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        # Настраиваем моки для SQL запросов
+        # Все счетчики приходят одной строкой агрегатного запроса
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 10  # Для всех count запросов
-
-        # Для суммы hashrate
-        mock_hashrate_result = MagicMock()
-        mock_hashrate_result.scalar.return_value = 1000.0
-
-        # Последовательные вызовы scalar
-        scalar_values = [10, 5, 100, 80, 3, 2, 1000.0]
-
-        def scalar_side_effect():
-            if scalar_values:
-                return scalar_values.pop(0)
-            return 0
-
-        mock_result.scalar.side_effect = scalar_side_effect
-        mock_session.execute.return_value = mock_result
+        mock_result.one.return_value = MagicMock(
+            total_miners=10, active_miners=5, total_hashrate=1000.0,
+            total_shares=100, valid_shares=80,
+            total_blocks=3, confirmed_blocks=2
+        )
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.get("/api/v1/pool/stats")
 
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
-        assert "pool" in data["data"]
-        assert "miners" in data["data"]["pool"]
-        assert "shares" in data["data"]["pool"]
-        assert "blocks" in data["data"]["pool"]
-        assert "hashrate" in data["data"]["pool"]
-
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_stats_empty(self, mock_get_db, client):
+        pool = data["data"]["pool"]
+        assert pool["miners"] == {"total": 10, "active": 5, "inactive": 5}
+        assert pool["shares"]["invalid"] == 20
+        assert pool["blocks"]["unconfirmed"] == 1
+        assert pool["hashrate"]["total"] == 1000.0
+        # Один запрос к БД вместо семи
+        assert mock_database_for_api_tests.execute.await_count == 1
+
+    def test_pool_stats_empty(self, client, mock_database_for_api_tests):
         """Тест статистики пула при пустой базе"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
         mock_result = MagicMock()
-        mock_result.scalar.return_value = 0
-        mock_session.execute.return_value = mock_result
+        mock_result.one.return_value = MagicMock(
+            total_miners=0, active_miners=0, total_hashrate=0.0,
+            total_shares=0, valid_shares=0,
+            total_blocks=0, confirmed_blocks=0
+        )
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.get("/api/v1/pool/stats")
 
@@ -69,49 +60,35 @@ class TestAPIPool:
         assert data["data"]["pool"]["shares"]["validity_rate"] == 0
         assert data["data"]["pool"]["blocks"]["confirmation_rate"] == 0
 
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_stats_exception(self, mock_get_db, client):
+    def test_pool_stats_exception(self, client, mock_database_for_api_tests):
         """Тест обработки ошибки БД при получении статистики"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        mock_session.execute.side_effect = Exception("DB error")
+        mock_database_for_api_tests.execute.side_effect = Exception("DB error")
 
         response = client.get("/api/v1/pool/stats")
 
         assert response.status_code == 200
         data = response.json()
-        # API возвращает success с данными или error - проверяем наличие данных
-        assert "pool" in data.get("data", {})
+        assert data["status"] == "error"
+        assert data["data"] == {}
 
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_hashrate_success(self, mock_get_db, client):
+    def test_pool_hashrate_success(self, client, mock_database_for_api_tests):
         """Тест успешного получения hashrate пула"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        # Мокаем результат
         mock_result = MagicMock()
         mock_result.scalar.return_value = 1234.56
-        mock_session.execute = AsyncMock(return_value=mock_result)
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.get("/api/v1/pool/hashrate")
 
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "success"
-        # Проверяем, что значение есть (может быть 0 или 1234.56)
-        assert data["data"]["hashrate"]["total"] is not None
+        assert data["data"]["hashrate"]["total"] == 1234.56
 
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_hashrate_zero(self, mock_get_db, client):
+    def test_pool_hashrate_zero(self, client, mock_database_for_api_tests):
         """Тест получения нулевого hashrate"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
         mock_result = MagicMock()
         mock_result.scalar.return_value = 0.0
-        mock_session.execute.return_value = mock_result
+        mock_database_for_api_tests.execute.return_value = mock_result
 
         response = client.get("/api/v1/pool/hashrate")
 
@@ -119,22 +96,65 @@ class TestAPIPool:
         data = response.json()
         assert data["data"]["hashrate"]["total"] == 0.0
 
-    @patch('app.api.v1.pool.get_db')
-    def test_pool_hashrate_exception(self, mock_get_db, client):
+    def test_pool_hashrate_exception(self, client, mock_database_for_api_tests):
         """Тест исключения при получении hashrate"""
-        mock_session = AsyncMock()
-        mock_get_db.return_value = mock_session
-
-        # ВАЖНО: мокаем execute с side_effect
-        mock_session.execute = AsyncMock(side_effect=Exception("DB connection failed"))
+        mock_database_for_api_tests.execute.side_effect = Exception("DB connection failed")
 
         response = client.get("/api/v1/pool/hashrate")
 
         assert response.status_code == 200
         data = response.json()
-        # Проверяем, что статус error ИЛИ в сообщении есть ошибка
-        assert data["status"] == "error" or "ошибка" in data["message"].lower()
+        assert data["status"] == "error"
+        assert "ошибка" in data["message"].lower()
+
+    def test_pool_hashrate_cached(self, client, mock_database_for_api_tests):
+        """Тест: повторный запрос hashrate отдается из кэша без обращения к БД"""
+        mock_result = MagicMock()
+        mock_result.scalar.return_value = 100.0
+        mock_database_for_api_tests.execute.return_value = mock_result
+
+        first = client.get("/api/v1/pool/hashrate")
+        mock_result.scalar.return_value = 200.0
+        second = client.get("/api/v1/pool/hashrate")
 
+        assert first.json()["data"]["hashrate"]["total"] == 100.0
+        assert second.json()["data"]["hashrate"]["total"] == 100.0
+        assert mock_database_for_api_tests.execute.await_count == 1
+
+    def test_pool_stats_cache_hit_skips_connection(self, client, mock_database_for_api_tests):
+        """Тест: попадание в кэш не берет соединение из пула"""
+        mock_result = MagicMock()
+        mock_result.one.return_value = MagicMock(
+            total_miners=1, active_miners=1, total_hashrate=10.0,
+            total_shares=1, valid_shares=1,
+            total_blocks=0, confirmed_blocks=0
+        )
+        mock_database_for_api_tests.execute.return_value = mock_result
+        connect = MagicMock()
+        connect.return_value.__aenter__.return_value = mock_database_for_api_tests
+
+        async def counting_connector():
+            return connect
+
+        app.dependency_overrides[database.get_db_connector] = counting_connector
+
+        first = client.get("/api/v1/pool/stats")
+        second = client.get("/api/v1/pool/stats")
+
+        assert first.json() == second.json()
+        assert connect.call_count == 1
+
+    def test_pool_hashrate_error_not_cached(self, client, mock_database_for_api_tests):
+        """Тест: ответ об ошибке не кэшируется"""
+        mock_result = MagicMock()
+        mock_result.scalar.return_value = 100.0
+        mock_database_for_api_tests.execute.side_effect = [Exception("DB error"), mock_result]
+
+        first = client.get("/api/v1/pool/hashrate")
+        second = client.get("/api/v1/pool/hashrate")
+
+        assert first.json()["status"] == "error"
+        assert second.json()["status"] == "success"
 
     def test_pool_root(self, client):
         """Тест корневого эндпоинта пула"""
@@ -146,3 +166,16 @@ class TestAPIPool:
         assert "endpoints" in data["data"]
         assert "/stats" in data["data"]["endpoints"]
         assert "/hashrate" in data["data"]["endpoints"]
+
+    def test_pool_root_uses_request_time(self, client):
+        """Тест: оба timestamp ответа берутся из одной зависимости now_utc"""
+        fixed_now = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+        app.dependency_overrides[now_utc] = lambda: fixed_now
+        try:
+            response = client.get("/api/v1/pool/")
+        finally:
+            app.dependency_overrides.pop(now_utc, None)
+
+        data = response.json()
+        assert data["data"]["timestamp"] == fixed_now.isoformat()
+        assert datetime.fromisoformat(data["timestamp"]) == fixed_now
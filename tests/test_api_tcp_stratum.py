@@ -1,12 +1,14 @@
 """
 Тесты для API TCP Stratum эндпоинтов
 """
+import orjson
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, Mock
 from datetime import datetime, UTC, timedelta
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.dependencies import get_tcp_stratum_server, now_utc
 
 
 class TestAPITCPStratum:
@@ -16,13 +18,25 @@ class TestAPITCPStratum:
     def client(self):
         return TestClient(app)
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
+    @pytest.fixture
+    def mock_tcp_server(self):
+        """Подменяем TCP сервер через dependency_overrides"""
+        mock_server = MagicMock()
+        mock_server.start_time = datetime.now(UTC)
+        app.dependency_overrides[get_tcp_stratum_server] = lambda: mock_server
+        yield mock_server
+        app.dependency_overrides.pop(get_tcp_stratum_server, None)
+
     def test_get_tcp_stratum_stats_success(self, mock_tcp_server, client):
         """Тест успешного получения статистики TCP сервера"""
-        mock_tcp_server.host = "0.0.0.0"
-        mock_tcp_server.port = 3333
-        mock_tcp_server.connections = {"client1": Mock(), "client2": Mock()}
-        mock_tcp_server.miners = {"client1": "addr1", "client2": "addr2"}
+        mock_tcp_server.stats_payload_json.return_value = orjson.dumps({
+            "status": "running",
+            "host": "0.0.0.0",
+            "port": 3333,
+            "active_connections": 2,
+            "active_miners": 2,
+            "protocol": "stratum+tcp"
+        })
 
         response = client.get("/api/v1/tcp-stratum/stats")
 
@@ -33,31 +47,29 @@ class TestAPITCPStratum:
         assert data["data"]["port"] == 3333
         assert data["data"]["active_connections"] == 2
         assert data["data"]["active_miners"] == 2
+        # Ответ склеен из готовых байтов: обе метки - одно закодированное время
+        assert data["timestamp"] == data["data"]["timestamp"]
+        assert data["request_id"] is None
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_get_tcp_stratum_stats_exception(self, mock_tcp_server, client):
         """Тест исключения при получении статистики"""
+        # Симулируем ошибку при сборе статистики
+        mock_tcp_server.stats_payload_json.side_effect = Exception("Test error")
 
-        mock_tcp_server.host = "0.0.0.0"
-        mock_tcp_server.port = 3333
-
-        # Симулируем ошибку при доступе к connections
-        mock_tcp_server.connections = property(lambda obj: (_ for _ in ()).throw(Exception("Test error")))
-
+        # Ошибку обрабатывает глобальный обработчик, а не сам эндпоинт
+        client = TestClient(app, raise_server_exceptions=False)
         response = client.get("/api/v1/tcp-stratum/stats")
 
         assert response.status_code == 500
+        assert response.json()["detail"] == "Внутренняя ошибка сервера"
 
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_get_tcp_connections_success(self, mock_tcp_server, client):
         """Тест успешного получения списка подключений"""
-        # Создаем мок writer с peername
-        mock_writer = Mock()
-        mock_writer.get_extra_info.return_value = ("192.168.1.1", 12345)
-
-        mock_tcp_server.connections = {"client_123": mock_writer}
-        mock_tcp_server.miners = {"client_123": "test_address"}
+        # Снимок подключений: (client_id, remote_address, miner_address, connection_time)
+        mock_tcp_server.snapshot_connections.return_value = [
+            ("client_123", "192.168.1.1:12345", "test_address", "2024-01-01T00:00:00+00:00")
+        ]
 
         response = client.get("/api/v1/tcp-stratum/connections")
 
@@ -68,12 +80,11 @@ class TestAPITCPStratum:
         assert data["data"]["connections"][0]["client_id"] == "client_123"
         assert data["data"]["connections"][0]["miner_address"] == "test_address"
         assert data["data"]["connections"][0]["remote_address"] == "192.168.1.1:12345"
+        assert data["data"]["connections"][0]["connection_time"] == "2024-01-01T00:00:00+00:00"
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_get_tcp_connections_empty(self, mock_tcp_server, client):
         """Тест получения пустого списка подключений"""
-        mock_tcp_server.connections = {}
-        mock_tcp_server.miners = {}
+        mock_tcp_server.snapshot_connections.return_value = []
 
         response = client.get("/api/v1/tcp-stratum/connections")
 
@@ -82,24 +93,19 @@ class TestAPITCPStratum:
         assert data["data"]["total"] == 0
         assert data["data"]["connections"] == []
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_get_tcp_connections_exception(self, mock_tcp_server, client):
         """Тест исключения при получении подключений"""
-        # Симулируем ошибку в get_extra_info
-        mock_writer = Mock()
-        mock_writer.get_extra_info.side_effect = Exception("Connection error")
-        mock_tcp_server.connections = {"client1": mock_writer}
-        mock_tcp_server.miners = {"client1": "addr1"}
+        # Симулируем ошибку в get_extra_info при снятии снимка
+        mock_tcp_server.snapshot_connections.side_effect = Exception("Connection error")
 
+        client = TestClient(app, raise_server_exceptions=False)
         response = client.get("/api/v1/tcp-stratum/connections")
 
         assert response.status_code == 500
         data = response.json()
-        assert "detail" in data
-        # Сообщение об ошибке может быть любым
-        assert len(data["detail"]) > 0
+        assert data["detail"] == "Внутренняя ошибка сервера"
+        assert "Connection error" not in data["detail"]
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_check_tcp_stratum_health_success(self, mock_tcp_server, client):
         """Тест успешной проверки здоровья TCP сервера"""
 
@@ -111,24 +117,20 @@ class TestAPITCPStratum:
         mock_tcp_server.port = 3333
         mock_tcp_server.connections = {"client1": Mock()}
 
-        # ИСПРАВЛЕНО: Просто присваиваем значение, а не создаем property
-        mock_start_time = datetime.now(UTC) - timedelta(seconds=3600)
-        mock_tcp_server.start_time = mock_start_time  # ← Прямое присваивание
-
-        # Патчим datetime.now
-        with patch('app.api.v1.tcp_stratum.datetime') as mock_datetime:
-            mock_now = datetime.now(UTC)
-            mock_datetime.now.return_value = mock_now
-            mock_datetime.UTC = UTC
-
+        # Время запроса фиксируем через зависимость now_utc
+        mock_now = datetime.now(UTC)
+        mock_tcp_server.start_time = mock_now - timedelta(seconds=3600)
+        app.dependency_overrides[now_utc] = lambda: mock_now
+        try:
             response = client.get("/api/v1/tcp-stratum/health")
+        finally:
+            app.dependency_overrides.pop(now_utc, None)
 
         assert response.status_code == 200
         data = response.json()
         assert data["data"]["status"] == "running"
         assert data["data"]["uptime_seconds"] == 3600
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_check_tcp_stratum_health_stopped(self, mock_tcp_server, client):
         """Тест проверки здоровья остановленного сервера"""
         # Сервер остановлен
@@ -147,7 +149,6 @@ class TestAPITCPStratum:
         # С исправленной логикой должно быть "stopped"
         assert data["data"]["status"] == "stopped"
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_check_tcp_stratum_health_no_server(self, mock_tcp_server, client):
         """Тест проверки здоровья когда server = None"""
         mock_tcp_server.server = None
@@ -160,15 +161,13 @@ class TestAPITCPStratum:
         data = response.json()
         assert data["data"]["status"] == "stopped"
 
-    @patch('app.api.v1.tcp_stratum.tcp_stratum_server')
     def test_check_tcp_stratum_health_exception(self, mock_tcp_server, client):
         """Тест исключения при проверке здоровья"""
         mock_tcp_server.server = Mock()
         mock_tcp_server.server.is_serving.side_effect = Exception("Test error")
 
+        client = TestClient(app, raise_server_exceptions=False)
         response = client.get("/api/v1/tcp-stratum/health")
 
         assert response.status_code == 500
-        data = response.json()
-        assert "detail" in data
-        assert "Ошибка проверки здоровья" in data["detail"]
+        assert response.json()["detail"] == "Внутренняя ошибка сервера"
@@ -177,6 +177,53 @@ class TestBlockBuilder:
         assert block_hash
         assert not error
 
+    def test_prepare_template(self, block_builder):
+        """Тест: подготовленные данные шаблона - хэши, hex транзакций и комиссии"""
+        template = {
+            "transactions": [
+                {"hash": "aa" * 32, "data": "0100", "fee": 150},
+                {"hash": "bb" * 32, "hex": "0200", "fee": 50},
+                {"txid": "cc" * 32}
+            ]
+        }
+
+        prepared = block_builder.prepare_template(template)
+
+        assert prepared["tx_hashes"] == ["aa" * 32, "bb" * 32]
+        assert prepared["tx_data"] == ["0100", "0200"]
+        assert prepared["fees"] == 200
+        assert prepared["merkle_branch"] == ["aa" * 32, block_builder.calculate_merkle_root(["bb" * 32, "bb" * 32])]
+
+    def test_assemble_block_fast_matches_complete_block(self, block_builder):
+        """Тест: блок из заготовки совпадает с блоком полной сборки"""
+        template = {
+            "height": 1000,
+            "previousblockhash": "00" * 31 + "ab",
+            "version": 0x20000000,
+            "bits": "1d00ffff",
+            "curtime": 1700000000,
+            "coinbasevalue": 3125000000,
+            "transactions": [{"hash": f"{i + 1:064x}", "data": f"{i:02x}" * 60, "fee": 10} for i in range(5)]
+        }
+        extra_nonce1 = "ae6812eb4cd7735a302a8a9dd95cf71f"
+
+        with patch("app.stratum.block_builder.create_coinbase_script", return_value="76a914" + "11" * 20 + "88ac"):
+            job_data = block_builder.create_stratum_job_data(template, "job_1", "miner", extra_nonce1)
+            expected = block_builder.create_complete_block(
+                template, "miner", extra_nonce1, "0000002a", "6553f100", "12345678"
+            )
+
+        scaffold = block_builder.prepare_block_scaffold(template)
+        coinb1, coinb2 = job_data["params"][2], job_data["params"][3]
+        result = block_builder.assemble_block_fast(
+            scaffold, coinb1, coinb2, extra_nonce1, "0000002a", "6553f100", "12345678"
+        )
+
+        assert result == expected
+        assert block_builder.assemble_block_fast(
+            scaffold, coinb1, coinb2, extra_nonce1, "2a", "6553f100", "12345678"
+        ) is None
+
 
 def test_integration():
     """Интеграционный тест полного создания блока"""
@@ -0,0 +1,77 @@
+"""
+Тесты для контейнера зависимостей
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.dependencies import DependencyContainer
+
+
+# Классы сервисов импортируются лениво, поэтому патчим их в исходных модулях
+SERVICE_CLASSES = {
+    "NetworkManager": "app.utils.network_config.NetworkManager",
+    "BlockBuilder": "app.stratum.block_builder.BlockBuilder",
+    "DatabaseService": "app.services.database_service.DatabaseService",
+    "AuthService": "app.services.auth_service.AuthService",
+    "ShareValidator": "app.stratum.validator.ShareValidator",
+    "JobService": "app.services.job_service.JobService",
+    "JobManager": "app.jobs.manager.JobManager",
+    "StratumServer": "app.stratum.websocket_server.StratumServer",
+    "StratumTCPServer": "app.stratum.tcp_server.StratumTCPServer",
+    "DifficultyService": "app.services.difficulty_service.DifficultyService",
+}
+
+
+class TestDependencyContainer:
+    """Тесты для DependencyContainer"""
+
+    @pytest.fixture
+    def service_mocks(self):
+        """Подменяем классы сервисов, чтобы не создавать реальные объекты"""
+        patchers = {name: patch(target) for name, target in SERVICE_CLASSES.items()}
+        yield {name: patcher.start() for name, patcher in patchers.items()}
+        for patcher in patchers.values():
+            patcher.stop()
+
+    def test_services_created_lazily(self, service_mocks):
+        """Тест: до обращения сервисы не создаются"""
+        container = DependencyContainer()
+
+        assert not any(container.get_stats().values())
+        for mock_class in service_mocks.values():
+            mock_class.assert_not_called()
+
+    def test_warmup_creates_each_service_once(self, service_mocks):
+        """Тест: warmup создает все сервисы ровно по одному разу"""
+        container = DependencyContainer()
+
+        container.warmup()
+        container.warmup()
+
+        assert all(container.get_stats().values())
+        for mock_class in service_mocks.values():
+            mock_class.assert_called_once()
+        assert container.job_manager is service_mocks["JobManager"].return_value
+
+    def test_difficulty_service_updates_created_validator(self, service_mocks):
+        """Тест: созданный ранее валидатор получает актуальную сложность"""
+        service_mocks["DifficultyService"].return_value = MagicMock(current_difficulty=42.0)
+        container = DependencyContainer()
+
+        container.warmup()
+
+        assert container.share_validator.target_difficulty == 42.0
+
+
+    def test_tcp_stratum_server_uses_settings(self, service_mocks):
+        """Тест: TCP сервер создается с хостом и портом из настроек"""
+        container = DependencyContainer()
+
+        with patch("app.utils.config.settings") as mock_settings:
+            mock_settings.stratum_host = "127.0.0.1"
+            mock_settings.stratum_port = 4444
+            container.tcp_stratum_server
+
+        kwargs = service_mocks["StratumTCPServer"].call_args.kwargs
+        assert kwargs["host"] == "127.0.0.1"
+        assert kwargs["port"] == 4444
@@ -321,6 +321,30 @@ class TestDifficultyService:
         assert new_difficulty == difficulty_service.current_difficulty
         assert "error" in message.lower()
 
+    @pytest.mark.asyncio
+    async def test_update_difficulty_skipped_without_miners(self, difficulty_service):
+        """Без подключенных майнеров сложность не пересчитывается"""
+        ws_server = MagicMock(connection_count=1)
+        tcp_server = MagicMock(connection_count=0)
+        difficulty_service.track_connections(ws_server, tcp_server, None)
+
+        assert difficulty_service.connected_clients == 1
+        ws_server.add_connection_listener.assert_called_once_with(difficulty_service.on_connection_event)
+        tcp_server.add_connection_listener.assert_called_once_with(difficulty_service.on_connection_event)
+
+        difficulty_service.on_connection_event("miner_disconnected", "ws_1")
+        with patch.object(difficulty_service, 'calculate_difficulty', AsyncMock(return_value=2.0)) as mock_calc:
+            changed, new_difficulty, message = await difficulty_service.update_difficulty()
+
+        assert difficulty_service.connected_clients == 0
+        assert changed is False
+        assert new_difficulty == difficulty_service.current_difficulty
+        assert message == "No connected miners"
+        mock_calc.assert_not_called()
+
+        difficulty_service.on_connection_event("miner_connected", "tcp_1")
+        assert difficulty_service.connected_clients == 1
+
     @pytest.mark.asyncio
     async def test_broadcast_difficulty_update(self, difficulty_service):
         """Рассылка обновления сложности WebSocket и TCP майнерам"""
@@ -535,6 +559,22 @@ class TestDifficultyService:
         # Допускаем погрешность из-за статистики
         assert abs(hashrate - expected_hashrate) < expected_hashrate * 0.5
 
+    @pytest.mark.asyncio
+    async def test_get_miner_hashrate_ignores_shares_outside_period(self, difficulty_service):
+        """Хэшрейт считается только по шарам за период"""
+        miner_address = "miner123"
+        base_time = datetime.now(UTC)
+
+        difficulty_service.share_timestamps[miner_address] = deque(maxlen=100)
+        # Старый шар вне периода не должен влиять на средний интервал
+        difficulty_service.share_timestamps[miner_address].append(base_time - timedelta(hours=1))
+        for i in range(5):
+            difficulty_service.share_timestamps[miner_address].append(base_time - timedelta(seconds=10 - 2 * i))
+
+        hashrate = await difficulty_service.get_miner_hashrate(miner_address, period_minutes=5)
+
+        assert hashrate == pytest.approx((2 ** 32) / 2.0)
+
     @pytest.mark.asyncio
     async def test_get_miner_hashrate_fast_shares(self, difficulty_service):
         """Расчет хэшрейта при очень быстрых шарах"""
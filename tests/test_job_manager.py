@@ -0,0 +1,595 @@
+"""
+Тесты для JobManager
+"""
+import asyncio
+import sys
+import threading
+import pytest
+
+from unittest.mock import Mock, AsyncMock, patch
+from app.jobs.manager import JobManager, SHARE_ACCEPTED_RESULT, SHARE_LOG_SAMPLE_RATE, DEFAULT_PAYOUT_ADDRESS, miner_context
+from app.utils.protocol_helpers import SubmitStatus
+from app.utils.config import settings
+
+
+class TestJobManager:
+    """Тесты менеджера заданий"""
+
+    @pytest.fixture
+    def template(self):
+        """Шаблон блока от ноды"""
+        return {
+            "height": 100,
+            "previousblockhash": "00" * 32,
+            "longpollid": "lp_1",
+            "coinbasevalue": 625000000,
+            "curtime": 1700000000
+        }
+
+    @pytest.fixture
+    def job_manager(self, template):
+        """JobManager с подмененным клиентом ноды"""
+        block_builder = Mock()
+        block_builder.create_stratum_job_data = Mock(
+            side_effect=lambda template, job_id, miner_address, extra_nonce1, prepared=None, now=None: {
+                "method": "mining.notify",
+                "params": [job_id, "00" * 32, "coinb1", "coinb2", [], "20000000", "1d00ffff", "00000000", True],
+                "template": template
+            }
+        )
+        manager = JobManager(job_service=Mock(), block_builder=block_builder)
+        manager.node_client = Mock()
+        manager.node_client.get_block_template = AsyncMock(return_value=template)
+        return manager
+
+    @pytest.mark.asyncio
+    async def test_create_new_job_reuses_cached_template(self, job_manager, template):
+        """Тест: задания для разных майнеров строятся из одного шаблона"""
+        first = await job_manager.create_new_job("miner_address_1")
+        second = await job_manager.create_new_job("miner_address_2")
+
+        assert job_manager.node_client.get_block_template.await_count == 1
+        assert first.job_id != second.job_id
+        assert first.stratum["params"][0] == first.job_id
+        assert second.stratum["template"] is template
+        assert job_manager._template_cache["key"] == (100, "00" * 32, "lp_1")
+
+    @pytest.mark.asyncio
+    async def test_same_miner_job_reuses_skeleton(self, job_manager, template):
+        """Тест: повторное задание майнера на том же шаблоне - копия без пересборки coinbase"""
+        with patch("app.jobs.manager.time.time", return_value=1700000100.0):
+            first = await job_manager.create_new_job("miner_address_1")
+        with patch("app.jobs.manager.time.time", return_value=1700000160.0):
+            second = await job_manager.create_new_job("miner_address_1")
+
+        assert job_manager.block_builder.create_stratum_job_data.call_count == 1
+        assert second.stratum["params"][0] == second.job_id != first.job_id
+        assert second.stratum["params"][7] == "%08x" % 1700000160
+        assert second.stratum["params"][2:7] == first.stratum["params"][2:7]
+        assert first.stratum["params"][0] == first.job_id
+
+        # Новый шаблон - задание собирается заново
+        job_manager.invalidate_template_cache()
+        job_manager.node_client.get_block_template.return_value = dict(template)
+        await job_manager.create_new_job("miner_address_1")
+        assert job_manager.block_builder.create_stratum_job_data.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_template_cache_expires_and_invalidates(self, job_manager):
+        """Тест: шаблон запрашивается снова после TTL и после сброса кэша"""
+        await job_manager.create_new_job()
+
+        with patch("app.jobs.manager.settings") as mock_settings:
+            mock_settings.job_template_cache_ttl = 0
+            await job_manager.create_new_job()
+        assert job_manager.node_client.get_block_template.await_count == 2
+
+        job_manager.invalidate_template_cache()
+        await job_manager.create_new_job()
+        assert job_manager.node_client.get_block_template.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_template_cache_kept_while_zmq_active(self, job_manager):
+        """Тест: при ZMQ подписке шаблон живет до нового блока, но не дольше max_age"""
+        job_manager.zmq_active = True
+        await job_manager.create_new_job()
+
+        with patch.object(settings, "job_template_cache_ttl", 0):
+            await job_manager.create_new_job()
+            assert job_manager.node_client.get_block_template.await_count == 1
+
+            with patch.object(settings, "job_zmq_template_max_age", 0):
+                await job_manager.create_new_job()
+            assert job_manager.node_client.get_block_template.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_clean_jobs_only_on_new_block(self, job_manager, template):
+        """Тест: clean_jobs=True только для шаблона нового блока, не для обновления того же"""
+        first = await job_manager.create_new_job("miner_address_1")
+
+        job_manager.invalidate_template_cache()
+        job_manager.node_client.get_block_template.return_value = dict(template, longpollid="lp_2")
+        same_block = await job_manager.create_new_job("miner_address_1")
+
+        job_manager.invalidate_template_cache()
+        job_manager.node_client.get_block_template.return_value = dict(
+            template, height=101, previousblockhash="11" * 32
+        )
+        new_block = await job_manager.create_new_job("miner_address_1")
+
+        assert first.stratum["params"][8] is True
+        assert same_block.stratum["params"][8] is False
+        assert new_block.stratum["params"][8] is True
+
+    @pytest.mark.asyncio
+    async def test_failed_template_not_cached(self, job_manager):
+        """Тест: пустой ответ ноды не кэшируется"""
+        job_manager.node_client.get_block_template.return_value = None
+
+        assert await job_manager.create_new_job() is None
+        assert await job_manager.create_new_job() is None
+        assert job_manager.node_client.get_block_template.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_longpoll_loop_broadcasts_new_template(self, job_manager, template):
+        """Тест: ответ longpoll обновляет кэш и рассылает задание без лишних RPC"""
+        new_template = dict(template, height=101, longpollid="lp_2")
+        job_manager.node_client.get_block_template.side_effect = [
+            template, new_template, asyncio.CancelledError()
+        ]
+        job_manager.broadcast_new_job_to_all = AsyncMock()
+
+        await job_manager.longpoll_loop()
+
+        calls = job_manager.node_client.get_block_template.await_args_list
+        assert calls[1].kwargs["longpollid"] == "lp_1"
+        assert calls[2].kwargs["longpollid"] == "lp_2"
+        job_manager.broadcast_new_job_to_all.assert_awaited_once()
+        assert job_manager._template_cache["template"] is new_template
+        assert job_manager.longpoll_active is False
+
+    @pytest.mark.asyncio
+    async def test_longpoll_loop_stops_without_longpollid(self, job_manager, template):
+        """Тест: без longpollid от ноды цикл завершается"""
+        template.pop("longpollid")
+
+        await job_manager.longpoll_loop()
+
+        job_manager.node_client.get_block_template.assert_awaited_once_with()
+        assert job_manager.longpoll_active is False
+
+    @pytest.mark.asyncio
+    async def test_zmq_new_tip_interrupts_longpoll(self, job_manager, template):
+        """Тест: уведомление ZMQ о блоке прерывает ожидание longpoll"""
+        longpoll_pending = asyncio.get_running_loop().create_future()
+
+        async def get_block_template(longpollid=None, timeout=30):
+            if longpollid:
+                await longpoll_pending
+            return template
+
+        job_manager.node_client.get_block_template = AsyncMock(side_effect=get_block_template)
+        job_manager._last_longpollid = "lp_1"
+        job_manager.zmq_active = True
+        job_manager._new_tip.set()
+
+        assert await job_manager._wait_template_update() is template
+        assert not job_manager._new_tip.is_set()
+        calls = job_manager.node_client.get_block_template.await_args_list
+        assert calls[-1].kwargs == {}
+
+    @pytest.mark.asyncio
+    async def test_zmq_listener_without_pyzmq(self, job_manager):
+        """Тест: без pyzmq подписка не запускается, остается longpoll"""
+        with patch.dict(sys.modules, {"zmq": None, "zmq.asyncio": None}):
+            await job_manager.zmq_listener("tcp://127.0.0.1:28333")
+
+        assert job_manager.zmq_active is False
+
+    @pytest.mark.asyncio
+    async def test_initialize_hung_connect_times_out(self, job_manager):
+        """Тест: зависшее подключение прерывается по таймауту, после последней попытки без паузы"""
+        async def hang():
+            await asyncio.Event().wait()
+
+        job_manager.node_client.connect = AsyncMock(side_effect=hang)
+
+        with patch.object(settings, "bch_node_connect_timeout", 0.01), \
+                patch("app.jobs.manager.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+            assert await job_manager.initialize() is False
+
+        assert job_manager.node_client.connect.await_count == 3
+        assert mock_sleep.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_initialize_prefetches_template_in_one_batch(self, job_manager, template):
+        """Тест: сложность и первый шаблон приходят одним batch запросом"""
+        job_manager.node_client.connect = AsyncMock(return_value=True)
+        job_manager.node_client.block_height = 99
+        job_manager.node_client.difficulty = 1.0
+        job_manager.node_client.batch_call = AsyncMock(return_value=[{"difficulty": 5.5}, template])
+
+        assert await job_manager.initialize() is True
+        await job_manager.create_new_job()
+
+        methods = [method for method, _ in job_manager.node_client.batch_call.await_args.args[0]]
+        assert methods == ["getmininginfo", "getblocktemplate"]
+        assert job_manager.difficulty == 5.5
+        assert job_manager.block_height == 100
+        job_manager.node_client.get_block_template.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_current_difficulty_cached(self, job_manager):
+        """Тест: повторные запросы сложности в пределах TTL идут из кэша"""
+        job_manager.node_client.get_mining_info = AsyncMock(
+            return_value={"difficulty": 2.5, "blocks": 150}
+        )
+
+        assert await job_manager.get_current_difficulty() == 2.5
+        assert await job_manager.get_current_difficulty() == 2.5
+        assert job_manager.node_client.get_mining_info.await_count == 1
+        assert job_manager.block_height == 150
+
+        job_manager._mining_info_cache = (0.0, None)
+        await job_manager.get_current_difficulty()
+        assert job_manager.node_client.get_mining_info.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_close_releases_node_session(self, job_manager):
+        """Тест: close закрывает HTTP сессию клиента ноды"""
+        job_manager.node_client.close = AsyncMock()
+
+        await job_manager.close()
+
+        job_manager.node_client.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_current_difficulty_single_flight(self, job_manager):
+        """Тест: одновременные запросы сложности при пустом кэше - один RPC"""
+        async def get_mining_info():
+            await asyncio.sleep(0.01)
+            return {"difficulty": 3.0, "blocks": 151}
+
+        job_manager.node_client.get_mining_info = AsyncMock(side_effect=get_mining_info)
+
+        results = await asyncio.gather(*(job_manager.get_current_difficulty() for _ in range(5)))
+
+        assert results == [3.0] * 5
+        assert job_manager.node_client.get_mining_info.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_fallback_job_uses_cached_version_hex(self, job_manager, template):
+        """Тест: fallback задание берет hex версии из кэша шаблона"""
+        template["version"] = 0x20000004
+        job_manager.block_builder.create_stratum_job_data.side_effect = None
+        job_manager.block_builder.create_stratum_job_data.return_value = None
+
+        job = await job_manager.create_new_job("miner_address_1")
+
+        assert job_manager._template_cache["version_hex"] == "20000004"
+        assert job.job_id.endswith("_miner_ad")
+        assert job.stratum["params"][5] == "20000004"
+        assert int(job.stratum["params"][7], 16) >= template["curtime"]
+
+    @pytest.mark.asyncio
+    async def test_create_new_job_reads_clock_once(self, job_manager):
+        """Тест: ID задания, ntime и created_at берутся из одного чтения часов"""
+        with patch("app.jobs.manager.time.time", return_value=1700000100.5) as mock_time:
+            job = await job_manager.create_new_job("miner_address_1")
+
+        mock_time.assert_called_once_with()
+        assert job.job_id.startswith("job_1700000100_")
+        assert job_manager.block_builder.create_stratum_job_data.call_args.kwargs["now"] == 1700000100
+        assert job_manager.current_job["created_at"].timestamp() == 1700000100.5
+
+    def test_fallback_job_ntime_not_older_than_now(self, template):
+        """Тест: ntime задания не раньше текущего времени, будущий curtime сохраняется"""
+        with patch("app.jobs.manager.time.time", return_value=1700000100.5):
+            stale = JobManager._create_fallback_stratum_job(template, "job_1")
+            future = JobManager._create_fallback_stratum_job(dict(template, curtime=1700000200), "job_2")
+
+        assert stale["params"][7] == "%08x" % 1700000100
+        assert future["params"][7] == "%08x" % 1700000200
+        # Параметры собираются из шаблона, но списки у заданий свои
+        assert stale["params"][0] == "job_1" and stale["params"][2] == "fdfd0800"
+        assert stale["params"][4] == [] and stale["params"][4] is not future["params"][4]
+
+    @pytest.mark.asyncio
+    async def test_broadcast_new_job_to_all_sends_stratum_data(self, job_manager):
+        """Тест: серверам рассылаются данные mining.notify из результата create_new_job"""
+        job_manager.stratum_server = Mock(broadcast_new_job=AsyncMock())
+        job_manager.tcp_stratum_server = Mock(broadcast_new_job=AsyncMock())
+
+        await job_manager.broadcast_new_job_to_all()
+
+        sent = job_manager.tcp_stratum_server.broadcast_new_job.await_args.args[0]
+        assert sent is job_manager.current_job["stratum_data"]
+        assert sent["params"][0] == job_manager.current_job["id"]
+        job_manager.stratum_server.broadcast_new_job.assert_awaited_once_with(sent)
+
+    @pytest.mark.asyncio
+    async def test_broadcast_coalesces_concurrent_triggers(self, job_manager):
+        """Тест: одновременные триггеры дают одну рассылку, вызов во время рассылки - еще одну"""
+        job_manager.tcp_stratum_server = Mock(broadcast_new_job=AsyncMock())
+        job_manager._broadcast_new_job = AsyncMock(wraps=job_manager._broadcast_new_job)
+
+        with patch("app.jobs.manager.settings") as mock_settings:
+            mock_settings.job_broadcast_debounce = 0
+            mock_settings.job_broadcast_min_interval = 0
+            mock_settings.job_template_cache_ttl = 60
+
+            await asyncio.gather(*(job_manager.broadcast_new_job_to_all() for _ in range(5)))
+            assert job_manager._broadcast_new_job.await_count == 1
+
+            first = asyncio.ensure_future(job_manager.broadcast_new_job_to_all())
+            await asyncio.sleep(0)
+            await asyncio.gather(first, job_manager.broadcast_new_job_to_all(), job_manager.broadcast_new_job_to_all())
+
+        assert job_manager._broadcast_new_job.await_count == 3
+        assert job_manager._pending_broadcast is None
+
+    @pytest.mark.asyncio
+    async def test_broadcast_skips_same_template_within_min_interval(self, job_manager):
+        """Тест: тот же шаблон повторно не рассылается в пределах min_interval"""
+        job_manager.tcp_stratum_server = Mock(broadcast_new_job=AsyncMock())
+
+        with patch("app.jobs.manager.settings") as mock_settings:
+            mock_settings.job_broadcast_debounce = 0
+            mock_settings.job_broadcast_min_interval = 60
+            mock_settings.job_template_cache_ttl = 60
+
+            await job_manager.broadcast_new_job_to_all()
+            await job_manager.broadcast_new_job_to_all()
+            assert job_manager.tcp_stratum_server.broadcast_new_job.await_count == 1
+
+            job_manager.invalidate_template_cache()
+            job_manager.node_client.get_block_template.return_value = {"height": 101, "previousblockhash": "11" * 32}
+            await job_manager.broadcast_new_job_to_all()
+
+        assert job_manager.tcp_stratum_server.broadcast_new_job.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_broadcast_clean_jobs_keeps_stored_job(self, job_manager):
+        """Тест: clean_jobs рассылается без изменения сохраненного задания"""
+        params = ["job_1", "00" * 32, "", "", [], "20000000", "1d00ffff", "00000000", False]
+        job_manager.current_job = {"stratum_data": {"method": "mining.notify", "params": params}}
+        job_manager.stratum_server = Mock(broadcast_new_job=AsyncMock())
+        job_manager.tcp_stratum_server = Mock(broadcast_new_job=AsyncMock())
+
+        await job_manager._broadcast_clean_jobs()
+
+        sent = job_manager.tcp_stratum_server.broadcast_new_job.await_args.args[0]
+        assert sent["params"][8] is True
+        assert sent["params"][:8] == params[:8]
+        assert params[8] is False
+        job_manager.stratum_server.broadcast_new_job.assert_awaited_once_with(sent)
+
+    @pytest.mark.asyncio
+    async def test_submit_block_solution_submits_in_background(self, job_manager, template):
+        """Тест: ответ майнеру не ждет submitblock, итог ноды сохраняется"""
+        job_manager.job_service.get_job = Mock(return_value={"template": template})
+        job_manager.block_builder.create_complete_block = Mock(return_value={
+            "block_hex": "00" * 80, "header_hash": "ab" * 32, "height": 100
+        })
+        job_manager.node_client.submit_block = AsyncMock(return_value=(SubmitStatus.ACCEPTED, None))
+        job_manager._template_cache["template"] = template
+
+        result = await job_manager.submit_block_solution("miner_address_1", {
+            "job_id": "job_1", "extra_nonce2": "00000000", "ntime": "5f5e1000", "nonce": "00000001"
+        })
+
+        assert result["status"] == "accepted"
+        assert result["pending_node_submit"] is True
+        await asyncio.gather(*job_manager._submit_tasks)
+
+        job_manager.node_client.submit_block.assert_awaited_once_with("00" * 80)
+        assert job_manager.block_submit_results[-1]["status"] == "accepted"
+        assert job_manager.block_submit_results[-1]["block_hash"] == "ab" * 32
+        assert job_manager.get_stats()["last_block_submits"] == list(job_manager.block_submit_results)
+        assert job_manager._template_cache["template"] is None
+
+    @pytest.mark.asyncio
+    async def test_close_waits_for_pending_block_submit(self, job_manager, template):
+        """Тест: close() дожидается отправки найденного блока и только потом закрывает клиент"""
+        job_manager.job_service.get_job = Mock(return_value={"template": template})
+        job_manager.block_builder.create_complete_block = Mock(return_value={
+            "block_hex": "00" * 80, "header_hash": "ab" * 32, "height": 100
+        })
+        release = asyncio.Event()
+        order = []
+
+        async def slow_submit(_hex):
+            await release.wait()
+            order.append("submitted")
+            return SubmitStatus.ACCEPTED, None
+
+        async def close_client():
+            order.append("closed")
+
+        job_manager.node_client.submit_block = slow_submit
+        job_manager.node_client.close = close_client
+
+        await job_manager.submit_block_solution("miner_address_1", {
+            "job_id": "job_1", "extra_nonce2": "00000000", "ntime": "5f5e1000", "nonce": "00000001"
+        })
+        assert job_manager._submit_tasks
+
+        close_task = asyncio.create_task(job_manager.close())
+        await asyncio.sleep(0)
+        assert order == []
+
+        release.set()
+        await close_task
+
+        assert order == ["submitted", "closed"]
+        assert job_manager.block_submit_results[-1]["status"] == "accepted"
+
+    @pytest.mark.asyncio
+    async def test_close_drain_is_bounded(self, job_manager):
+        """Тест: зависшая отправка не блокирует close() дольше таймаута"""
+        job_manager._submit_tasks.add(asyncio.create_task(asyncio.Event().wait()))
+        job_manager.node_client.close = AsyncMock()
+
+        with patch('app.jobs.manager.BLOCK_SUBMIT_DRAIN_TIMEOUT', 0.01):
+            await job_manager.close()
+
+        job_manager.node_client.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_submit_block_solution_assembles_off_event_loop(self, job_manager, template):
+        """Тест: сборка блока выполняется не в потоке event loop"""
+        job_manager.job_service.get_job = Mock(return_value={"template": template})
+        job_manager.node_client.submit_block = AsyncMock(return_value=(SubmitStatus.REJECTED, None))
+        threads = []
+
+        def create_complete_block(**kwargs):
+            threads.append(threading.get_ident())
+            return {"block_hex": "00" * 80, "header_hash": "ab" * 32, "height": 100}
+
+        job_manager.block_builder.create_complete_block = Mock(side_effect=create_complete_block)
+
+        result = await job_manager.submit_block_solution("miner_address_1", {
+            "job_id": "job_1", "extra_nonce2": "00000000", "ntime": "5f5e1000", "nonce": "00000001"
+        })
+        await asyncio.gather(*job_manager._submit_tasks)
+
+        assert result["status"] == "accepted"
+        assert threads and threads[0] != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_template_prepared_once_and_reused_on_submit(self, job_manager, template):
+        """Тест: данные шаблона готовятся один раз на шаблон и доходят до сборки блока"""
+        job_manager.job_service.get_job = Mock(return_value={"template": template})
+        job_manager.block_builder.create_complete_block = Mock(return_value=None)
+
+        await job_manager.create_new_job("miner_address_1")
+        await job_manager.create_new_job("miner_address_2")
+        await job_manager.submit_block_solution("miner_address_1", {
+            "job_id": "job_1", "extra_nonce2": "00000000", "ntime": "5f5e1000", "nonce": "00000001"
+        })
+
+        prepared = job_manager.block_builder.prepare_template.return_value
+        job_manager.block_builder.prepare_template.assert_called_once_with(template)
+        assert job_manager.block_builder.create_stratum_job_data.call_args.kwargs["prepared"] is prepared
+        assert job_manager.block_builder.create_complete_block.call_args.kwargs["prepared"] is prepared
+
+    @pytest.mark.asyncio
+    async def test_submit_uses_block_scaffold(self, job_manager, template):
+        """Тест: решение по шаблону из LRU собирается из заготовки и coinbase задания"""
+        job = await job_manager.create_new_job("miner_address_1")
+        job_manager.job_service.get_job = Mock(return_value={
+            "template": template,
+            "params": [job.job_id, "00" * 32, "01aa", "02bb"],
+            "extra_nonce1": "ae68"
+        })
+        job_manager.block_builder.assemble_block_fast = Mock(return_value={
+            "block_hex": "00" * 80, "header_hash": "ab" * 32, "height": 100
+        })
+        job_manager.block_builder.create_complete_block = Mock()
+        job_manager.node_client.submit_block = AsyncMock(return_value=(SubmitStatus.ACCEPTED, None))
+
+        result = await job_manager.submit_block_solution("miner_address_1", {
+            "job_id": job.job_id, "extra_nonce2": "00000000", "ntime": "5f5e1000", "nonce": "00000001"
+        })
+        await asyncio.gather(*job_manager._submit_tasks)
+
+        assert result["status"] == "accepted"
+        job_manager.block_builder.assemble_block_fast.assert_called_once_with(
+            job_manager.block_builder.prepare_block_scaffold.return_value,
+            "01aa", "02bb", "ae68", "00000000", "5f5e1000", "00000001"
+        )
+        job_manager.block_builder.create_complete_block.assert_not_called()
+        job_manager.node_client.submit_block.assert_awaited_once_with("00" * 80)
+
+    def test_template_lru_bounded(self, job_manager, template):
+        """Тест: LRU шаблонов вытесняет самые старые previousblockhash"""
+        templates = [dict(template, previousblockhash="%064x" % i) for i in range(10)]
+        for item in templates:
+            job_manager._prepared_template(item)
+
+        assert list(job_manager._template_lru) == ["%064x" % i for i in range(2, 10)]
+        assert job_manager._lookup_template_entry(templates[0]) is None
+        assert job_manager._lookup_template_entry(dict(templates[9])) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_create_new_job_single_flight(self, job_manager, template):
+        """Тест: одновременные запросы заданий делят один RPC и одно задание на майнера"""
+        async def slow_template():
+            await asyncio.sleep(0)
+            return template
+
+        job_manager.node_client.get_block_template = AsyncMock(side_effect=slow_template)
+
+        first, same, other = await asyncio.gather(
+            job_manager.create_new_job("miner_address_1"),
+            job_manager.create_new_job("miner_address_1"),
+            job_manager.create_new_job("miner_address_2"),
+        )
+
+        assert job_manager.node_client.get_block_template.await_count == 1
+        assert first is same
+        assert other.job_id != first.job_id
+        assert job_manager.block_builder.create_stratum_job_data.call_count == 2
+        assert job_manager._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_validate_and_save_share_result(self):
+        """Тест: ответ о шаре собирается из шаблона и не меняет его"""
+        result = await JobManager.validate_and_save_share("miner_address_1", {"job_id": "job_1"})
+
+        assert result["status"] == "accepted"
+        assert result["job_id"] == "job_1"
+        assert result["timestamp"]
+        assert "job_id" not in SHARE_ACCEPTED_RESULT
+
+    @pytest.mark.asyncio
+    async def test_validate_and_save_share_sampled_logging(self):
+        """Тест: в INFO логируется только каждый SHARE_LOG_SAMPLE_RATE-й шар"""
+        with patch.object(JobManager, "_share_log_counter", 0), \
+                patch("app.jobs.manager.logger") as mock_logger:
+            for _ in range(SHARE_LOG_SAMPLE_RATE * 2):
+                await JobManager.validate_and_save_share("miner_address_1", {"job_id": "job_1"})
+
+        assert mock_logger.info.call_count == 2
+        assert mock_logger.info.call_args.kwargs["shares_total"] == SHARE_LOG_SAMPLE_RATE * 2
+
+    def test_get_stats_returns_independent_dicts(self, job_manager):
+        """Тест: статистика отражает текущее состояние и не делит словари между вызовами"""
+        job_manager.block_height = 100
+        first = job_manager.get_stats()
+        job_manager.block_height = 101
+        second = job_manager.get_stats()
+
+        assert first["status"] == "connected"
+        assert first["node_info"]["block_height"] == 100
+        assert second["node_info"]["block_height"] == 101
+        assert set(second["node_info"]) == {"block_height", "difficulty", "connection", "auth_method"}
+
+    @pytest.mark.asyncio
+    async def test_create_new_job_uses_miner_context(self, job_manager):
+        """Тест: ID задания и адрес выплаты берутся из контекста майнера"""
+        job = await job_manager.create_new_job("qminer_address_1")
+        broadcast = await job_manager.create_new_job()
+
+        assert job.job_id.endswith("_qminer_a")
+        assert broadcast.job_id.count("_") == 2
+        payouts = [call.kwargs["miner_address"] for call in job_manager.block_builder.create_stratum_job_data.call_args_list]
+        assert payouts == ["qminer_address_1", miner_context(None).payout_address]
+
+    def test_miner_context_cached_per_address(self):
+        """Тест: контекст майнера создается один раз на адрес"""
+        context = miner_context("qminer_address_1")
+
+        assert miner_context("qminer_address_1") is context
+        assert context.id_suffix == "_qminer_a"
+        assert context.payout_address == "qminer_address_1"
+        assert miner_context(None).id_suffix == ""
+        assert miner_context(None).payout_address == (settings.pool_wallet or DEFAULT_PAYOUT_ADDRESS)
+
+    def test_retry_delay_jittered_and_capped(self):
+        """Тест: задержка повтора случайна в пределах экспоненты и не больше 10 сек"""
+        with patch("app.jobs.manager.random.uniform", return_value=1.5) as mock_uniform:
+            assert JobManager._retry_delay(3) == 1.5
+        mock_uniform.assert_called_once_with(0.5, 8)
+
+        assert all(0.5 <= JobManager._retry_delay(10) <= 10.0 for _ in range(20))
@@ -44,7 +44,7 @@ class TestJobService:
         assert service.active_jobs == {}
         assert service.miner_subscriptions == {}
         assert service.job_counter == 0
-        assert service.job_history == []
+        assert list(service.job_history) == []
         assert service.last_broadcast_job is None
 
     def test_initialization_without_validator(self, mock_network_manager):
@@ -69,17 +69,13 @@ class TestJobService:
         """Создание ID для персонального задания"""
         miner_address = "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a"
 
-        # Патчим datetime.now(UTC) в модуле job_service
+        # Фиксируем часы в модуле job_service
         from datetime import datetime, UTC
 
         # Создаем фиксированную дату
         fixed_datetime = datetime(2024, 1, 29, 0, 0, 0, tzinfo=UTC)
 
-        # Патчим через context manager
-        with patch('app.services.job_service.datetime') as mock_datetime:
-            mock_datetime.now.return_value = fixed_datetime
-            mock_datetime.UTC = UTC  # Важно добавить атрибут UTC
-
+        with patch('app.services.job_service.time.time', return_value=fixed_datetime.timestamp()):
             job_id = job_service.create_job_id(miner_address=miner_address)
 
             timestamp = int(fixed_datetime.timestamp())  # 1706457600
@@ -296,6 +292,8 @@ class TestJobService:
         assert len(job_data["params"]) == 9
         assert "extra_nonce1" in job_data
         assert "coinbase_value" in job_data
+        # ID задания и ntime - от одного чтения часов
+        assert int(job_data["params"][0].split("_")[1]) == int(job_data["params"][7], 16)
 
         # Проверяем вызовы методов NetworkManager
         mock_network_manager.get_fallback_prev_block_hash.assert_called_once()
@@ -390,6 +388,16 @@ class TestJobService:
             # Это строка, нужно преобразовать для сравнения
             assert first_time >= last_time  # новые записи первыми
 
+    def test_job_history_bounded(self, job_service):
+        """История хранит только последние max_history_size заданий"""
+        total = job_service.max_history_size + 5
+        for i in range(total):
+            job_service.add_job(f"job_1706457600_{i:08x}_broadcast", {"method": "mining.notify"})
+
+        assert len(job_service.job_history) == job_service.max_history_size
+        assert job_service.job_history[0]["id"] == "job_1706457600_00000005_broadcast"
+        assert job_service.get_job_history(limit=1)[0]["id"] == f"job_1706457600_{total - 1:08x}_broadcast"
+
     def test_get_miner_job_stats(self, job_service):
         """Получение статистики заданий майнера"""
         miner_address = "miner123"
@@ -0,0 +1,61 @@
+"""
+Тесты для жизненного цикла приложения
+"""
+import asyncio
+import pytest
+from unittest.mock import patch, Mock, AsyncMock
+
+from app.lifespan import lifespan
+
+
+async def _idle():
+    """Фоновая задача-заглушка: ждет отмены"""
+    await asyncio.Event().wait()
+
+
+def _events(mock_method):
+    """Собирает значения event= из вызовов мокнутого логгера"""
+    return [call.kwargs.get("event") for call in mock_method.call_args_list]
+
+
+class TestLifespan:
+    """Тесты для lifespan"""
+
+    @pytest.fixture
+    def mock_container(self):
+        """Контейнер с замоканными сервисами"""
+        container = Mock()
+        container.job_manager.initialize = AsyncMock(return_value=True)
+        container.job_manager.broadcast_new_job_to_all = AsyncMock()
+        container.job_manager.close = AsyncMock()
+        container.job_manager.block_height = 0
+        container.tcp_stratum_server.start = AsyncMock()
+        container.tcp_stratum_server.stop = AsyncMock()
+        container.tcp_stratum_server.host = "0.0.0.0"
+        container.tcp_stratum_server.port = 3333
+        container.tcp_stratum_server.connections = {}
+        container.stratum_server.active_connections = {}
+        return container
+
+    @pytest.mark.asyncio
+    async def test_startup_with_tcp_enabled(self, mock_container):
+        """Тест запуска с включенным TCP сервером: сервер стартует без ошибок"""
+        with patch('app.lifespan.container', mock_container), \
+                patch('app.lifespan.warm_up_pool', AsyncMock(return_value=1)), \
+                patch('app.lifespan.settings.stratum_tcp_enabled', True), \
+                patch('app.lifespan.settings.enable_dynamic_difficulty', False), \
+                patch('app.lifespan._periodic_job_broadcaster', _idle), \
+                patch('app.lifespan._periodic_job_cleanup', _idle), \
+                patch('app.lifespan._periodic_reorg_checker', _idle), \
+                patch('app.lifespan.asyncio.sleep', AsyncMock()), \
+                patch('app.lifespan.logger') as mock_logger:
+            async with lifespan(None):
+                await asyncio.sleep(0)
+
+        info_events = _events(mock_logger.info)
+        error_events = _events(mock_logger.error)
+        assert "tcp_server_started" in info_events
+        assert "tcp_server_start_failed" not in error_events
+        assert "tcp_server_stopped" in info_events
+        mock_container.tcp_stratum_server.start.assert_called_once()
+        mock_container.tcp_stratum_server.stop.assert_awaited_once()
@@ -0,0 +1,43 @@
+"""
+Тесты для конфигурации логирования
+"""
+import logging
+import orjson
+from datetime import datetime, UTC
+
+from app.utils.logging_config import JSONFormatter
+
+
+class TestJSONFormatter:
+    """Тесты JSON форматировщика"""
+
+    @staticmethod
+    def make_record(**extra):
+        """Запись лога с extra полями"""
+        record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "Шар принят", None, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_format_serializes_extra_fields(self):
+        """Тест: extra поля попадают в JSON, кириллица не экранируется"""
+        record = self.make_record(event="share_accepted", shares={1: "job_1"}, address=object())
+
+        line = JSONFormatter().format(record)
+        data = orjson.loads(line)
+
+        assert "Шар принят" in line
+        assert data["message"] == "Шар принят"
+        assert data["event"] == "share_accepted"
+        assert data["shares"] == {"1": "job_1"}
+        assert data["address"].startswith("<object object")
+
+    def test_timestamp_is_record_time_with_millis(self):
+        """Тест: timestamp - время события записи (UTC, миллисекунды)"""
+        formatter = JSONFormatter()
+        record = self.make_record()
+        record.created = 1700000000.25
+
+        data = orjson.loads(formatter.format(record))
+
+        assert data["timestamp"] == "2023-11-14T22:13:20.250+00:00"
+        assert datetime.fromisoformat(data["timestamp"]) == datetime.fromtimestamp(1700000000.25, UTC)
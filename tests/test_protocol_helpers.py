@@ -15,6 +15,8 @@ from app.utils.protocol_helpers import (
     BLOCK_HEADER_SIZE,
     BCH_TESTNET_PREFIXES,
     BCH_MAINNET_PREFIXES,
+    UINT32_BE,
+    DEFAULT_VERSION_HEX,
 )
 
 
@@ -27,6 +29,12 @@ class TestProtocolHelpers:
         assert EXTRA_NONCE2_SIZE == 4
         assert BLOCK_HEADER_SIZE == 80
 
+    def test_uint32_hex_matches_format(self):
+        """Проверка: UINT32_BE дает тот же hex, что format(x, '08x')"""
+        assert DEFAULT_VERSION_HEX == "20000000"
+        for value in (0, 1, 1700000000, 0x20000004, 0xffffffff):
+            assert UINT32_BE.pack(value).hex() == format(value, '08x')
+
     def test_bch_address_constants(self):
         """Проверка констант BCH адресов"""
         assert BCH_TESTNET_PREFIXES == ['bchtest:', 'qq', 'qp']
@@ -0,0 +1,76 @@
+"""
+Тесты для RealBCHNodeClient
+"""
+import asyncio
+import orjson
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+from app.jobs.real_node_client import RealBCHNodeClient
+from app.utils.protocol_helpers import SubmitStatus
+
+
+class TestRealBCHNodeClient:
+    """Тесты клиента BCH ноды"""
+
+    @pytest.fixture
+    def client(self):
+        """Клиент с подмененной HTTP сессией и аутентификацией"""
+        client = RealBCHNodeClient(rpc_user="user", rpc_password="pass", use_cookie=False)
+        client._get_auth = AsyncMock(return_value=None)
+        client.session = MagicMock()
+        return client
+
+    @staticmethod
+    def set_response(client, body, status=200):
+        """Ответ ноды на следующий POST"""
+        response = MagicMock(status=status)
+        response.read = AsyncMock(return_value=orjson.dumps(body))
+        client.session.post.return_value.__aenter__.return_value = response
+
+    @pytest.mark.asyncio
+    async def test_rpc_call_encodes_with_orjson(self, client):
+        """Тест: тело запроса и ответа кодируется orjson"""
+        self.set_response(client, {"result": {"height": 100}, "error": None, "id": 1})
+
+        result = await client._make_rpc_call("getblocktemplate", [{"longpollid": "lp_1"}])
+
+        assert result == {"height": 100}
+        payload = orjson.loads(client.session.post.call_args.kwargs["data"])
+        assert payload["method"] == "getblocktemplate"
+        assert payload["params"] == [{"longpollid": "lp_1"}]
+
+    @pytest.mark.asyncio
+    async def test_batch_call_matches_results_by_id(self, client):
+        """Тест: результаты batch возвращаются в порядке вызовов, ошибки - None"""
+        self.set_response(client, [
+            {"id": 2, "result": None, "error": {"code": -1, "message": "fail"}},
+            {"id": 1, "result": {"difficulty": 2.0}, "error": None},
+        ])
+
+        results = await client.batch_call([("getmininginfo", []), ("getblocktemplate", [])])
+
+        assert results == [{"difficulty": 2.0}, None]
+        payload = orjson.loads(client.session.post.call_args.kwargs["data"])
+        assert [item["method"] for item in payload] == ["getmininginfo", "getblocktemplate"]
+
+    def test_blockchain_info_defaults_to_empty_dict(self, client):
+        """Тест: до подключения blockchain_info - пустой словарь, а не None"""
+        assert client.blockchain_info == {}
+        assert client.blockchain_info.get('chain', 'unknown') == 'unknown'
+
+    @pytest.mark.asyncio
+    async def test_submit_block_status(self, client):
+        """Тест: null от submitblock - принят, строка или сбой вызова - отклонен"""
+        self.set_response(client, {"result": None, "error": None, "id": 1})
+        assert await client.submit_block("00" * 80) == (SubmitStatus.ACCEPTED, None)
+
+        self.set_response(client, {"result": "high-hash", "error": None, "id": 2})
+        status, detail = await client.submit_block("00" * 80)
+        assert status is SubmitStatus.REJECTED
+        assert detail["message"] == "high-hash"
+
+        client.session.post.side_effect = asyncio.TimeoutError()
+        status, detail = await client.submit_block("00" * 80)
+        assert status is SubmitStatus.REJECTED
+        assert detail["message"] == "RPC call failed"
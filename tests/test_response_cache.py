@@ -0,0 +1,58 @@
+"""
+Тесты для кэша ответов API
+"""
+import pytest
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from app.utils.response_cache import cached, response_cache, CachedResponse
+
+
+class TestCachedDecorator:
+    """Тесты для декоратора cached"""
+
+    @pytest.mark.asyncio
+    async def test_response_rebuilt_on_hit(self):
+        """Тест: в кэше хранится снимок ответа, на попадание собирается новый Response"""
+        calls = []
+
+        @cached(namespace="test", expire=60)
+        async def endpoint():
+            calls.append(1)
+            response = ORJSONResponse({"status": "success"}, status_code=200)
+            response.headers["x-test"] = "1"
+            return response
+
+        first = await endpoint()
+        second = await endpoint()
+        third = await endpoint()
+
+        assert len(calls) == 1
+        assert second is not first and third is not second
+        assert second.body == third.body == first.body
+        assert second.status_code == 200
+        assert second.raw_headers == first.raw_headers
+
+        # Изменение заголовков отданного ответа не портит кэш
+        second.headers["x-test"] = "2"
+        assert (await endpoint()).headers["x-test"] == "1"
+
+        stored = response_cache.get("test:endpoint:")
+        assert isinstance(stored, CachedResponse)
+
+    @pytest.mark.asyncio
+    async def test_streaming_response_not_cached(self):
+        """Тест: потоковый ответ не кэшируется"""
+        calls = []
+
+        async def body():
+            yield b"{}"
+
+        @cached(namespace="test", expire=60)
+        async def endpoint():
+            calls.append(1)
+            return StreamingResponse(body(), media_type="application/json")
+
+        await endpoint()
+        await endpoint()
+
+        assert len(calls) == 2
@@ -4,7 +4,7 @@
 import pytest
 
 import json
-from unittest.mock import Mock, AsyncMock
+from unittest.mock import Mock, AsyncMock, call
 from datetime import datetime, UTC
 
 
@@ -231,6 +231,61 @@ class TestStratumTCPServer:
         writer.close.assert_called_once()
         writer.wait_closed.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_handle_client_records_connection_info(self, tcp_server):
+        """Тест: адрес и время подключения сохраняются при подключении и очищаются при отключении"""
+        writer = Mock()
+        writer.get_extra_info.return_value = ("192.168.1.1", 12345)
+        writer.drain = AsyncMock()
+        writer.wait_closed = AsyncMock()
+        tcp_server._send_welcome = AsyncMock()
+        tcp_server.job_service.cleanup_miner_jobs = Mock()
+
+        snapshots = []
+
+        async def readline():
+            # Снимок берется, пока клиент подключен; затем клиент отключается
+            snapshots.append((tcp_server.snapshot_connections(), dict(tcp_server._connection_times)))
+            return b""
+
+        reader = Mock()
+        reader.readline = readline
+
+        await tcp_server.handle_client(reader, writer)
+
+        connections, connection_times = snapshots[0]
+        (client_id, remote_address, miner_address, connection_time), = connections
+        assert client_id == remote_address == "192.168.1.1:12345"
+        assert miner_address == "unknown"
+        # Время подключения, а не время запроса списка
+        assert connection_time == connection_times[client_id].isoformat()
+        assert tcp_server.snapshot_connections() == []
+        assert tcp_server._remote_addrs == {}
+        assert tcp_server._connection_times_iso == {}
+
+    @pytest.mark.asyncio
+    async def test_handle_client_notifies_connection_listeners(self, tcp_server):
+        """Тест: подписчики получают события подключения и отключения"""
+        writer = Mock()
+        writer.get_extra_info.return_value = ("192.168.1.1", 12345)
+        writer.drain = AsyncMock()
+        writer.wait_closed = AsyncMock()
+        tcp_server._send_welcome = AsyncMock()
+        tcp_server.job_service.cleanup_miner_jobs = Mock()
+        listener = Mock()
+        tcp_server.add_connection_listener(listener)
+
+        reader = Mock()
+        reader.readline = AsyncMock(return_value=b"")
+
+        await tcp_server.handle_client(reader, writer)
+
+        assert listener.call_args_list == [
+            call("miner_connected", "192.168.1.1:12345"),
+            call("miner_disconnected", "192.168.1.1:12345"),
+        ]
+        assert tcp_server.connection_count == 0
+
     @pytest.mark.asyncio
     async def test_broadcast_new_job(self, tcp_server):
         """Тест рассылки нового задания"""
@@ -263,6 +318,29 @@ class TestStratumTCPServer:
         assert writer2.write.called
         assert tcp_server.job_service.add_job.call_count == 2
 
+        # У каждого сохраненного задания свой job_id, исходное задание не меняется
+        saved = [c.args[1]["params"] for c in tcp_server.job_service.add_job.call_args_list]
+        assert [params[0] for params in saved] == ["job1", "job2"]
+        assert saved[0][1:] == saved[1][1:] == job_data["params"][1:]
+        assert job_data["params"][0] == "old_job_id"
+
+    @pytest.mark.asyncio
+    async def test_broadcast_difficulty_client_disconnects_during_send(self, tcp_server):
+        """Тест: отключение клиента во время рассылки не прерывает обход"""
+        tcp_server.connections = {"client1": Mock(), "client2": Mock()}
+        sent_to = []
+
+        async def send_json(writer, data):
+            sent_to.append(writer)
+            # Обработчик другого клиента удаляет подключение во время await
+            tcp_server.connections.pop("client2", None)
+
+        tcp_server._send_json = send_json
+
+        await tcp_server.broadcast_difficulty(2.0)
+
+        assert len(sent_to) == 2
+
     @pytest.mark.asyncio
     async def test_broadcast_difficulty(self, tcp_server):
         """Тест рассылки обновления сложности"""
@@ -328,6 +406,47 @@ class TestStratumTCPServer:
         assert stats["protocol"] == "stratum+tcp"
         assert "uptime_seconds" in stats
 
+    def test_snapshot_connections(self, tcp_server):
+        """Тест снимка подключений: адрес майнера или unknown для неавторизованных"""
+        writer1 = Mock()
+        writer2 = Mock()
+        tcp_server.connections = {"c1": writer1, "c2": writer2}
+        tcp_server.miners = {"c1": "addr1"}
+        tcp_server._remote_addrs = {"c1": "10.0.0.1:5000"}
+        tcp_server._connection_times_iso = {"c1": "2024-01-01T00:00:00+00:00"}
+
+        snapshot = tcp_server.snapshot_connections()
+
+        assert snapshot == [
+            ("c1", "10.0.0.1:5000", "addr1", "2024-01-01T00:00:00+00:00"),
+            ("c2", "unknown", "unknown", None)
+        ]
+        # peername читается только при подключении, а не на каждый снимок
+        writer1.get_extra_info.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stats_payload_cached_until_authorize(self, tcp_server):
+        """Тест: данные статистики кэшируются и сбрасываются при авторизации"""
+        tcp_server.connections = {"c1": Mock()}
+        payload = tcp_server.stats_payload()
+
+        assert payload["active_connections"] == 1
+        assert payload["active_miners"] == 0
+        assert tcp_server.stats_payload() is payload
+        payload_json = tcp_server.stats_payload_json()
+        assert tcp_server.stats_payload_json() is payload_json
+
+        writer = Mock()
+        writer.drain = AsyncMock()
+        tcp_server.auth_service.authorize_miner = AsyncMock(return_value=(True, "addr1", None))
+        tcp_server.send_new_job_tcp = AsyncMock()
+        await tcp_server.handle_message(
+            {"id": 1, "method": "mining.authorize", "params": ["addr1", ""]}, writer, "c1"
+        )
+
+        assert tcp_server.stats_payload()["active_miners"] == 1
+        assert json.loads(tcp_server.stats_payload_json())["active_miners"] == 1
+
     @pytest.mark.asyncio
     async def test_stop_server(self, tcp_server):
         """Тест остановки сервера"""
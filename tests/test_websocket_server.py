@@ -1,6 +1,7 @@
 """
 Тесты для WebSocket Stratum сервера
 """
+import orjson
 import pytest
 
 from unittest.mock import Mock, AsyncMock
@@ -324,9 +325,12 @@ class TestStratumServer:
 
         await stratum_server.broadcast_new_job(job_data)
 
-        # Проверяем отправку обоим
-        assert websocket1.send_json.called
-        assert websocket2.send_json.called
+        # Проверяем отправку обоим: общая часть та же, job_id у каждого свой
+        sent1 = orjson.loads(websocket1.send_text.call_args[0][0])
+        sent2 = orjson.loads(websocket2.send_text.call_args[0][0])
+        assert sent1 == {**job_data, "params": ["job1", *job_data["params"][1:]]}
+        assert sent2["params"][0] == "job2"
+        assert job_data["params"][0] == "old_job"
 
         # Проверяем подписки
         assert "addr1" in stratum_server.subscriptions
@@ -334,6 +338,40 @@ class TestStratumServer:
         assert "addr2" in stratum_server.subscriptions
         assert "job2" in stratum_server.subscriptions["addr2"]
 
+    @pytest.mark.asyncio
+    async def test_broadcast_new_job_prepare_error_skips_one_miner(self, stratum_server):
+        """Тест: ошибка подготовки задания одному майнеру не прерывает рассылку остальным"""
+        websocket1 = AsyncMock()
+        websocket2 = AsyncMock()
+        websocket3 = AsyncMock()
+
+        stratum_server.active_connections = {
+            "conn1": websocket1,
+            "conn2": websocket2,
+            "conn3": websocket3
+        }
+        stratum_server.miner_addresses = {
+            "conn1": "addr1",
+            "conn2": "addr2",
+            "conn3": "addr3"
+        }
+        stratum_server.job_service.create_job_id = Mock(side_effect=["job1", Exception("id error"), "job3"])
+        stratum_server.job_service.add_job = Mock()
+
+        job_data = {
+            "method": "mining.notify",
+            "params": ["old_job", "prevhash", "coinbase", [], "version", "bits", "ntime", True]
+        }
+
+        await stratum_server.broadcast_new_job(job_data)
+
+        websocket1.send_text.assert_awaited_once()
+        websocket2.send_text.assert_not_called()
+        websocket3.send_text.assert_awaited_once()
+        assert stratum_server.subscriptions["addr1"] == {"job1"}
+        assert stratum_server.subscriptions["addr3"] == {"job3"}
+        assert "addr2" not in stratum_server.subscriptions
+
     @pytest.mark.asyncio
     async def test_update_difficulty(self, stratum_server):
         """Тест рассылки обновления сложности"""
@@ -420,6 +458,28 @@ class TestStratumServer:
         assert stats["total_subscriptions"] == 2
         assert "uptime_seconds" in stats
 
+    @pytest.mark.asyncio
+    async def test_active_miner_count(self, stratum_server):
+        """Тест счетчика уникальных адресов при подключении/отключении"""
+        stratum_server.job_service.cleanup_miner_jobs = Mock()
+        websockets = [AsyncMock(spec=WebSocket) for _ in range(3)]
+        for websocket in websockets:
+            websocket.client = None
+
+        conn1 = await stratum_server.connect(websockets[0], "addr1")
+        conn2 = await stratum_server.connect(websockets[1], "addr1")
+        await stratum_server.connect(websockets[2], "addr2")
+        assert stratum_server.active_miner_count == 2
+
+        await stratum_server.disconnect(conn1)
+        assert stratum_server.active_miner_count == 2
+
+        await stratum_server.disconnect(conn2)
+        assert stratum_server.active_miner_count == 1
+
+        stratum_server.cleanup_all()
+        assert stratum_server.active_miner_count == 0
+
     def test_cleanup_all(self, stratum_server):
         """Тест полной очистки"""
         # Заполняем данные